@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+'''
+Compares the unique memory (USS) of forked workers with and without the
+pre-fork warm up (pyramid_skue.prefork). A master builds an application
+with many resources and forks the workers, which serve requests, run a full
+garbage collection (as they eventually do) and report their USS. Linux only.
+
+Usage: python benchmarks/prefork.py [workers] [resources] [requests]
+'''
+
+# Copyright (c) 2012 The Skuë Project
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+# ***** Python built-in modules *****
+import os
+import sys
+import gc
+import subprocess
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+__copyright__ = u"Copyright 2012, The Skuë Project"
+__license__ = "MIT"
+
+
+def make_app(size):
+    """Creates a WSGI application with size collection resources"""
+    from pyramid.config import Configurator
+    from pyramid_skue.http import CommonResponse
+    from pyramid_skue.rest.api import ResourceDescription, HttpMethodDescription
+    from pyramid_skue.rest.api import HttpParameterDescription
+    from pyramid_skue.rest.resources import CollectionResource
+
+    def describe_resource(self):
+        name = type(self).__name__
+        return ResourceDescription(name, url='/%s' % name.lower(), methods=[
+            HttpMethodDescription('GET', parameters=[
+                HttpParameterDescription('tag_%d' % number, 'list:int')
+                for number in range(10)]),
+            HttpMethodDescription('POST', parameters=[
+                HttpParameterDescription('field_%d' % number, 'string',
+                                         is_required=number < 3)
+                for number in range(10)])])
+
+    def read_resource(self):
+        return CommonResponse.simple_success(type(self).__name__)
+
+    config = Configurator(settings={})
+    config.include('pyramid_skue')
+    for number in range(size):
+        resource_class = type('Resource%d' % number, (CollectionResource,), {
+            'describe_resource': describe_resource,
+            'read_resource': read_resource,
+        })
+        config.add_skue_resource(resource_class)
+    return config.make_wsgi_app()
+
+
+def serve(app, resources, requests):
+    """The work of a worker: some requests and a full collection"""
+    from pyramid.request import Request
+    for number in range(requests):
+        path = '/resource%d' % (number % resources)
+        method = 'OPTIONS' if number % 3 == 0 else 'GET'
+        Request.blank(path, method=method).get_response(app)
+    gc.collect()
+
+
+def measure(mode, workers, resources, requests):
+    """Forks the workers from a master and prints their USS, one per line"""
+    from pyramid_skue.prefork import prefork, unique_memory
+    app = make_app(resources)
+    if mode == 'prefork':
+        prefork(app)
+    children = []
+    for _ in range(workers):
+        reader, writer = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(reader)
+            serve(app, resources, requests)
+            os.write(writer, str(unique_memory()).encode('ascii'))
+            os._exit(0)
+        os.close(writer)
+        children.append((pid, reader))
+    for pid, reader in children:
+        print(os.read(reader, 64).decode('ascii'))
+        os.close(reader)
+        os.waitpid(pid, 0)
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] in ('default', 'prefork'):
+        measure(sys.argv[1], *[int(value) for value in sys.argv[2:5]])
+        return
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    resources = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    requests = int(sys.argv[3]) if len(sys.argv) > 3 else 1000
+    print('Python %s, %d workers, %d resources, %d requests per worker' % (
+        sys.version.split()[0], workers, resources, requests))
+    print('%-10s %14s %14s' % ('mode', 'USS/worker', 'USS total'))
+    for mode in ('default', 'prefork'):
+        # A fresh master per mode
+        output = subprocess.check_output(
+            [sys.executable, os.path.abspath(__file__), mode,
+             str(workers), str(resources), str(requests)])
+        sizes = [int(line) for line in output.decode('ascii').split()]
+        print('%-10s %11.1f MB %11.1f MB' % (
+            mode, sum(sizes) / float(len(sizes)) / 2 ** 20, sum(sizes) / 2.0 ** 20))
+
+
+if __name__ == '__main__':
+    main()
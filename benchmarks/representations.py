@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+'''
+Compares the encoding of a page of rows as a dictionary per row against
+the CollectionJSONRepresentation layouts.
+
+Usage: python benchmarks/representations.py [rows] [repetitions]
+'''
+
+# Copyright (c) 2012 The Skuë Project
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+# ***** Python built-in modules *****
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+# ***** Application modules *****
+from pyramid_skue.json.utils import ResourceJSONRepresentation
+from pyramid_skue.json.utils import CollectionJSONRepresentation
+from pyramid_skue.json.utils import OBJECTS_LAYOUT, COLUMNS_LAYOUT
+
+__copyright__ = u"Copyright 2012, The Skuë Project"
+__license__ = "MIT"
+
+
+COLUMNS = ['id', 'author', 'title', 'score', 'published', 'body']
+
+
+class DictRowsJSONRepresentation(ResourceJSONRepresentation):
+    """The dictionary per row representation of the README"""
+    def __init__(self, rows):
+        ResourceJSONRepresentation.__init__(self, 'Message')
+        self.objects = []
+        for row in rows:
+            self.objects.append(dict(zip(COLUMNS, row)))
+
+
+def make_rows(size):
+    return [(number, u'author %d' % (number % 50), u'title %d' % number,
+             number * 0.5, number % 2 == 0, u'lorem ipsum dolor sit amet ' * 4)
+            for number in range(size)]
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    repetitions = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    rows = make_rows(size)
+    candidates = [
+        ('dict per row', lambda: DictRowsJSONRepresentation(rows).as_json()),
+        ('objects layout', lambda: CollectionJSONRepresentation(
+            COLUMNS, rows, layout=OBJECTS_LAYOUT, offset=0, count=size).as_json()),
+        ('columns layout', lambda: CollectionJSONRepresentation(
+            COLUMNS, rows, layout=COLUMNS_LAYOUT, offset=0, count=size).as_json()),
+    ]
+    print('%d rows, best of 3 x %d' % (size, repetitions))
+    for name, encode in candidates:
+        seconds = min(timeit.repeat(encode, number=repetitions, repeat=3))
+        print('%-16s %8.3f ms %10d bytes' % (name, seconds / repetitions * 1000,
+                                             len(encode())))
+
+
+if __name__ == '__main__':
+    main()
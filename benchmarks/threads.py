@@ -0,0 +1,157 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+'''
+Stress test of the request state under many threads. Every thread sends
+requests with its own parameters and checks that the response echoes them,
+so state leaking between concurrent requests is reported as a leak. Prints
+the requests per second for each thread count, to spot lock contention.
+Run it on a free-threaded build (python3.13t) to test without the GIL.
+
+Usage: python benchmarks/threads.py [requests per thread] [thread counts]
+       e.g. python benchmarks/threads.py 500 1,2,4,8,16,32
+'''
+
+# Copyright (c) 2012 The Skuë Project
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+# ***** Python built-in modules *****
+import os
+import sys
+import time
+import random
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+__copyright__ = u"Copyright 2012, The Skuë Project"
+__license__ = "MIT"
+
+
+def make_app():
+    """Creates a WSGI application whose responses echo the request state"""
+    from pyramid.config import Configurator
+    from pyramid_skue.http import CommonResponse
+    from pyramid_skue.json.utils import ResourceJSONRepresentation
+    from pyramid_skue.rest.api import ResourceDescription, HttpMethodDescription
+    from pyramid_skue.rest.api import HttpParameterDescription
+    from pyramid_skue.rest.resources import CollectionResource, ControllerResource
+
+    class Echo(ControllerResource):
+        def describe_resource(self):
+            return ResourceDescription('Echo', url='/echo', methods=[
+                HttpMethodDescription('POST', parameters=[
+                    HttpParameterDescription('name', is_required=True),
+                    HttpParameterDescription('number', 'int', is_required=True)])])
+
+        def execute(self):
+            name = self.payload['name']
+            # Let the other threads run between reading and answering
+            time.sleep(0)
+            return CommonResponse.simple_success(
+                '%s %d %s' % (name, self.payload['number'], self.language))
+
+    class Items(CollectionResource):
+        def describe_resource(self):
+            return ResourceDescription('Items', url='/items', methods=[
+                HttpMethodDescription('GET')])
+
+        def read_resource(self):
+            time.sleep(0)
+            body = ResourceJSONRepresentation('Items')
+            body.offset = self.offset
+            body.count = self.count
+            return CommonResponse.success(body)
+
+    config = Configurator(settings={})
+    config.include('pyramid_skue')
+    config.add_skue_resource(Echo)
+    config.add_skue_resource(Items)
+    return config.make_wsgi_app()
+
+
+def worker(app, index, size, start, results):
+    """Sends size requests and counts the responses of other requests"""
+    from pyramid.request import Request
+    rng = random.Random(index)
+    leaks = errors = 0
+    start.wait()
+    for _ in range(size):
+        number = rng.randint(0, 1000000)
+        language = rng.choice(['en', 'es', 'pt-BR'])
+        if number % 2:
+            request = Request.blank(
+                '/echo', method='POST',
+                body=('name=t%d&number=%d&lang=%s'
+                      % (index, number, language)).encode('ascii'),
+                content_type='application/x-www-form-urlencoded')
+            expected = ('"t%d %d %s"' % (index, number, language)).encode('ascii')
+        else:
+            request = Request.blank('/items?offset=%d&count=%d' % (number, index))
+            expected = ('"offset": %d' % number).encode('ascii')
+        response = request.get_response(app)
+        if response.status_int != 200:
+            errors += 1
+        elif expected not in response.body:
+            leaks += 1
+    results[index] = (leaks, errors)
+
+
+def run(app, threads, size):
+    """Runs the workers and returns (seconds, leaks, errors)"""
+    results = {}
+    start = threading.Event()
+    workers = [threading.Thread(target=worker,
+                                args=(app, index, size, start, results))
+               for index in range(threads)]
+    for thread in workers:
+        thread.start()
+    started = time.time()
+    start.set()
+    for thread in workers:
+        thread.join()
+    elapsed = time.time() - started
+    leaks = sum(result[0] for result in results.values())
+    errors = sum(result[1] for result in results.values())
+    return elapsed, leaks, errors
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    counts = [1, 2, 4, 8, 16, 32]
+    if len(sys.argv) > 2:
+        counts = [int(count) for count in sys.argv[2].split(',')]
+    is_gil_enabled = getattr(sys, '_is_gil_enabled', lambda: True)
+    print('Python %s, GIL %s, %d requests per thread' % (
+        sys.version.split()[0], 'enabled' if is_gil_enabled() else 'disabled', size))
+    app = make_app()
+    run(app, 2, 50)
+    print('%8s %12s %8s %8s' % ('threads', 'requests/s', 'leaks', 'errors'))
+    failed = False
+    for threads in counts:
+        elapsed, leaks, errors = run(app, threads, size)
+        failed = failed or leaks or errors
+        print('%8d %12.0f %8d %8d' % (threads, threads * size / elapsed,
+                                      leaks, errors))
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+'''
+Measures the requests per second of the whole dispatch pipeline (routing,
+validation, coercion, handler and JSON encoding) through a WSGI application,
+without a server. Given other interpreters, runs itself with each one and
+prints a comparison, e.g. to compare Python 2.7 against Python 3.11+.
+
+Usage: python benchmarks/throughput.py [requests] [python ...]
+'''
+
+# Copyright (c) 2012 The Skuë Project
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+# ***** Python built-in modules *****
+import os
+import sys
+import time
+import subprocess
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+__copyright__ = u"Copyright 2012, The Skuë Project"
+__license__ = "MIT"
+
+
+# The requests of a round, by name
+SCENARIOS = ['GET document', 'GET collection', 'POST form', 'OPTIONS']
+
+
+def make_app():
+    """Creates a WSGI application with a document and a collection resource"""
+    from pyramid.config import Configurator
+    from pyramid_skue.http import CommonResponse
+    from pyramid_skue.json.utils import ResourceJSONRepresentation
+    from pyramid_skue.rest.api import ResourceDescription, HttpMethodDescription
+    from pyramid_skue.rest.api import HttpParameterDescription
+    from pyramid_skue.rest.resources import CollectionResource, DocumentResource
+
+    class Items(CollectionResource):
+        def describe_resource(self):
+            return ResourceDescription('Items', url='/items', methods=[
+                HttpMethodDescription('GET', parameters=[
+                    HttpParameterDescription('count', 'int')]),
+                HttpMethodDescription('POST', parameters=[
+                    HttpParameterDescription('name', is_required=True),
+                    HttpParameterDescription('score', 'float')])])
+
+        def read_resource(self):
+            body = ResourceJSONRepresentation('Items')
+            body.objects = [{'id': number, 'name': u'item %d' % number,
+                             'score': number * 0.5}
+                            for number in range(self.payload.get('count') or 20)]
+            return CommonResponse.success(body)
+
+        def create_resource(self):
+            return CommonResponse.resource_created(u'/items/1')
+
+    class Item(DocumentResource):
+        def describe_resource(self):
+            return ResourceDescription('Item', url='/items/{id}', methods=[
+                HttpMethodDescription('GET')])
+
+        def exists(self, identifier):
+            return True
+
+        def read_resource(self, *args, **kwargs):
+            body = ResourceJSONRepresentation('Item')
+            body.id = self.request.matchdict['id']
+            body.name = u'item'
+            return CommonResponse.success(body)
+
+    config = Configurator(settings={})
+    config.include('pyramid_skue')
+    config.add_skue_resource(Items)
+    config.add_skue_resource(Item)
+    return config.make_wsgi_app()
+
+
+def make_requests():
+    from pyramid.request import Request
+    return {
+        'GET document': lambda: Request.blank('/items/7'),
+        'GET collection': lambda: Request.blank('/items?count=20'),
+        'POST form': lambda: Request.blank(
+            '/items', method='POST', body=b'name=item&score=1.5',
+            content_type='application/x-www-form-urlencoded'),
+        'OPTIONS': lambda: Request.blank('/items', method='OPTIONS'),
+    }
+
+
+def measure(size):
+    """Prints a 'name requests/s' line per scenario"""
+    app = make_app()
+    requests = make_requests()
+    for name in SCENARIOS:
+        make_request = requests[name]
+        # Warm up the caches and the plans
+        for _ in range(100):
+            make_request().get_response(app)
+        best = None
+        for _ in range(3):
+            started = time.time()
+            for _ in range(size):
+                response = make_request().get_response(app)
+            elapsed = time.time() - started
+            best = elapsed if best is None else min(best, elapsed)
+        assert response.status_int < 400, response.body
+        print('%s\t%.0f' % (name, size / best))
+
+
+def compare(size, interpreters):
+    """Runs the measure with each interpreter and prints a table"""
+    script = os.path.abspath(__file__)
+    results = []
+    for interpreter in interpreters:
+        version = subprocess.check_output(
+            [interpreter, '-c', 'import platform; print(platform.python_version())'])
+        output = subprocess.check_output([interpreter, script, str(size)])
+        rates = dict(line.split('\t') for line in
+                     output.decode('utf-8').strip().splitlines())
+        results.append((version.decode('utf-8').strip(), rates))
+    print('%d requests per scenario, best of 3 (requests/s)' % size)
+    print('%-16s' % 'python' + ''.join('%16s' % name for name in SCENARIOS))
+    for version, rates in results:
+        print('%-16s' % version + ''.join('%16s' % rates[name] for name in SCENARIOS))
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    interpreters = sys.argv[2:]
+    if interpreters:
+        compare(size, interpreters)
+    else:
+        measure(size)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,3 @@
+def includeme(config):
+    """Pyramid entry point, use as config.include('pyramid_skue')"""
+    config.include('pyramid_skue.config')
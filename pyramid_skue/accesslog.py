@@ -0,0 +1,177 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Copyright (c) 2012 The Skuë Project
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+from __future__ import absolute_import
+
+# ***** Python built-in modules *****
+import json
+import logging
+import threading
+from collections import deque
+
+__copyright__ = u"Copyright 2012, The Skuë Project"
+__license__ = "MIT"
+
+
+logger = logging.getLogger(__name__)
+
+
+#===============================================================================
+# AccessLog
+#===============================================================================
+class AccessLog(object):
+    """A structured access log written by a background thread.
+
+    The request threads only append their records to a bounded queue.
+    The writer thread takes them in batches and writes one JSON object per
+    line to a file, or hands them to a logging handler. When the queue is
+    full the records are dropped (and counted) instead of blocking the
+    requests.
+    """
+
+    def __init__(self, path=None, handler=None, max_queued=10000,
+                 batch_size=100, flush_interval=1.0):
+        """Creates a new AccessLog
+
+        Args:
+          path: The file to append the records to
+          handler: A logging.Handler to emit the records to, when no path
+                   is given
+          max_queued: The maximum number of records waiting to be written
+          batch_size: The number of queued records that wakes the writer
+                      before the flush interval
+          flush_interval: The maximum seconds a record waits to be written
+        """
+        if path is None and handler is None:
+            raise ValueError('An access log needs a path or a handler')
+        self.path = path
+        self.handler = handler
+        self.max_queued = max_queued
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._records = deque()
+        self._wake_up = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stream = None
+        self._closed = False
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+
+    @property
+    def depth(self):
+        """The number of records waiting to be written"""
+        return len(self._records)
+
+    @property
+    def stats(self):
+        """A dictionary with the queue depth and the record counters"""
+        return {
+            'depth': self.depth,
+            'max_queued': self.max_queued,
+            'written': self.written,
+            'dropped': self.dropped,
+            'failed': self.failed,
+        }
+
+    def emit(self, record):
+        """Queues a record (a JSON serializable dictionary) to be written.
+
+        Returns:
+          False if the record was dropped because the queue is full
+        """
+        if self._closed or len(self._records) >= self.max_queued:
+            # Counter updates may race, they are only an estimate
+            self.dropped += 1
+            return False
+        self._records.append(record)
+        if self._thread is None:
+            self.__start()
+        if len(self._records) >= self.batch_size:
+            self._wake_up.set()
+        return True
+
+    def flush(self):
+        """Writes the queued records in the calling thread"""
+        with self._lock:
+            self.__write_batch()
+
+    def close(self):
+        """Stops the writer thread once the queued records are written"""
+        self._closed = True
+        thread = self._thread
+        if thread is not None:
+            self._wake_up.set()
+            thread.join()
+        self.flush()
+        with self._lock:
+            if self._stream is not None:
+                self._stream.close()
+                self._stream = None
+
+    def __start(self):
+        """Starts the writer thread (once)"""
+        with self._lock:
+            if self._thread is not None:
+                return
+            thread = threading.Thread(target=self.__work,
+                                      name='skue-access-log')
+            thread.daemon = True
+            thread.start()
+            self._thread = thread
+
+    def __work(self):
+        """The loop of the writer thread"""
+        while not self._closed:
+            self._wake_up.wait(self.flush_interval)
+            self._wake_up.clear()
+            self.flush()
+
+    def __write_batch(self):
+        """Writes every queued record. Must be called holding the lock."""
+        lines = []
+        while self._records:
+            record = self._records.popleft()
+            try:
+                lines.append(json.dumps(record, sort_keys=True))
+            except (TypeError, ValueError):
+                self.failed += 1
+        if not lines:
+            return
+        try:
+            if self.path is not None:
+                if self._stream is None:
+                    self._stream = open(self.path, 'a')
+                self._stream.write('\n'.join(lines) + '\n')
+                self._stream.flush()
+            else:
+                for line in lines:
+                    self.handler.handle(logging.makeLogRecord({
+                        'name': 'pyramid_skue.access', 'msg': line,
+                        'levelno': logging.INFO, 'levelname': 'INFO'}))
+        except Exception:
+            logger.exception('Cannot write the access log')
+            self.failed += len(lines)
+        else:
+            self.written += len(lines)
@@ -0,0 +1,319 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Copyright (c) 2012 The Skuë Project
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+# ***** Python built-in modules *****
+import math
+import hashlib
+import threading
+from collections import OrderedDict
+
+__copyright__ = u"Copyright 2012, The Skuë Project"
+__license__ = "MIT"
+
+
+# Marks a missing key in CopyOnWriteDict.setdefault
+_MISSING = object()
+
+
+#===============================================================================
+# LRUCache
+#===============================================================================
+class LRUCache(object):
+    """A thread-safe dictionary with a maximum number of entries that
+    discards the least recently used entries first.
+    """
+
+    def __init__(self, capacity):
+        """Creates a new LRUCache
+
+        Args:
+          capacity: The maximum number of entries to keep
+        """
+        self.capacity = capacity
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, default=None):
+        """Gets the value of the given key and marks it as recently used"""
+        with self._lock:
+            try:
+                value = self._entries.pop(key)
+            except KeyError:
+                return default
+            self._entries[key] = value
+            return value
+
+    def set(self, key, value):
+        """Sets the value of the given key, evicting the oldest entry when
+        the cache is full.
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = value
+            if len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+
+    def discard(self, key):
+        """Removes the given key from the cache (if present)"""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        """Removes all the entries of the cache"""
+        with self._lock:
+            self._entries.clear()
+
+
+#===============================================================================
+# BloomFilter
+#===============================================================================
+class BloomFilter(object):
+    """A probabilistic set that answers 'definitely not present' or
+    'maybe present' using a fixed amount of memory.
+
+    Items cannot be removed, so a filter used to rule out identifiers must
+    be seeded with every existing identifier and then fed every new one.
+    """
+
+    def __init__(self, capacity, error_rate=0.01):
+        """Creates a new BloomFilter
+
+        Args:
+          capacity: The expected number of items to add
+          error_rate: The accepted rate of false 'maybe present' answers
+                      once the filter holds capacity items
+        """
+        bits = int(math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.size = max(bits, 8)
+        self.hash_count = max(int(round(self.size / float(capacity) * math.log(2))), 1)
+        self._bits = bytearray((self.size + 7) // 8)
+        self._lock = threading.Lock()
+
+    def _positions(self, item):
+        """Gets the bit positions of the given item (double hashing)"""
+        if not isinstance(item, bytes):
+            item = (u'%s' % (item,)).encode('utf-8')
+        digest = hashlib.md5(item).hexdigest()
+        first = int(digest[:16], 16)
+        second = int(digest[16:], 16) | 1
+        return [(first + i * second) % self.size for i in range(self.hash_count)]
+
+    def add(self, item):
+        """Adds the given item to the filter"""
+        positions = self._positions(item)
+        with self._lock:
+            for position in positions:
+                self._bits[position >> 3] |= 1 << (position & 7)
+
+    def update(self, items):
+        """Adds all the given items to the filter"""
+        for item in items:
+            self.add(item)
+
+    def __contains__(self, item):
+        bits = self._bits
+        for position in self._positions(item):
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+
+#===============================================================================
+# ExistenceCache
+#===============================================================================
+class ExistenceCache(object):
+    """Remembers which resource identifiers exist in the storage.
+
+    Existing identifiers are kept in an LRU cache. Missing identifiers are
+    not cached, since another process could create them at any moment: an
+    optional BloomFilter holding every existing identifier answers those
+    negatives instead (it has no false negatives), and the rest are queried.
+
+    The cache is per process and is only kept coherent by the creates and
+    deletes reported to it with added/removed. With several workers, or
+    writers outside the application, an identifier deleted elsewhere is
+    still reported as existing until it is evicted or removed, and the
+    bloom filter must be fed the identifiers created elsewhere.
+
+    The hit and miss counters are not synchronized, they are statistics.
+    """
+
+    def __init__(self, capacity=10000, bloom=None):
+        """Creates a new ExistenceCache
+
+        Args:
+          capacity: The maximum number of identifiers to remember
+          bloom: An optional BloomFilter seeded with all the existing
+                 identifiers of the storage
+        """
+        self._entries = LRUCache(capacity)
+        self.bloom = bloom
+        self.hits = 0
+        self.bloom_hits = 0
+        self.misses = 0
+
+    def lookup(self, identifier):
+        """Gets if the given identifier exists
+
+        Returns:
+          True or False when known, None if the storage must be queried
+        """
+        if self._entries.get(identifier, False):
+            self.hits += 1
+            return True
+        if self.bloom is not None and identifier not in self.bloom:
+            self.bloom_hits += 1
+            return False
+        self.misses += 1
+        return None
+
+    def remember(self, identifier, exists):
+        """Stores the result of querying the storage for the identifier.
+        Only existing identifiers are kept.
+        """
+        if not exists:
+            self._entries.discard(identifier)
+            return
+        self._entries.set(identifier, True)
+        if self.bloom is not None:
+            self.bloom.add(identifier)
+
+    def added(self, identifier):
+        """Reports that a resource with the given identifier was created"""
+        self.remember(identifier, True)
+
+    def removed(self, identifier):
+        """Reports that the resource with the given identifier was deleted"""
+        self.remember(identifier, False)
+
+    def clear(self):
+        """Forgets all the known identifiers (the bloom filter is kept)"""
+        self._entries.clear()
+
+    @property
+    def stats(self):
+        """A dictionary with the hit/miss counters and the hit rate"""
+        hits = self.hits + self.bloom_hits
+        total = hits + self.misses
+        return {
+            'hits': self.hits,
+            'bloom_hits': self.bloom_hits,
+            'misses': self.misses,
+            'hit_rate': float(hits) / total if total else 0.0,
+            'size': len(self._entries),
+        }
+
+
+#===============================================================================
+# CopyOnWriteDict
+#===============================================================================
+class CopyOnWriteDict(object):
+    """A thread-safe dictionary for the caches shared by every request,
+    which are read all the time and written once per key.
+
+    Reads don't take any lock: they use the current snapshot, a plain
+    dictionary that is never modified. Writes take a lock, change a copy of
+    the snapshot and publish it with a single assignment, so a reader sees
+    either the old or the new snapshot. Writes cost a copy of the whole
+    dictionary, which is fine for small caches (plans, descriptions,
+    encoded bodies) but not for per-request data.
+    """
+
+    def __init__(self, capacity=None):
+        """Creates a new (empty) CopyOnWriteDict
+
+        Args:
+          capacity: The maximum number of entries (optional). New keys are
+                    not stored once the dictionary is full.
+        """
+        self.capacity = capacity
+        self._snapshot = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._snapshot)
+
+    def __contains__(self, key):
+        return key in self._snapshot
+
+    def __getitem__(self, key):
+        return self._snapshot[key]
+
+    def __setitem__(self, key, value):
+        with self._lock:
+            if self.__full(key):
+                return
+            snapshot = dict(self._snapshot)
+            snapshot[key] = value
+            self._snapshot = snapshot
+
+    def get(self, key, default=None):
+        """Gets the value of the given key (without locking)"""
+        return self._snapshot.get(key, default)
+
+    def setdefault(self, key, value):
+        """Gets the value of the given key, storing the given value first if
+        the key is missing. Concurrent callers get the same stored value.
+        """
+        found = self._snapshot.get(key, _MISSING)
+        if found is not _MISSING:
+            return found
+        with self._lock:
+            found = self._snapshot.get(key, _MISSING)
+            if found is not _MISSING:
+                return found
+            if not self.__full(key):
+                snapshot = dict(self._snapshot)
+                snapshot[key] = value
+                self._snapshot = snapshot
+            return value
+
+    def pop(self, key, default=None):
+        """Removes the given key and returns its value (or the default)"""
+        with self._lock:
+            if key not in self._snapshot:
+                return default
+            snapshot = dict(self._snapshot)
+            value = snapshot.pop(key)
+            self._snapshot = snapshot
+            return value
+
+    def items(self):
+        """Gets a list with the (key, value) pairs of the current snapshot"""
+        return list(self._snapshot.items())
+
+    def clear(self):
+        """Removes all the entries"""
+        with self._lock:
+            self._snapshot = {}
+
+    def __full(self, key):
+        """Indicates if the key cannot be added. Must be called holding the
+        lock.
+        """
+        return self.capacity is not None and key not in self._snapshot \
+            and len(self._snapshot) >= self.capacity
+
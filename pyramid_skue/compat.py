@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Copyright (c) 2012 The Skuë Project
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+# ***** Python built-in modules *****
+import sys
+
+__copyright__ = u"Copyright 2012, The Skuë Project"
+__license__ = "MIT"
+
+
+# True when running on Python 3
+PY3 = sys.version_info[0] >= 3
+
+if PY3:
+    from urllib.parse import unquote_plus
+    string_types = (str,)
+    text_type = str
+    binary_type = bytes
+    native_type = str
+else:
+    from urllib import unquote_plus
+    string_types = (basestring,)
+    text_type = unicode
+    binary_type = str
+    native_type = str
+
+
+#===============================================================================
+# to_text
+#===============================================================================
+def to_text(value, encoding='utf-8', errors='strict'):
+    """Gets the given byte string decoded as text (text is returned as is)"""
+    if isinstance(value, binary_type):
+        return value.decode(encoding, errors)
+    return value
+
+#===============================================================================
+# to_bytes
+#===============================================================================
+def to_bytes(value, encoding='utf-8', errors='strict'):
+    """Gets the given text encoded as a byte string (bytes are returned as
+    is). Response bodies must be byte strings.
+    """
+    if isinstance(value, text_type):
+        return value.encode(encoding, errors)
+    return value
+
+#===============================================================================
+# to_native
+#===============================================================================
+def to_native(value, encoding='utf-8', errors='strict'):
+    """Gets the given value as the native string type of the interpreter:
+    a byte string on Python 2 and text on Python 3. Header values and the
+    parameters parsed from a body are native strings.
+    """
+    if PY3:
+        return to_text(value, encoding, errors)
+    return to_bytes(value, encoding, errors)
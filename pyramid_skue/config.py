@@ -0,0 +1,160 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Copyright (c) 2012 The Skuë Project
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+# ***** Pyramid modules *****
+from pyramid.events import ApplicationCreated, NewRequest
+from pyramid.settings import asbool
+
+# ***** Application modules *****
+from .rest.api import ApiDescription, ResourcePlan
+from .rest.api import RestApiDocJSONRepresentation
+from .rest.resources import RESOURCE_PLANS, ApiDocumentationResource
+from .rest.resources import describe_resource_class
+from .lazy import add_skue_lazy_resource
+from .prefork import prefork_on_startup, enable_gc_without_fork
+from .compat import to_bytes
+
+__copyright__ = u"Copyright 2012, The Skuë Project"
+__license__ = "MIT"
+
+
+# The order of the API documentation action: after every resource plan
+API_DOCUMENTATION_ORDER = 10
+
+
+#===============================================================================
+# includeme
+#===============================================================================
+def includeme(config):
+    """Adds the pyramid_skue directives to the Pyramid configurator.
+
+    Use as config.include('pyramid_skue').
+    """
+    config.add_directive('add_skue_resource', add_skue_resource)
+    config.add_directive('add_skue_api_documentation', add_skue_api_documentation)
+    config.add_directive('add_skue_lazy_resource', add_skue_lazy_resource)
+    config.add_directive('add_skue_storage', add_skue_storage)
+    config.add_subscriber(prefork_on_startup, ApplicationCreated)
+    config.add_tween('pyramid_skue.cors.cors_tween_factory')
+    if asbool(config.get_settings().get('skue.prefork', False)):
+        config.add_subscriber(enable_gc_without_fork, NewRequest)
+
+#===============================================================================
+# add_skue_resource
+#===============================================================================
+def add_skue_resource(config, resource, route_name=None, pattern=None,
+                      **view_options):
+    """Registers the route and the view of a RestResource from its
+    self description.
+
+    The resource plan (validation data, Allow header, OPTIONS body) is
+    compiled when the configuration is committed, at startup. The
+    description comes from describe_resource called without a request, so
+    it must not read the request.
+
+    Args:
+      resource: The RestResource class, or its dotted name
+      route_name: The name of the route. Defaults to the resource name
+      pattern: The route pattern. Defaults to the url of the description
+      view_options: Extra arguments for config.add_view, e.g. permission
+
+    Raises:
+      ConfigurationError: describe_resource failed without a request
+    """
+    resource_class = config.maybe_dotted(resource)
+    description = describe_resource_class(resource_class)
+    if pattern is None:
+        pattern = description.url
+    if route_name is None:
+        route_name = description.name or resource_class.__name__
+    config.add_route(route_name, pattern)
+    config.add_view(resource_class, route_name=route_name, **view_options)
+
+    registry = config.registry
+
+    def compile_plan():
+        RESOURCE_PLANS[resource_class] = ResourcePlan(description)
+        if not hasattr(registry, 'skue_resources'):
+            registry.skue_resources = []
+        registry.skue_resources.append(description)
+        if resource_class.cors is not None:
+            # Precompute the preflight answer of the route (see cors.py)
+            if not hasattr(registry, 'skue_cors'):
+                registry.skue_cors = {}
+            registry.skue_cors[route_name] = resource_class.cors.compile(
+                [method.method for method in description.methods or []])
+
+    config.action(('skue-resource', route_name), compile_plan)
+
+#===============================================================================
+# add_skue_api_documentation
+#===============================================================================
+def add_skue_api_documentation(config, pattern, name='API', description='',
+                               route_name='skue-api-documentation',
+                               **view_options):
+    """Registers an ApiDocumentationResource that documents every resource
+    registered with add_skue_resource.
+
+    The documentation body is encoded once, when the configuration is
+    committed.
+
+    Args:
+      pattern: The route pattern of the documentation. E.g. '/api'
+      name: The name of the API
+      description: A textual description of the API
+      route_name: The name of the route
+      view_options: Extra arguments for config.add_view
+    """
+    config.add_route(route_name, pattern)
+    config.add_view(ApiDocumentationResource, route_name=route_name,
+                    **view_options)
+
+    registry = config.registry
+
+    def compile_documentation():
+        resources = list(getattr(registry, 'skue_resources', []))
+        api_description = ApiDescription(name=name, resources=resources,
+                                         description=description)
+        representation = RestApiDocJSONRepresentation(api_description)
+        registry.skue_api_documentation = to_bytes(representation.as_json())
+
+    config.action(('skue-api-documentation', route_name), compile_documentation,
+                  order=API_DOCUMENTATION_ORDER)
+
+#===============================================================================
+# add_skue_storage
+#===============================================================================
+def add_skue_storage(config, storage):
+    """Registers the StorageAdapter used by the resources that don't set
+    their own (see RestResource.storage_session).
+
+    Args:
+      storage: The StorageAdapter, or its dotted name
+    """
+    storage = config.maybe_dotted(storage)
+    registry = config.registry
+
+    def register():
+        registry.skue_storage = storage
+
+    config.action('skue-storage', register)
@@ -0,0 +1,232 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Copyright (c) 2012 The Skuë Project
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+# ***** Pyramid modules *****
+from pyramid.interfaces import IRoutesMapper
+from pyramid.response import Response
+
+__copyright__ = u"Copyright 2012, The Skuë Project"
+__license__ = "MIT"
+
+
+# The request headers allowed by default (besides the CORS safelisted ones)
+DEFAULT_HEADERS = ('Accept', 'Accept-Language', 'Content-Type')
+
+
+#===============================================================================
+# CorsPolicy
+#===============================================================================
+class CorsPolicy(object):
+    """The cross-origin resource sharing (CORS) policy of a resource.
+
+    Set it as the cors attribute of the RestResource class:
+
+    class MessageResource(DocumentResource):
+        cors = CorsPolicy(origins=['https://app.example.com'],
+                          credentials=True, max_age=3600)
+
+    The allowed methods are the ones of the resource description. Preflight
+    requests are answered by the CORS tween without instantiating the
+    resource (see cors_tween_factory).
+    """
+
+    def __init__(self, origins=('*',), headers=DEFAULT_HEADERS,
+                 expose_headers=(), credentials=False, max_age=600):
+        """Creates a new CorsPolicy
+
+        Args:
+          origins: The allowed origins. E.g. ['https://app.example.com'].
+                   '*' allows any origin
+          headers: The request headers the clients may send
+          expose_headers: The response headers the clients may read (besides
+                          the CORS safelisted ones). E.g. ['Location']
+          credentials: True to allow cookies and HTTP authentication. The
+                       origins must be given explicitly then
+          max_age: The seconds the browsers may cache a preflight response
+
+        Raises:
+          ValueError: Credentials are allowed for any origin
+        """
+        if credentials and '*' in origins:
+            # Any site could make authenticated requests on behalf of the user
+            raise ValueError('A CorsPolicy with credentials needs explicit origins')
+        self.origins = frozenset(origins)
+        self.headers = tuple(headers)
+        self.expose_headers = tuple(expose_headers)
+        self.credentials = credentials
+        self.max_age = max_age
+
+    @property
+    def any_origin(self):
+        """True if every origin is allowed"""
+        return '*' in self.origins
+
+    def allows_origin(self, origin):
+        """Indicates if the given Origin header value is allowed"""
+        return self.any_origin or origin in self.origins
+
+    def compile(self, methods):
+        """Precomputes the CORS headers of a resource.
+
+        Args:
+          methods: The names of the HTTP methods of the resource
+
+        Returns:
+          A CorsPlan
+        """
+        return CorsPlan(self, methods)
+
+
+#===============================================================================
+# CorsPlan
+#===============================================================================
+class CorsPlan(object):
+    """The precomputed CORS headers of a resource, so the requests only add
+    the ones that depend on the Origin header.
+    """
+
+    def __init__(self, policy, methods):
+        """Creates a new CorsPlan
+
+        Args:
+          policy: The CorsPolicy of the resource
+          methods: The names of the HTTP methods of the resource
+        """
+        self.policy = policy
+        self.methods = frozenset(methods)
+        # The allowed request headers in lower case
+        self.headers = frozenset([header.lower() for header in policy.headers])
+        credentials = []
+        if policy.credentials:
+            credentials.append(('Access-Control-Allow-Credentials', 'true'))
+        # The answer to any allowed preflight (without the origin headers)
+        self.preflight_headers = [
+            ('Access-Control-Allow-Methods', ', '.join(methods)),
+            ('Access-Control-Max-Age', str(policy.max_age)),
+        ] + credentials
+        if policy.headers:
+            self.preflight_headers.append(
+                ('Access-Control-Allow-Headers', ', '.join(policy.headers)))
+        # The headers of the actual responses (without the origin headers)
+        self.response_headers = list(credentials)
+        if policy.expose_headers:
+            self.response_headers.append(
+                ('Access-Control-Expose-Headers', ', '.join(policy.expose_headers)))
+        # The origin is echoed unless every origin is allowed
+        self.echo_origin = not policy.any_origin
+
+    def allows_headers(self, value):
+        """Indicates if every header of an Access-Control-Request-Headers
+        value is allowed
+        """
+        for header in value.split(','):
+            header = header.strip().lower()
+            if header and header not in self.headers:
+                return False
+        return True
+
+    def preflight(self, request, origin):
+        """Answers a preflight request.
+
+        Returns:
+          A 204 response with the CORS headers, or a 403 response if the
+          origin, the method or a header is not allowed
+        """
+        method = request.headers['Access-Control-Request-Method']
+        requested_headers = request.headers.get('Access-Control-Request-Headers')
+        if not self.policy.allows_origin(origin) or method not in self.methods \
+                or (requested_headers and not self.allows_headers(requested_headers)):
+            return Response(status=403, headerlist=[('Content-Length', '0')])
+        headerlist = self.origin_headers(origin) + self.preflight_headers
+        if self.echo_origin:
+            headerlist.append(('Vary', 'Origin'))
+        headerlist.append(('Content-Length', '0'))
+        return Response(status=204, headerlist=headerlist)
+
+    def decorate(self, origin, response):
+        """Adds the CORS headers to the response of an actual request.
+
+        When the origin is echoed the response varies on it, even for the
+        requests without an allowed Origin, so shared caches don't serve it
+        to other origins.
+        """
+        headers = response.headers
+        if self.echo_origin:
+            vary = headers.get('Vary')
+            if not vary:
+                headers['Vary'] = 'Origin'
+            elif 'origin' not in [name.strip().lower() for name in vary.split(',')]:
+                headers['Vary'] = vary + ', Origin'
+        if origin is None or not self.policy.allows_origin(origin):
+            return
+        for name, value in self.origin_headers(origin):
+            headers[name] = value
+        for name, value in self.response_headers:
+            headers[name] = value
+
+    def origin_headers(self, origin):
+        """Gets the Access-Control-Allow-Origin header for the request
+        Origin
+        """
+        if self.echo_origin:
+            return [('Access-Control-Allow-Origin', origin)]
+        return [('Access-Control-Allow-Origin', '*')]
+
+
+#===============================================================================
+# cors_tween_factory
+#===============================================================================
+def cors_tween_factory(handler, registry):
+    """Creates the tween that applies the CORS policies of the resources.
+
+    Preflight requests (OPTIONS with Origin and Access-Control-Request-Method)
+    to a resource with a policy are matched against the routes and answered
+    from its CorsPlan, before any resource is instantiated. The responses to
+    the actual requests get the CORS headers of their route.
+
+    The tween is registered by config.include('pyramid_skue') and is a no-op
+    when no resource has a policy. Lazy resources are not covered.
+    """
+    plans = getattr(registry, 'skue_cors', None)
+    if not plans:
+        return handler
+    mapper = registry.queryUtility(IRoutesMapper)
+
+    def cors_tween(request):
+        origin = request.headers.get('Origin')
+        if origin is not None and request.method == 'OPTIONS' \
+                and 'Access-Control-Request-Method' in request.headers:
+            route = mapper(request)['route']
+            plan = plans.get(route.name) if route is not None else None
+            if plan is not None:
+                return plan.preflight(request, origin)
+            return handler(request)
+        response = handler(request)
+        route = getattr(request, 'matched_route', None)
+        if route is not None:
+            plan = plans.get(route.name)
+            if plan is not None:
+                plan.decorate(origin, response)
+        return response
+
+    return cors_tween
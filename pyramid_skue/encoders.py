@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Copyright (c) 2012 The Skuë Project
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+from __future__ import absolute_import
+
+# ***** Python built-in modules *****
+import json
+
+# ***** Optional modules *****
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# ***** Application modules *****
+from .compat import to_bytes
+from .json.utils import ResourceJSONRepresentation, ResourceJSONEncoder
+from .json.utils import representation_fields
+from .loaders import DeferredValue
+from .rest.api import RepresentationType as ContentType
+
+__copyright__ = u"Copyright 2012, The Skuë Project"
+__license__ = "MIT"
+
+
+# The functions to encode a response body by media type
+ENCODERS = {}
+# The functions to decode a request body by media type
+DECODERS = {}
+# Byte strings are text on Python 2 (field names, messages), so they can
+# only be packed with the binary type on Python 3
+_USE_BIN_TYPE = bytes is not str
+
+
+#===============================================================================
+# register_encoder
+#===============================================================================
+def register_encoder(media_type, encoder):
+    """Registers the function to encode the response bodies of a media type.
+
+    Args:
+      media_type: The media type. E.g. RepresentationType.MSGPACK
+      encoder: A function that takes a ResourceJSONRepresentation and returns
+               the encoded body (a byte string)
+    """
+    ENCODERS[media_type] = encoder
+
+#===============================================================================
+# register_decoder
+#===============================================================================
+def register_decoder(media_type, decoder):
+    """Registers the function to decode the request bodies of a media type.
+
+    Args:
+      media_type: The media type. E.g. RepresentationType.MSGPACK
+      decoder: A function that takes the body of the request and returns a
+               dictionary (or a list of dictionaries for bulk requests).
+               It must raise ValueError when the body is malformed.
+    """
+    DECODERS[media_type] = decoder
+
+#===============================================================================
+# get_encoder
+#===============================================================================
+def get_encoder(media_type):
+    """Gets the encoder function of the given media type (or None)"""
+    return ENCODERS.get(media_type)
+
+#===============================================================================
+# get_decoder
+#===============================================================================
+def get_decoder(media_type):
+    """Gets the decoder function of the given media type (or None)"""
+    return DECODERS.get(media_type)
+
+#===============================================================================
+# JSON
+#===============================================================================
+def encode_json(body):
+    """Encodes a response body as JSON"""
+    if isinstance(body, ResourceJSONRepresentation):
+        return to_bytes(body.as_json())
+    return to_bytes(json.dumps(body, cls=ResourceJSONEncoder))
+
+#===============================================================================
+# MessagePack
+#===============================================================================
+def _msgpack_default(obj):
+    """Converts the representations found while packing"""
+    if isinstance(obj, ResourceJSONRepresentation):
+        return representation_fields(obj)
+    if isinstance(obj, DeferredValue):
+        return obj.get()
+    raise TypeError('Cannot serialize %r' % (obj,))
+
+def encode_msgpack(body):
+    """Encodes a response body as MessagePack"""
+    return msgpack.packb(body, default=_msgpack_default, use_bin_type=_USE_BIN_TYPE)
+
+def decode_msgpack(body):
+    """Decodes a MessagePack request body"""
+    try:
+        return msgpack.unpackb(body, raw=False)
+    except Exception as error:
+        raise ValueError(str(error))
+
+
+register_encoder(ContentType.JSON, encode_json)
+if msgpack is not None:
+    register_encoder(ContentType.MSGPACK, encode_msgpack)
+    register_decoder(ContentType.MSGPACK, decode_msgpack)
@@ -30,7 +30,7 @@ Created on Apr 2, 2012
 # ***** Application modules *****
 from .json.utils import ResourceJSONRepresentation
 from .rest.api import RepresentationType as ContentType
-from .http import HandlerHttpResponse
+from .http import HandlerHttpResponse, message_body, static_body
 
 __author__ = "Greivin Lopez"
 __copyright__ = u"Copyright 2012, The Skuë Project"
@@ -55,6 +55,10 @@ class ResponseError(Exception):
     """
     #@summary: The HTTP status code of the error
     code = None
+    #@summary: A dictionary with extra HTTP headers for the error response
+    headers = None
+    #@summary: True if the message never changes, so the body is cached
+    static = False
 
     def __init__(self, code):
         """Creates a new instance of the ResponseError with the given
@@ -87,13 +91,26 @@ class ResponseError(Exception):
     def get_http_response(self, content_type=ContentType.JSON):
         """Creates an HandlerHttpResponse with JSON content to output
         this API handler error to a client.
+
+        Only the message is encoded for each error, the rest of the body
+        comes from a template encoded once per content type.
         """
-        body = ResourceJSONRepresentation('ApiHandledError')
-        body.status = "Error"
-        body.message = self.message
+        if self.static:
+            encoded_body = static_body('ApiHandledError', "Error",
+                                       self.message, content_type)
+        else:
+            encoded_body = message_body('ApiHandledError', "Error",
+                                        self.message, content_type)
+        body = None
+        if encoded_body is None:
+            body = ResourceJSONRepresentation('ApiHandledError')
+            body.status = "Error"
+            body.message = self.message
         http_response = HandlerHttpResponse(status_code=self.code,
                                            content_type=content_type,
-                                           body=body)
+                                           body=body,
+                                           headers=self.headers,
+                                           encoded_body=encoded_body)
         return http_response
 
 #===============================================================================
@@ -149,6 +166,117 @@ class InvalidParameterFormatError(ResponseError):
         ResponseError.__init__(self, code=400)
         self.parameter = parameter
 
+#===============================================================================
+# BulkLimitError
+#===============================================================================
+class BulkLimitError(ResponseError):
+    """An error to be raise when a bulk request carries more items than
+    the resource accepts in a single request.
+    """
+    #@summary: The maximum number of items allowed in a bulk request.
+    limit = None
+
+    @property
+    def message(self):
+        return "A bulk request cannot contain more than %s items." % self.limit
+
+    def __init__(self, limit):
+        ResponseError.__init__(self, code=413)
+        self.limit = limit
+
+#===============================================================================
+# PayloadTooLargeError
+#===============================================================================
+class PayloadTooLargeError(ResponseError):
+    """An error to be raise when the body of a request, or one of its
+    uploaded files, is larger than the resource accepts.
+    """
+    #@summary: The maximum number of bytes allowed.
+    limit = None
+
+    @property
+    def message(self):
+        return "The request body cannot be larger than %s bytes." % self.limit
+
+    def __init__(self, limit):
+        ResponseError.__init__(self, code=413)
+        self.limit = limit
+
+#===============================================================================
+# IdempotencyKeyReusedError
+#===============================================================================
+class IdempotencyKeyReusedError(ResponseError):
+    """An error to be raise when an Idempotency-Key already used is sent
+    again with a different request.
+    """
+    #@summary: The reused value of the Idempotency-Key header.
+    key = None
+
+    @property
+    def message(self):
+        return "The Idempotency-Key %s was used for a different request." % self.key
+
+    def __init__(self, key):
+        ResponseError.__init__(self, code=422)
+        self.key = key
+
+#===============================================================================
+# IdempotencyKeyInProgressError
+#===============================================================================
+class IdempotencyKeyInProgressError(ResponseError):
+    """An error to be raise when the request with an Idempotency-Key is
+    still in progress and a repetition cannot wait any longer for it.
+    """
+    #@summary: The seconds the client should wait before retrying
+    retry_after = None
+    static = True
+
+    @property
+    def message(self):
+        return "A request with the same Idempotency-Key is still in progress."
+
+    def __init__(self, retry_after=1):
+        ResponseError.__init__(self, code=409)
+        self.retry_after = retry_after
+        self.headers = {'Retry-After': str(retry_after)}
+
+#===============================================================================
+# ServiceUnavailableError
+#===============================================================================
+class ServiceUnavailableError(ResponseError):
+    """An error to be raise when the server cannot take more work at the
+    moment, e.g. a job queue is full.
+    """
+    #@summary: The seconds the client should wait before retrying (if any)
+    retry_after = None
+    static = True
+
+    @property
+    def message(self):
+        return "The server is too busy to handle the request, try again later."
+
+    def __init__(self, retry_after=None):
+        ResponseError.__init__(self, code=503)
+        self.retry_after = retry_after
+        if retry_after is not None:
+            self.headers = {'Retry-After': str(retry_after)}
+
+#===============================================================================
+# GatewayTimeoutError
+#===============================================================================
+class GatewayTimeoutError(ResponseError):
+    """An error to be raise when the work for a request could not be
+    completed in the time available for it.
+    """
+    static = True
+
+    @property
+    def message(self):
+        return "The request could not be completed in time."
+
+    def __init__(self):
+        ResponseError.__init__(self, code=504)
+
 #===============================================================================
 # UnknownReferenceError
 #===============================================================================
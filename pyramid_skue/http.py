@@ -27,7 +27,15 @@ Created on Apr 3, 2012
 # FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
 # OTHER DEALINGS IN THE SOFTWARE.
 
+from __future__ import absolute_import
+
+# ***** Python built-in modules *****
+import json
+
 # ***** Application modules *****
+from .cache import CopyOnWriteDict
+from .compat import to_bytes, to_native
+from .encoders import get_encoder
 from .json.utils import ResourceJSONRepresentation
 from .rest.api import RepresentationType as ContentType
 
@@ -41,20 +49,110 @@ __email__ = "greivin.lopez@gmail.com"
 __status__ = "Development"
 
 
+# Encoded bodies of the static responses by (content type, type, status, message)
+_STATIC_BODIES = CopyOnWriteDict()
+# Encoded (prefix, suffix) pairs to wrap a message by (content type, type, status)
+_MESSAGE_TEMPLATES = CopyOnWriteDict()
+# Placeholder used to split an encoded representation around its message
+_MESSAGE_PLACEHOLDER = u'\x00'
+
+
+#===============================================================================
+# static_body
+#===============================================================================
+def static_body(object_type, status, message, content_type=ContentType.JSON):
+    """Gets the encoded body of a response that never changes.
+
+    The representation is built and encoded only the first time for each
+    content type, so later calls just return the same byte string.
+
+    Returns:
+      The encoded body or None if the content type cannot be pre-encoded.
+    """
+    key = (content_type, object_type, status, message)
+    body = _STATIC_BODIES.get(key)
+    if body is None and content_type == ContentType.JSON:
+        representation = ResourceJSONRepresentation(object_type)
+        representation.status = status
+        representation.message = message
+        body = _STATIC_BODIES.setdefault(key, to_bytes(representation.as_json()))
+    return body
+
+#===============================================================================
+# message_body
+#===============================================================================
+def message_body(object_type, status, message, content_type=ContentType.JSON):
+    """Gets the encoded body of a status response with a variable message.
+
+    The representation is encoded once per content type around a
+    placeholder, so every call only encodes the message itself.
+
+    Returns:
+      The encoded body or None if the content type cannot be pre-encoded.
+    """
+    if content_type != ContentType.JSON:
+        return None
+    key = (content_type, object_type, status)
+    template = _MESSAGE_TEMPLATES.get(key)
+    if template is None:
+        representation = ResourceJSONRepresentation(object_type)
+        representation.status = status
+        representation.message = _MESSAGE_PLACEHOLDER
+        encoded = representation.as_json()
+        placeholder = json.dumps(_MESSAGE_PLACEHOLDER)
+        prefix, suffix = encoded.split(placeholder)
+        template = _MESSAGE_TEMPLATES.setdefault(key, (prefix, suffix))
+    return to_bytes(''.join([template[0], json.dumps(message), template[1]]))
+
+
+#===============================================================================
+# item_status
+#===============================================================================
+def item_status(index, result):
+    """Describes the outcome of one item of a bulk request.
+
+    Args:
+      index: The position of the item in the bulk request.
+      result: The HandlerHttpResponse or ResponseError for the item.
+
+    Returns:
+      A dictionary with the index, status code, message and URI (if any)
+      of the item.
+    """
+    if isinstance(result, HandlerHttpResponse):
+        status = {'index': index, 'status': result.status_code}
+        location = result.headers.get('Location')
+        if location is not None:
+            status['uri'] = location
+        message = getattr(result.body, 'message', None)
+        if message is None and result.encoded_body is not None:
+            message = _encoded_message(result)
+        if message is not None:
+            status['message'] = message
+        return status
+    return {'index': index, 'status': result.code, 'message': result.message}
+
+def _encoded_message(http_response):
+    """Reads the message of a pre-encoded response (see static_body),
+    which has no body representation to take it from.
+    """
+    if http_response.content_type != ContentType.JSON:
+        return None
+    try:
+        encoded = json.loads(to_native(http_response.encoded_body))
+    except ValueError:
+        return None
+    if isinstance(encoded, dict):
+        return encoded.get('message')
+    return None
+
 #===============================================================================
 # HandlerHttpResponse
 #===============================================================================
 class HandlerHttpResponse(object):
     """Represents an HTTP response wrapper for the API Server"""
-
-    # A dictionary with the headers to include in the response
-    headers = {}
-    # The HTTP status code to return
-    status_code = None
-    # The body for the response: Assume to be a ResponseObject
-    body = None
-    # The intended "Content-Type" of the response
-    _content_type = None
+    __slots__ = ('status_code', 'headers', 'body', 'encoded_body',
+                 '_content_type')
 
     @property
     def content_type(self):
@@ -66,7 +164,13 @@ class HandlerHttpResponse(object):
         self._content_type = value
         self.headers['Content-Type'] = value
 
-    def __init__(self, status_code, content_type, body="", headers={}):
+    @property
+    def headerlist(self):
+        """The headers of the response as a list of (name, value) tuples"""
+        return list(self.headers.items())
+
+    def __init__(self, status_code, content_type, body="", headers=None,
+                 encoded_body=None):
         """Creates a new HandlerHttpResponse with the given arguments
 
         Args:
@@ -74,20 +178,106 @@ class HandlerHttpResponse(object):
           content_type: The intended "Content-Type" of the response
           body: A ResourceResponse to use as the body for the response
           headers: A dictionary with the HTTP headers of the response
+          encoded_body: An already encoded body (a byte string) to send as
+                        is, instead of serializing the body again
         """
+        # The HTTP status code to return
         self.status_code = status_code
-        self.headers = headers
+        # A dictionary with the headers to include in the response
+        self.headers = dict(headers) if headers else {}
+        # The intended "Content-Type" of the response
         self.content_type = content_type
+        # The body for the response: Assume to be a ResponseObject
         self.body = body
+        # The pre-encoded body for the response (if any)
+        self.encoded_body = encoded_body
 
     def write_body(self):
         """Writes out a representation of the body of this HTTP response
-        according to the response's Content-Type
+        according to the response's Content-Type, with the encoder
+        registered for it (see pyramid_skue.encoders)
+
+        Returns:
+          The body as a byte string (text bodies are encoded as UTF-8)
         """
-        if self.content_type == ContentType.JSON:
-            return self.body.as_json()
+        if self.encoded_body is not None:
+            return self.encoded_body
+        encoder = get_encoder(self.content_type)
+        if encoder is not None:
+            return encoder(self.body)
+        return to_bytes(self.body)
+
+    @property
+    def streamable(self):
+        """True if the body is encoded a chunk at a time by iter_body"""
+        return self.encoded_body is None and self._content_type == ContentType.JSON \
+            and hasattr(self.body, 'iter_json')
+
+    def iter_body(self):
+        """Writes out the body of this HTTP response a chunk at a time when
+        it is streamable (see CollectionJSONRepresentation.iter_json), or
+        at once otherwise.
+
+        Returns:
+          An iterator of byte strings
+        """
+        if not self.streamable:
+            yield self.write_body()
+            return
+        for chunk in self.body.iter_json():
+            yield to_bytes(chunk)
+
+
+#===============================================================================
+# StreamingBody
+#===============================================================================
+class StreamingBody(object):
+    """The app_iter of a response whose body is sent while it is encoded.
+
+    It counts the bytes sent and calls back when the server closes it,
+    after the whole body was sent (or the client went away), so the
+    resources needed to encode the body (e.g. a cursor and its connection)
+    are released then.
+    """
+
+    def __init__(self, chunks):
+        """Creates a new StreamingBody
+
+        Args:
+          chunks: An iterator of byte strings
+        """
+        self.chunks = chunks
+        self.size = 0
+        self.closed = False
+        self._callback = None
+
+    def __iter__(self):
+        for chunk in self.chunks:
+            if chunk:
+                self.size += len(chunk)
+                yield chunk
+
+    def when_closed(self, callback):
+        """Sets the function to call (without arguments) once closed. It is
+        called at once if the body is already closed.
+        """
+        if self.closed:
+            callback()
         else:
-            return self.body
+            self._callback = callback
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            close = getattr(self.chunks, 'close', None)
+            if close is not None:
+                close()
+        finally:
+            callback, self._callback = self._callback, None
+            if callback is not None:
+                callback()
 
 
 #===============================================================================
@@ -95,6 +285,25 @@ class HandlerHttpResponse(object):
 #===============================================================================
 class CommonResponse(object):
 
+    @classmethod
+    def static(cls, status_code, object_type, status, message,
+               content_type=ContentType.JSON, headers=None):
+        """Creates a response whose body is encoded only once per content
+        type and then reused for every response with the same values.
+        """
+        encoded_body = static_body(object_type, status, message, content_type)
+        body = None
+        if encoded_body is None:
+            body = ResourceJSONRepresentation(object_type)
+            body.status = status
+            body.message = message
+        http_response = HandlerHttpResponse(status_code=status_code,
+                                            content_type=content_type,
+                                            body=body,
+                                            headers=headers,
+                                            encoded_body=encoded_body)
+        return http_response
+
     @classmethod
     def success(cls, body, content_type=ContentType.JSON):
         http_response = HandlerHttpResponse(status_code=200,
@@ -113,34 +322,26 @@ class CommonResponse(object):
         return http_response
 
     @classmethod
-    def options(cls, allowed_methods, body, content_type=ContentType.JSON):
+    def options(cls, allowed_methods, body, content_type=ContentType.JSON,
+                encoded_body=None):
         http_response = HandlerHttpResponse(status_code=200,
                                             content_type=content_type,
                                             body=body,
-                                            headers={"Allow": allowed_methods})
+                                            headers={"Allow": allowed_methods},
+                                            encoded_body=encoded_body)
         return http_response
 
     @classmethod
     def method_not_allowed(cls, allowed_methods,
                            content_type=ContentType.JSON):
-        body = ResourceJSONRepresentation('MethodNotAllowed')
-        body.status = "Error"
-        body.message = "Method Not Allowed"
-        http_response = HandlerHttpResponse(status_code=405,
-                                            content_type=content_type,
-                                            body=body,
-                                            headers={"Allow": allowed_methods})
-        return http_response
+        return cls.static(405, 'MethodNotAllowed', "Error",
+                          "Method Not Allowed", content_type,
+                          headers={"Allow": allowed_methods})
 
     @classmethod
     def resource_not_found(cls, content_type=ContentType.JSON):
-        body = ResourceJSONRepresentation('ResourceNotFound')
-        body.status = "Error"
-        body.message = "The resource could not be found"
-        http_response = HandlerHttpResponse(status_code=404,
-                                            content_type=content_type,
-                                            body=body)
-        return http_response
+        return cls.static(404, 'ResourceNotFound', "Error",
+                          "The resource could not be found", content_type)
 
     @classmethod
     def resource_created(cls, resource_uri, content_type=ContentType.JSON):
@@ -152,28 +353,41 @@ class CommonResponse(object):
             status_code=201,
             content_type=content_type,
             body=body,
-            headers={"Location": resource_uri.encode('ascii', 'ignore')})
+            headers={"Location": to_native(resource_uri.encode('ascii', 'ignore'))})
         return http_response
 
     @classmethod
-    def resource_creation_queued(cls, content_type=ContentType.JSON):
-        body = ResourceJSONRepresentation('Success')
+    def multi_status(cls, results, content_type=ContentType.JSON):
+        """Creates a 207 response with the status of every item of a bulk
+        request.
+
+        Args:
+          results: A list with a HandlerHttpResponse or a ResponseError
+                   per item, in the same order of the request items.
+        """
+        body = ResourceJSONRepresentation('MultiStatus')
         body.status = "OK"
-        body.message = "Successfully queued for creation"
-        http_response = HandlerHttpResponse(status_code=202,
+        body.objects = [item_status(index, result)
+                        for index, result in enumerate(results)]
+        http_response = HandlerHttpResponse(status_code=207,
                                             content_type=content_type,
                                             body=body)
         return http_response
 
+    @classmethod
+    def resource_creation_queued(cls, content_type=ContentType.JSON,
+                                 status_uri=None):
+        headers = None
+        if status_uri is not None:
+            headers = {"Location": to_native(status_uri.encode('ascii', 'ignore'))}
+        return cls.static(202, 'Success', "OK",
+                          "Successfully queued for creation", content_type,
+                          headers=headers)
+
     @classmethod
     def not_acceptable(cls, content_type=ContentType.JSON):
-        body = ResourceJSONRepresentation('NotAcceptable')
-        body.status = "Error"
-        body.message = "Not Acceptable"
-        http_response = HandlerHttpResponse(status_code=406,
-                                            content_type=content_type,
-                                            body=body)
-        return http_response
+        return cls.static(406, 'NotAcceptable', "Error", "Not Acceptable",
+                          content_type)
 
     @classmethod
     def custom_validation_error(cls, message, content_type=ContentType.JSON):
@@ -194,3 +408,8 @@ class CommonResponse(object):
                                             content_type=content_type,
                                             body=body)
         return http_response
+
+    @classmethod
+    def internal_server_error(cls, content_type=ContentType.JSON):
+        return cls.static(500, 'ServerError', "Error",
+                          "An unexpected error has occurred", content_type)
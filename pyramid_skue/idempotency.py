@@ -0,0 +1,236 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Copyright (c) 2012 The Skuë Project
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+# ***** Python built-in modules *****
+import json
+import time
+import hashlib
+import threading
+
+# ***** Application modules *****
+from .errors import IdempotencyKeyInProgressError
+
+__copyright__ = u"Copyright 2012, The Skuë Project"
+__license__ = "MIT"
+
+
+#===============================================================================
+# StoredResponse
+#===============================================================================
+class StoredResponse(object):
+    """The encoded outcome of a request made with an Idempotency-Key"""
+    __slots__ = ('status_code', 'headerlist', 'body', 'fingerprint')
+
+    def __init__(self, status_code, headerlist, body, fingerprint=None):
+        """Creates a new StoredResponse
+
+        Args:
+          status_code: The HTTP status code of the response
+          headerlist: A list of (name, value) tuples with the headers
+          body: The encoded body of the response
+          fingerprint: A digest of the request that produced the response
+        """
+        self.status_code = status_code
+        self.headerlist = headerlist
+        self.body = body
+        self.fingerprint = fingerprint
+
+
+#===============================================================================
+# request_fingerprint
+#===============================================================================
+def request_fingerprint(*values):
+    """Gets a digest of the parsed parameters of a request, to tell the
+    repetitions of a request from a different request sent with the same
+    Idempotency-Key.
+
+    The values are encoded as JSON with sorted keys. Uploaded files
+    contribute their size and SHA-256 digest, computed while they were
+    spooled, so the body is not read (or held in memory) again.
+
+    Args:
+      values: The parsed parameters. E.g. the payload of the request
+
+    Returns:
+      The hexadecimal SHA-1 digest of the values
+    """
+    encoded = json.dumps(values, sort_keys=True, default=_fingerprint_value)
+    return hashlib.sha1(encoded.encode('utf-8')).hexdigest()
+
+def _fingerprint_value(value):
+    """Converts the values JSON cannot encode (files, sets, dates)"""
+    sha256 = getattr(value, 'sha256', None)
+    if sha256 is not None:
+        return [value.size, sha256]
+    if isinstance(value, (set, frozenset)):
+        return sorted(value)
+    return u'%s' % (value,)
+
+
+#===============================================================================
+# IdempotencyStore
+#===============================================================================
+class IdempotencyStore(object):
+    """Base class for the backends that keep the stored responses.
+
+    Inheritors must implement get, set and delete. Backends shared between
+    processes (e.g. a database or memcached) make replays work across
+    workers, the wait on in-flight requests is always per process.
+    """
+
+    def get(self, key):
+        """Gets the StoredResponse of the given key or None"""
+        raise NotImplementedError
+
+    def set(self, key, stored_response, ttl):
+        """Stores the given StoredResponse for ttl seconds"""
+        raise NotImplementedError
+
+    def delete(self, key):
+        """Removes the StoredResponse of the given key (if any)"""
+        raise NotImplementedError
+
+
+#===============================================================================
+# MemoryIdempotencyStore
+#===============================================================================
+class MemoryIdempotencyStore(IdempotencyStore):
+    """A per process IdempotencyStore with a bounded number of entries"""
+
+    def __init__(self, max_entries=10000):
+        """Creates a new MemoryIdempotencyStore
+
+        Args:
+          max_entries: The maximum number of responses to keep. Expired
+                       and then oldest entries are discarded first.
+        """
+        self.max_entries = max_entries
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires, stored_response = entry
+        if expires < time.time():
+            self.delete(key)
+            return None
+        return stored_response
+
+    def set(self, key, stored_response, ttl):
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                self.__purge()
+            self._entries[key] = (time.time() + ttl, stored_response)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def __purge(self):
+        """Removes the expired entries, or the oldest half if none expired.
+        Must be called holding the lock.
+        """
+        now = time.time()
+        expired = [key for key, entry in self._entries.items() if entry[0] < now]
+        if not expired:
+            by_expiration = sorted(self._entries.items(), key=lambda item: item[1][0])
+            expired = [key for key, entry in by_expiration[:len(by_expiration) // 2 + 1]]
+        for key in expired:
+            del self._entries[key]
+
+
+#===============================================================================
+# IdempotencyManager
+#===============================================================================
+class IdempotencyManager(object):
+    """Coordinates the requests that share an Idempotency-Key.
+
+    The first request with a key executes and its response is stored.
+    Repeated requests get the stored response, and concurrent duplicates
+    wait for the request in flight instead of executing again.
+    """
+
+    def __init__(self, store=None, ttl=86400, wait_timeout=30):
+        """Creates a new IdempotencyManager
+
+        Args:
+          store: The IdempotencyStore to use. Defaults to a
+                 MemoryIdempotencyStore
+          ttl: The seconds to keep the stored responses
+          wait_timeout: The maximum seconds a duplicate waits for the
+                        request in flight before it is answered with a 409
+        """
+        self.store = store if store is not None else MemoryIdempotencyStore()
+        self.ttl = ttl
+        self.wait_timeout = wait_timeout
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    def begin(self, key):
+        """Starts a request with the given key.
+
+        Returns:
+          The StoredResponse to replay, or None if the caller must execute
+          the request and then call finish.
+
+        Raises:
+          IdempotencyKeyInProgressError: The request in flight with the key
+                                         did not finish within wait_timeout
+        """
+        while True:
+            stored_response = self.store.get(key)
+            if stored_response is not None:
+                return stored_response
+            with self._lock:
+                event = self._in_flight.get(key)
+                if event is None:
+                    # The owner may have finished since the first check
+                    stored_response = self.store.get(key)
+                    if stored_response is not None:
+                        return stored_response
+                    self._in_flight[key] = threading.Event()
+                    return None
+            event.wait(self.wait_timeout)
+            if not event.is_set():
+                # The caller is not the owner of the key, so it must not
+                # execute the request (nor call finish)
+                raise IdempotencyKeyInProgressError()
+
+    def finish(self, key, stored_response=None):
+        """Ends the request with the given key.
+
+        Args:
+          key: The key given to begin
+          stored_response: The StoredResponse to replay for repeated
+                           requests, or None to let them execute again
+        """
+        try:
+            if stored_response is not None:
+                self.store.set(key, stored_response, self.ttl)
+        finally:
+            with self._lock:
+                event = self._in_flight.pop(key, None)
+            if event is not None:
+                event.set()
@@ -0,0 +1,348 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Copyright (c) 2012 The Skuë Project
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+from __future__ import absolute_import
+
+# ***** Python built-in modules *****
+import json
+import time
+import uuid
+import sqlite3
+import logging
+import threading
+import multiprocessing
+from collections import OrderedDict
+try:
+    import Queue as queue
+except ImportError:
+    import queue
+
+# ***** Application modules *****
+from .errors import ServiceUnavailableError
+from .json.utils import ResourceJSONRepresentation
+
+__copyright__ = u"Copyright 2012, The Skuë Project"
+__license__ = "MIT"
+
+
+# The states of a job
+QUEUED = 'queued'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+
+logger = logging.getLogger(__name__)
+
+
+#===============================================================================
+# JobStore
+#===============================================================================
+class JobStore(object):
+    """Base class for the backends that persist the status of the jobs.
+
+    A job is represented as a dictionary with the keys: id, status, result,
+    error, created and updated. Results must be JSON serializable for the
+    stores that persist them.
+    """
+
+    def create(self, job_id):
+        """Registers a new job in the QUEUED state"""
+        raise NotImplementedError
+
+    def update(self, job_id, status, result=None, error=None):
+        """Changes the status of a job (and its result or error message)"""
+        raise NotImplementedError
+
+    def get(self, job_id):
+        """Gets the dictionary of the given job or None if unknown"""
+        raise NotImplementedError
+
+
+#===============================================================================
+# MemoryJobStore
+#===============================================================================
+class MemoryJobStore(JobStore):
+    """A per process JobStore that keeps the most recent jobs"""
+
+    def __init__(self, max_jobs=10000):
+        """Creates a new MemoryJobStore
+
+        Args:
+          max_jobs: The maximum number of jobs to remember. The oldest jobs
+                    are forgotten first.
+        """
+        self.max_jobs = max_jobs
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def create(self, job_id):
+        now = time.time()
+        with self._lock:
+            self._jobs[job_id] = {'id': job_id, 'status': QUEUED,
+                                  'result': None, 'error': None,
+                                  'created': now, 'updated': now}
+            while len(self._jobs) > self.max_jobs:
+                self._jobs.popitem(last=False)
+
+    def update(self, job_id, status, result=None, error=None):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job.update(status=status, result=result, error=error,
+                           updated=time.time())
+
+    def get(self, job_id):
+        job = self._jobs.get(job_id)
+        return dict(job) if job is not None else None
+
+
+#===============================================================================
+# SqliteJobStore
+#===============================================================================
+class SqliteJobStore(JobStore):
+    """A JobStore persisted in a sqlite database, so the status of the jobs
+    can be read from every process of the server.
+    """
+
+    def __init__(self, path):
+        """Creates a new SqliteJobStore
+
+        Args:
+          path: The path of the sqlite database file
+        """
+        self.path = path
+        self._local = threading.local()
+        with self._connection() as connection:
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS skue_jobs ('
+                'id TEXT PRIMARY KEY, status TEXT, result TEXT, error TEXT, '
+                'created REAL, updated REAL)')
+
+    def _connection(self):
+        """Gets the connection of the current thread"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            self._local.connection = connection
+        return connection
+
+    def create(self, job_id):
+        now = time.time()
+        with self._connection() as connection:
+            connection.execute(
+                'INSERT INTO skue_jobs (id, status, created, updated) '
+                'VALUES (?, ?, ?, ?)', (job_id, QUEUED, now, now))
+
+    def update(self, job_id, status, result=None, error=None):
+        with self._connection() as connection:
+            connection.execute(
+                'UPDATE skue_jobs SET status = ?, result = ?, error = ?, '
+                'updated = ? WHERE id = ?',
+                (status, json.dumps(result), error, time.time(), job_id))
+
+    def get(self, job_id):
+        row = self._connection().execute(
+            'SELECT id, status, result, error, created, updated '
+            'FROM skue_jobs WHERE id = ?', (job_id,)).fetchone()
+        if row is None:
+            return None
+        return {'id': row[0], 'status': row[1],
+                'result': json.loads(row[2]) if row[2] is not None else None,
+                'error': row[3], 'created': row[4], 'updated': row[5]}
+
+
+#===============================================================================
+# JobJSONRepresentation
+#===============================================================================
+class JobJSONRepresentation(ResourceJSONRepresentation):
+    """The response to show the status of a job"""
+    def __init__(self, job, fields=None):
+        ResourceJSONRepresentation.__init__(self, 'Job', fields)
+        self.id = job['id']
+        self.status = job['status']
+        self.created = job['created']
+        self.updated = job['updated']
+        if job['result'] is not None:
+            self.result = job['result']
+        if job['error'] is not None:
+            self.error = job['error']
+
+
+#===============================================================================
+# JobQueue
+#===============================================================================
+class JobQueue(object):
+    """A bounded queue of jobs executed by a pool of workers.
+
+    The workers are threads, or threads that hand the jobs to a pool of
+    processes when use_processes is True (the job functions and their
+    arguments must be picklable then). Workers start with the first job.
+    """
+
+    def __init__(self, store=None, workers=4, max_queued=100,
+                 use_processes=False):
+        """Creates a new JobQueue
+
+        Args:
+          store: The JobStore to persist the status. Defaults to a
+                 MemoryJobStore
+          workers: The number of jobs to execute at the same time
+          max_queued: The maximum number of jobs waiting to be executed.
+                      Further jobs are rejected with a 503 error.
+          use_processes: True to execute the jobs in a pool of processes
+        """
+        self.store = store if store is not None else MemoryJobStore()
+        self.workers = workers
+        self.max_queued = max_queued
+        self.use_processes = use_processes
+        self._queue = queue.Queue(maxsize=max_queued)
+        self._threads = []
+        self._pool = None
+        self._lock = threading.Lock()
+        self._submit_lock = threading.Lock()
+        self.active = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    @property
+    def depth(self):
+        """The number of jobs waiting to be executed"""
+        return self._queue.qsize()
+
+    @property
+    def metrics(self):
+        """A dictionary with the queue depth and the job counters"""
+        return {
+            'depth': self.depth,
+            'max_queued': self.max_queued,
+            'active': self.active,
+            'completed': self.completed,
+            'failed': self.failed,
+            'rejected': self.rejected,
+        }
+
+    def submit(self, function, *args, **kwargs):
+        """Queues the execution of the given function.
+
+        Returns:
+          The identifier of the new job
+
+        Raises:
+          ServiceUnavailableError: The queue is full
+        """
+        self.__start()
+        job_id = uuid.uuid4().hex
+        # Only the submitters fill the queue, so the capacity checked under
+        # the lock is still there when the job is queued. The rejected jobs
+        # never reach the store.
+        with self._submit_lock:
+            if self._queue.full():
+                with self._lock:
+                    self.rejected += 1
+                raise ServiceUnavailableError(retry_after=1)
+            self.store.create(job_id)
+            self._queue.put_nowait((job_id, function, args, kwargs))
+        return job_id
+
+    def shutdown(self, wait=True):
+        """Stops the workers once the queued jobs are done"""
+        with self._lock:
+            threads, self._threads = self._threads, []
+        # Outside the lock: the put blocks on a full queue until the
+        # workers (which take the lock when a job ends) make room
+        for thread in threads:
+            self._queue.put(None)
+        if wait:
+            for thread in threads:
+                thread.join()
+        if self._pool is not None:
+            self._pool.close()
+            if wait:
+                self._pool.join()
+            self._pool = None
+
+    def __start(self):
+        """Starts the workers (once)"""
+        if self._threads:
+            return
+        with self._lock:
+            if self._threads:
+                return
+            if self.use_processes and self._pool is None:
+                self._pool = multiprocessing.Pool(self.workers)
+            for number in range(self.workers):
+                thread = threading.Thread(target=self.__work,
+                                          name='skue-job-worker-%d' % number)
+                thread.daemon = True
+                thread.start()
+                self._threads.append(thread)
+
+    def __work(self):
+        """The loop of a worker thread"""
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            job_id, function, args, kwargs = job
+            with self._lock:
+                self.active += 1
+            try:
+                self.__update(job_id, RUNNING)
+                try:
+                    if self._pool is not None:
+                        result = self._pool.apply(function, args, kwargs)
+                    else:
+                        result = function(*args, **kwargs)
+                except Exception as error:
+                    logger.exception('Job %s failed', job_id)
+                    succeeded = False
+                    self.__update(job_id, FAILED, error=str(error))
+                else:
+                    succeeded = self.__update(job_id, SUCCEEDED, result=result)
+                    if not succeeded:
+                        # E.g. a result the store cannot serialize
+                        self.__update(job_id, FAILED,
+                                      error='The result cannot be stored.')
+                with self._lock:
+                    if succeeded:
+                        self.completed += 1
+                    else:
+                        self.failed += 1
+            finally:
+                with self._lock:
+                    self.active -= 1
+
+    def __update(self, job_id, status, result=None, error=None):
+        """Changes the status of a job in the store without letting a store
+        error kill the worker.
+
+        Returns:
+          True if the status was stored
+        """
+        try:
+            self.store.update(job_id, status, result=result, error=error)
+        except Exception:
+            logger.exception('The status of the job %s cannot be stored', job_id)
+            return False
+        return True
@@ -29,6 +29,12 @@ Created on Mar 6, 2012
 
 # ***** Python built-in modules *****
 import json
+from itertools import islice
+from operator import attrgetter, itemgetter
+
+# ***** Application modules *****
+from ..cache import CopyOnWriteDict
+from ..loaders import DeferredValue
 
 __author__ = "Greivin Lopez"
 __copyright__ = u"Copyright 2012, The Skuë Project"
@@ -40,6 +46,180 @@ __email__ = "greivin.lopez@gmail.com"
 __status__ = "Development"
 
 
+# The language of the non suffixed fields of the models
+DEFAULT_LANGUAGE = 'en'
+# Maximum number of distinct languages to cache (languages come from clients)
+MAX_CACHED_LANGUAGES = 256
+
+# Fallback chains by requested language. E.g. 'pt-BR' -> ('pt_br', 'pt')
+_LANGUAGE_CHAINS = CopyOnWriteDict(MAX_CACHED_LANGUAGES)
+# Resolved attribute names by (model class, field name, language chain)
+_LOCALIZED_FIELDS = CopyOnWriteDict(MAX_CACHED_LANGUAGES * 64)
+
+# The layouts of a CollectionJSONRepresentation
+OBJECTS_LAYOUT = 'objects'
+COLUMNS_LAYOUT = 'columns'
+# The number of rows converted to dictionaries at a time in objects layout
+ROWS_PER_CHUNK = 500
+
+
+#===============================================================================
+# language_chain
+#===============================================================================
+def language_chain(language):
+    """Gets the fallback chain of field suffixes for a requested language.
+
+    The language is normalized to lower case with underscores and then
+    shortened one subtag at a time, until reaching the default language,
+    which is represented by the non suffixed fields. E.g. 'pt-BR' gives
+    ('pt_br', 'pt') meaning: try field_pt_br, then field_pt, then field.
+
+    Args:
+      language: The language requested by the client. E.g. 'pt-BR'
+
+    Returns:
+      A tuple with the suffixes to try in order.
+    """
+    chain = _LANGUAGE_CHAINS.get(language)
+    if chain is None:
+        suffixes = []
+        code = (language or DEFAULT_LANGUAGE).strip().lower().replace('-', '_')
+        while code and code != DEFAULT_LANGUAGE:
+            suffixes.append(code)
+            code = code.rpartition('_')[0]
+        chain = tuple(suffixes)
+        _LANGUAGE_CHAINS[language] = chain
+    return chain
+
+#===============================================================================
+# localized_field_names
+#===============================================================================
+def localized_field_names(obj, field_names, language):
+    """Resolves the attribute to read for each field in the given language.
+
+    The resolution is done once per (model class, field, language) using the
+    given object as the sample, so all the objects of a class are expected
+    to expose the same localized attributes (as ORM models do).
+
+    Args:
+      obj: An object of the model class to resolve the fields for.
+      field_names: The names of the non localized fields.
+      language: The language requested by the client.
+
+    Returns:
+      A list with the attribute names to read, in the same order.
+    """
+    chain = language_chain(language)
+    if not chain:
+        return list(field_names)
+    model_class = type(obj)
+    names = []
+    for field_name in field_names:
+        key = (model_class, field_name, chain)
+        name = _LOCALIZED_FIELDS.get(key)
+        if name is None:
+            name = field_name
+            for suffix in chain:
+                localized_field = ''.join([field_name, '_', suffix])
+                if hasattr(obj, localized_field):
+                    name = localized_field
+                    break
+            _LOCALIZED_FIELDS[key] = name
+        names.append(name)
+    return names
+
+#===============================================================================
+# localize_objects
+#===============================================================================
+def localize_objects(objects, field_names, language):
+    """Builds the localized dictionaries for a sequence of objects.
+
+    The localized attribute names are resolved once per model class and
+    then read from every object with a single compiled getter.
+
+    Args:
+      objects: The sequence of objects to represent.
+      field_names: The names of the fields to include for every object.
+      language: The language requested by the client.
+
+    Returns:
+      A list with a dictionary of field name -> localized value per object.
+    """
+    field_names = list(field_names)
+    if not field_names:
+        return [{} for obj in objects]
+    output = []
+    getters = {}
+    for obj in objects:
+        model_class = type(obj)
+        getter = getters.get(model_class)
+        if getter is None:
+            names = localized_field_names(obj, field_names, language)
+            getter = attrgetter(*names)
+            getters[model_class] = getter
+        values = getter(obj)
+        if len(field_names) == 1:
+            values = (values,)
+        output.append(dict(zip(field_names, values)))
+    return output
+
+
+#===============================================================================
+# parse_fields
+#===============================================================================
+def parse_fields(value):
+    """Parses the value of the fields parameter (a sparse fieldset).
+
+    Args:
+      value: The comma separated field names. E.g. 'id,name,price'
+
+    Returns:
+      A frozenset with the field names, or None to include all the fields
+    """
+    fields = frozenset([name.strip() for name in value.split(',') if name.strip()])
+    return fields or None
+
+
+#===============================================================================
+# representation_fields
+#===============================================================================
+def representation_fields(obj):
+    """Gets the encodable fields of a ResourceJSONRepresentation.
+
+    Used by the JSON encoder and by the encoders of the other media types
+    (see pyramid_skue.encoders) so every representation encodes the same.
+
+    Returns:
+      A dictionary with the value of each encoded field by name
+    """
+    encodable_fields = getattr(obj, '_encodable_fields', None)
+    if encodable_fields is not None:
+        # The representation knows how to select its fields
+        return encodable_fields()
+    response = {}
+    fields = getattr(obj, '_fields', None)
+    # The sparse fieldset of a collection envelope selects the fields of
+    # its objects instead
+    envelope = fields is not None and isinstance(getattr(obj, 'objects', None), list)
+    if fields is not None and not envelope:
+        # Only the fields selected by the client (sparse fieldset)
+        for field in fields:
+            if not field.startswith('_') and not field in obj.exclude \
+                    and hasattr(obj, field):
+                response[field] = getattr(obj, field)
+        return response
+    for field in dir(obj):
+        if not field.startswith('_') and not field in obj.exclude:
+            response[field] = getattr(obj, field)
+    if envelope:
+        # The representations among the objects apply their own fieldset
+        response['objects'] = [
+            dict([(key, value) for key, value in item.items() if key in fields])
+            if isinstance(item, dict) else item
+            for item in response['objects']]
+    return response
+
+
 #===============================================================================
 # ResourceJSONEncoder
 #===============================================================================
@@ -47,11 +227,9 @@ class ResourceJSONEncoder(json.JSONEncoder):
     '''Custom JSON Encoder to serialize complex objects'''
     def default(self, obj):
         if isinstance(obj, ResourceJSONRepresentation):
-            response = {}
-            for field in dir(obj):
-                if not field.startswith('_') and not field in obj.exclude:
-                    response[field] = getattr(obj, field)
-            return response
+            return representation_fields(obj)
+        if isinstance(obj, DeferredValue):
+            return obj.get()
         return json.JSONEncoder.default(self, obj)
 
 #===============================================================================
@@ -60,10 +238,13 @@ class ResourceJSONEncoder(json.JSONEncoder):
 class ResourceJSONRepresentation(object):
     '''Base class to extend when creating objects to be serialized as JSON
     for HTTP response bodies'''
-    def __init__(self, object_type):
+    def __init__(self, object_type, fields=None):
         self._object_type = object_type
+        # The field names selected by the client, None for all the fields
+        self._fields = fields
         # Members to exclude when encoding
-        self.exclude = ['exclude', 'as_json', 'is_http_error', 'get_localized']
+        self.exclude = ['exclude', 'as_json', 'is_http_error', 'get_localized',
+                        'get_localized_objects', 'wants', 'selected']
 
     def as_json(self):
         return json.dumps(self, cls=ResourceJSONEncoder)
@@ -73,9 +254,191 @@ class ResourceJSONRepresentation(object):
         return False
 
     def get_localized(self, obj, field_name, language):
-        if language != 'en':
-            localized_field = ''.join([field_name, '_', language])
-            if hasattr(obj, localized_field):
-                return getattr(obj, localized_field)
+        if language != DEFAULT_LANGUAGE:
+            field_name = localized_field_names(obj, (field_name,), language)[0]
         return getattr(obj, field_name)
 
+    def get_localized_objects(self, objects, field_names, language):
+        """Gets the localized dictionaries of the given objects.
+
+        @see: localize_objects
+        """
+        return localize_objects(objects, field_names, language)
+
+    def wants(self, field_name):
+        """Indicates if the client selected the given field.
+
+        Check it before computing an expensive field, the fields that are
+        not selected are not encoded anyway.
+        """
+        return self._fields is None or field_name in self._fields
+
+    def selected(self, field_names):
+        """Gets the given field names that the client selected, in order.
+        E.g. to read only those from the models with get_localized_objects.
+        """
+        if self._fields is None:
+            return list(field_names)
+        return [name for name in field_names if name in self._fields]
+
+#===============================================================================
+# CollectionJSONRepresentation
+#===============================================================================
+class CollectionJSONRepresentation(ResourceJSONRepresentation):
+    """A collection of rows taken straight from a database cursor, with the
+    column names given once instead of a dictionary per item.
+
+    In the objects layout the JSON output is the usual list of objects:
+    {"objects": [{"id": 1, ...}, ...], "offset": 0, "count": 100}. In the
+    columns layout it is {"columns": ["id", ...], "rows": [[1, ...], ...],
+    ...}, which is smaller on the wire. Both are encoded by iter_json a
+    chunk of ROWS_PER_CHUNK rows at a time while the cursor is read, so a
+    page is never held in memory as a whole. Any other public attribute is
+    encoded next to the items, like offset and count.
+
+    The objects property converts every row at once (e.g. to expand the
+    relations of the items) and the encoders use those objects afterwards.
+    """
+
+    # The fields that hold the items, encoded apart from the metadata
+    _ITEM_FIELDS = frozenset(['columns', 'objects', 'rows'])
+
+    def __init__(self, columns, rows, object_type='Collection',
+                 layout=OBJECTS_LAYOUT, offset=None, count=None, total=None,
+                 fields=None):
+        """Creates a new CollectionJSONRepresentation
+
+        Args:
+          columns: The names of the columns. E.g. from cursor.description
+          rows: The sequence of row tuples (a cursor is read once)
+          object_type: The type of the represented objects
+          layout: OBJECTS_LAYOUT or COLUMNS_LAYOUT
+          offset: The offset of the page (optional)
+          count: The maximum size of the page (optional)
+          total: The total number of items of the collection (optional)
+          fields: The columns selected by the client (sparse fieldset)
+        """
+        ResourceJSONRepresentation.__init__(self, object_type, fields)
+        self._columns = list(columns)
+        self._rows = rows
+        self._objects = None
+        self._layout = layout
+        if offset is not None:
+            self.offset = offset
+        if count is not None:
+            self.count = count
+        if total is not None:
+            self.total = total
+        self.exclude.append('iter_json')
+
+    @property
+    def columns(self):
+        """The list of column names"""
+        return self._columns
+
+    @property
+    def rows(self):
+        """The row tuples (a cursor is read once)"""
+        return self._rows
+
+    @property
+    def objects(self):
+        """The rows as dictionaries with every column. They are built on
+        first use and kept, so the changes made to them (e.g. the expanded
+        relations) are encoded.
+        """
+        if self._objects is None:
+            columns = self._columns
+            self._objects = [dict(zip(columns, row)) for row in self._rows]
+        return self._objects
+
+    def as_json(self):
+        return ''.join(self.iter_json())
+
+    def iter_json(self):
+        """Encodes the collection as JSON, a chunk of rows at a time"""
+        encode = ResourceJSONEncoder().encode
+        if self._layout == COLUMNS_LAYOUT:
+            columns, project = self.__projection()
+            head = '{"columns": %s, "rows": [' % encode(columns)
+            items = self._rows if project is None else (project(row) for row in self._rows)
+        else:
+            head = '{"objects": ['
+            items = self.__iter_objects()
+        metadata = self.__metadata()
+        tail = ', ' + encode(metadata)[1:] if metadata else '}'
+        separator = ''
+        for chunk in _chunks(items, ROWS_PER_CHUNK):
+            # Without the enclosing brackets of the list
+            yield head + separator + encode(chunk)[1:-1]
+            head, separator = '', ', '
+        yield head + ']' + tail
+
+    def _encodable_fields(self):
+        """Gets the encodable fields for the encoders that don't stream
+        (see representation_fields)
+        """
+        response = self.__metadata()
+        if self._layout == COLUMNS_LAYOUT:
+            columns, project = self.__projection()
+            response['columns'] = columns
+            if project is None:
+                response['rows'] = list(self._rows)
+            else:
+                response['rows'] = [project(row) for row in self._rows]
+        else:
+            response['objects'] = list(self.__iter_objects())
+        return response
+
+    def __metadata(self):
+        """Gets the public attributes other than the items, e.g. offset"""
+        metadata = {}
+        for field in dir(self):
+            if not field.startswith('_') and not field in self.exclude \
+                    and not field in self._ITEM_FIELDS:
+                metadata[field] = getattr(self, field)
+        return metadata
+
+    def __projection(self):
+        """Gets the columns selected by the client and the function that
+        takes their values from a row, or None if every column is selected
+        """
+        columns = self._columns
+        if self._fields is None:
+            return columns, None
+        indexes = [index for index, column in enumerate(columns) if column in self._fields]
+        if len(indexes) == len(columns):
+            return columns, None
+        if len(indexes) == 1:
+            index = indexes[0]
+            project = lambda row: (row[index],)
+        elif indexes:
+            project = itemgetter(*indexes)
+        else:
+            project = lambda row: ()
+        return [columns[index] for index in indexes], project
+
+    def __iter_objects(self):
+        """Iterates the objects to encode, with the selected columns"""
+        if self._objects is not None:
+            if self._fields is None:
+                return iter(self._objects)
+            # The keys that are not columns (e.g. expanded relations) stay
+            dropped = frozenset(self._columns).difference(self._fields)
+            return (dict([(key, value) for key, value in item.items()
+                          if key not in dropped])
+                    for item in self._objects)
+        columns, project = self.__projection()
+        if project is None:
+            return (dict(zip(columns, row)) for row in self._rows)
+        return (dict(zip(columns, project(row))) for row in self._rows)
+
+
+def _chunks(iterable, size):
+    """Splits an iterable in lists of the given size (the last may be shorter)"""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
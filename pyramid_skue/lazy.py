@@ -0,0 +1,216 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Copyright (c) 2012 The Skuë Project
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+# ***** Python built-in modules *****
+import os
+import sys
+import time
+import logging
+import threading
+import subprocess
+
+# ***** Pyramid modules *****
+from pyramid.path import DottedNameResolver
+from pyramid.settings import asbool
+from pyramid.events import ApplicationCreated
+
+# ***** Application modules *****
+from .cache import CopyOnWriteDict
+from .rest.api import ResourcePlan
+from .rest.resources import RESOURCE_PLANS, describe_resource_class
+
+__copyright__ = u"Copyright 2012, The Skuë Project"
+__license__ = "MIT"
+
+
+# The seconds spent importing each lazy resource by dotted name
+IMPORT_PROFILE = CopyOnWriteDict()
+
+logger = logging.getLogger(__name__)
+
+
+#===============================================================================
+# LazyResource
+#===============================================================================
+class LazyResource(object):
+    """A Pyramid view that imports its resource class on the first request.
+
+    The resource module (and everything it imports, like ORM models) is
+    not loaded at startup, which keeps the boot time of the workers low.
+    """
+
+    def __init__(self, dotted_name):
+        """Creates a new LazyResource
+
+        Args:
+          dotted_name: The dotted name of the resource class.
+                       E.g. 'your_app.api.resources.MessageResource'
+        """
+        self.dotted_name = dotted_name
+        self._resource_class = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self):
+        """True once the resource class has been imported"""
+        return self._resource_class is not None
+
+    @property
+    def resource_class(self):
+        """The resource class, imported (and its plan compiled) on first use"""
+        if self._resource_class is None:
+            with self._lock:
+                if self._resource_class is None:
+                    started = time.time()
+                    resource_class = DottedNameResolver().resolve(self.dotted_name)
+                    IMPORT_PROFILE[self.dotted_name] = time.time() - started
+                    description = describe_resource_class(resource_class)
+                    RESOURCE_PLANS[resource_class] = ResourcePlan(description)
+                    self._resource_class = resource_class
+        return self._resource_class
+
+    def __call__(self, request):
+        return self.resource_class(request)()
+
+#===============================================================================
+# add_skue_lazy_resource
+#===============================================================================
+def add_skue_lazy_resource(config, dotted_name, pattern, route_name=None,
+                           **view_options):
+    """Registers a resource by dotted name without importing it.
+
+    The pattern must be given since the description of the resource is not
+    available until the resource is imported, on the first matching
+    request (or by the pre-warm thread, see the 'skue.lazy_prewarm'
+    setting). Lazy resources are not part of add_skue_api_documentation.
+
+    Args:
+      dotted_name: The dotted name of the resource class
+      pattern: The route pattern. E.g. '/api/message'
+      route_name: The name of the route. Defaults to the class name
+      view_options: Extra arguments for config.add_view
+    """
+    if route_name is None:
+        route_name = dotted_name.rpartition('.')[2].rpartition(':')[2]
+    view = LazyResource(dotted_name)
+    config.add_route(route_name, pattern)
+    config.add_view(view, route_name=route_name, **view_options)
+
+    registry = config.registry
+    if not hasattr(registry, 'skue_lazy_resources'):
+        registry.skue_lazy_resources = []
+        config.add_subscriber(start_prewarm_on_startup, ApplicationCreated)
+    registry.skue_lazy_resources.append(view)
+
+#===============================================================================
+# prewarm
+#===============================================================================
+def prewarm(lazy_resources):
+    """Imports the given lazy resources that are not loaded yet"""
+    for lazy_resource in lazy_resources:
+        try:
+            lazy_resource.resource_class
+        except Exception:
+            logger.exception('Cannot import the resource %s',
+                             lazy_resource.dotted_name)
+
+#===============================================================================
+# start_prewarm
+#===============================================================================
+def start_prewarm(registry):
+    """Imports the lazy resources of the registry in a background thread.
+
+    Returns:
+      The started daemon thread
+    """
+    lazy_resources = list(getattr(registry, 'skue_lazy_resources', []))
+    thread = threading.Thread(target=prewarm, args=(lazy_resources,),
+                              name='skue-prewarm')
+    thread.daemon = True
+    thread.start()
+    return thread
+
+#===============================================================================
+# start_prewarm_on_startup
+#===============================================================================
+def start_prewarm_on_startup(event):
+    """ApplicationCreated subscriber that starts the pre-warm thread when the
+    'skue.lazy_prewarm' setting is true.
+
+    With 'skue.prefork' the lazy resources are imported by the master before
+    forking instead (see pyramid_skue.prefork), and no thread is started: a
+    thread running across the fork could leave its locks held in the workers.
+    """
+    registry = event.app.registry
+    settings = registry.settings or {}
+    if asbool(settings.get('skue.lazy_prewarm', False)) \
+            and not asbool(settings.get('skue.prefork', False)):
+        start_prewarm(registry)
+
+#===============================================================================
+# measure_cold_import
+#===============================================================================
+def measure_cold_import(module_name):
+    """Measures the seconds to import a module in a fresh interpreter.
+
+    Args:
+      module_name: The name of the module. E.g. 'pyramid_skue.rest.resources'
+
+    Returns:
+      The seconds spent importing the module (and its dependencies)
+    """
+    code = ('import time; started = time.time(); import %s; '
+            'print(time.time() - started)' % module_name)
+    # The fresh interpreter must find the same modules than this one
+    environment = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+    output = subprocess.check_output([sys.executable, '-c', code],
+                                     env=environment)
+    return float(output.strip())
+
+#===============================================================================
+# import_profile
+#===============================================================================
+def import_profile(registry=None, cold=False):
+    """Reports the import time of pyramid_skue and of the lazy resources.
+
+    Args:
+      registry: The Pyramid registry with the lazy resources
+      cold: True to measure each lazy resource module in a fresh
+            interpreter, instead of reporting only the resources already
+            imported by this process
+
+    Returns:
+      A list of (name, seconds) tuples, slowest first
+    """
+    profile = {'pyramid_skue': measure_cold_import('pyramid_skue.config')}
+    for lazy_resource in getattr(registry, 'skue_lazy_resources', []):
+        name = lazy_resource.dotted_name
+        if cold:
+            if ':' in name:
+                module_name = name.partition(':')[0]
+            else:
+                module_name = name.rpartition('.')[0]
+            profile[name] = measure_cold_import(module_name)
+        elif name in IMPORT_PROFILE:
+            profile[name] = IMPORT_PROFILE[name]
+    return sorted(profile.items(), key=lambda item: item[1], reverse=True)
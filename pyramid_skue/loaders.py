@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Copyright (c) 2012 The Skuë Project
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+__copyright__ = u"Copyright 2012, The Skuë Project"
+__license__ = "MIT"
+
+
+#===============================================================================
+# DeferredValue
+#===============================================================================
+class DeferredValue(object):
+    """A value that a BatchLoader resolves when it is first read.
+
+    The encoders resolve the deferred values found in the representations,
+    so all the keys registered while building a response are fetched in a
+    single batch.
+    """
+    __slots__ = ('loader', 'key')
+
+    def __init__(self, loader, key):
+        self.loader = loader
+        self.key = key
+
+    def get(self):
+        """Gets the value (fetching the pending keys of the loader)"""
+        return self.loader.get(self.key)
+
+
+#===============================================================================
+# BatchLoader
+#===============================================================================
+class BatchLoader(object):
+    """Collects the keys requested while a response is built and fetches
+    them with one call per batch instead of one lookup per key.
+
+    Results are memoized, so a key is fetched at most once per loader. Use
+    one loader per request (see RestResource.loader).
+    """
+
+    def __init__(self, batch_function, max_batch_size=None):
+        """Creates a new BatchLoader
+
+        Args:
+          batch_function: A function that takes a list of unique keys and
+                          returns a dictionary with the value of each found
+                          key. Missing keys are loaded as None.
+          max_batch_size: The maximum number of keys per call (optional)
+        """
+        self.batch_function = batch_function
+        self.max_batch_size = max_batch_size
+        self._values = {}
+        self._pending = []
+        self._pending_set = set()
+        # The number of calls to the batch function
+        self.batches = 0
+
+    def prime(self, keys):
+        """Registers keys to fetch with the next batch"""
+        for key in keys:
+            if key is not None and key not in self._values \
+                    and key not in self._pending_set:
+                self._pending_set.add(key)
+                self._pending.append(key)
+
+    def load(self, key):
+        """Registers a key and returns its DeferredValue"""
+        self.prime((key,))
+        return DeferredValue(self, key)
+
+    def get(self, key):
+        """Gets the value of a key, fetching the pending keys if needed"""
+        if key is None:
+            return None
+        if key not in self._values:
+            self.prime((key,))
+            self.dispatch()
+        return self._values.get(key)
+
+    def get_many(self, keys):
+        """Gets a dictionary with the value of each given key"""
+        keys = list(keys)
+        self.prime(keys)
+        self.dispatch()
+        return dict([(key, self._values.get(key)) for key in keys])
+
+    def dispatch(self):
+        """Fetches the pending keys"""
+        while self._pending:
+            size = self.max_batch_size or len(self._pending)
+            keys, self._pending = self._pending[:size], self._pending[size:]
+            self._pending_set.difference_update(keys)
+            self.batches += 1
+            found = self.batch_function(keys) or {}
+            for key in keys:
+                self._values[key] = found.get(key)
+
+    def clear(self):
+        """Forgets the memoized values"""
+        self._values.clear()
@@ -0,0 +1,262 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Copyright (c) 2012 The Skuë Project
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+# ***** Python built-in modules *****
+import gc
+import os
+import logging
+
+# ***** Pyramid modules *****
+from pyramid.settings import asbool
+
+# ***** Application modules *****
+from .errors import ParameterMissedError, ServiceUnavailableError
+from .errors import GatewayTimeoutError
+from .encoders import ENCODERS, get_decoder
+from .http import CommonResponse
+from .json.utils import ResourceJSONRepresentation
+from .lazy import prewarm
+from .rest.resources import RESOURCE_PLANS
+
+__copyright__ = u"Copyright 2012, The Skuë Project"
+__license__ = "MIT"
+
+
+logger = logging.getLogger(__name__)
+
+# The fields of /proc/<pid>/smaps(_rollup) with the memory of no other process
+_PRIVATE_FIELDS = ('Private_Clean:', 'Private_Dirty:')
+
+# True once the fork hooks that freeze and enable the collector are set
+# (they cannot be removed)
+_FORK_HOOKS_REGISTERED = False
+
+# The process that ran prefork and its unique memory after the warm up,
+# inherited by the workers as their baseline (see worker_report)
+_PREFORK_PID = None
+_PREFORK_USS = None
+
+
+#===============================================================================
+# warm_up
+#===============================================================================
+def warm_up(registry):
+    """Builds in this process what the workers would otherwise build on
+    their first requests: the lazy resources and their plans (descriptions,
+    compiled coercers, caching headers and OPTIONS bodies), the encoded
+    bodies of the common responses and the encoders and decoders of every
+    registered media type (with the modules they import on first use).
+
+    The plans of the resources registered with add_skue_resource and the
+    API documentation body are already compiled when the configuration is
+    committed.
+
+    Args:
+      registry: The Pyramid registry of the application
+
+    Returns:
+      The number of compiled resource plans
+    """
+    prewarm(list(getattr(registry, 'skue_lazy_resources', [])))
+    # The static bodies and the error message template
+    CommonResponse.method_not_allowed('OPTIONS')
+    CommonResponse.resource_not_found()
+    CommonResponse.not_acceptable()
+    CommonResponse.internal_server_error()
+    CommonResponse.resource_creation_queued()
+    ServiceUnavailableError().get_http_response()
+    GatewayTimeoutError().get_http_response()
+    ParameterMissedError('id').get_http_response()
+    # A round trip through every encoder and decoder
+    sample = ResourceJSONRepresentation('Sample')
+    sample.message = u'sample'
+    sample.objects = [{'id': 1, 'ratio': 0.5, 'enabled': True}]
+    for media_type, encoder in list(ENCODERS.items()):
+        body = encoder(sample)
+        decoder = get_decoder(media_type)
+        if decoder is not None:
+            decoder(body)
+    return len(RESOURCE_PLANS)
+
+#===============================================================================
+# disable_gc
+#===============================================================================
+def disable_gc():
+    """Disables the garbage collector of the master process, so the
+    collections don't leave freed holes in the pages the workers will share
+    (see freeze). It is enabled again in the workers right after the fork,
+    or on the first request served by the master if it never forks (see
+    enable_gc_without_fork).
+
+    Only done where gc.freeze is available (Python 3.7+).
+
+    Returns:
+      True if the collector was disabled
+    """
+    if not hasattr(gc, 'freeze'):
+        return False
+    gc.disable()
+    return True
+
+#===============================================================================
+# freeze
+#===============================================================================
+def freeze():
+    """Moves every object to the permanent generation (gc.freeze, Python
+    3.7+), so the garbage collector of the forked workers doesn't write to
+    the pages shared with the master.
+
+    There is no collection first: it would free objects all over the heap
+    and the holes would be filled (and the pages copied) by the workers.
+    The objects created afterwards are frozen again right before each fork
+    and the workers enable the collector after it (os.register_at_fork).
+
+    Returns:
+      The number of frozen objects, or None if gc.freeze is not available
+    """
+    global _FORK_HOOKS_REGISTERED
+    if not hasattr(gc, 'freeze'):
+        return None
+    gc.freeze()
+    if not _FORK_HOOKS_REGISTERED:
+        os.register_at_fork(before=gc.freeze, after_in_child=gc.enable)
+        _FORK_HOOKS_REGISTERED = True
+    return gc.get_freeze_count()
+
+#===============================================================================
+# prefork
+#===============================================================================
+def prefork(app):
+    """Prepares the master process of a pre-fork server before it forks the
+    workers: warms the application up and freezes the objects, so the
+    workers share them copy on write instead of building their own.
+
+    Call it in the master once the application is loaded. E.g. in the
+    when_ready hook of gunicorn with preload_app, or set 'skue.prefork' to
+    true to run it when the application is created. The garbage collector
+    stays disabled from the freeze until the fork (see disable_gc).
+
+    Args:
+      app: The Pyramid router (or its registry)
+
+    Returns:
+      A dictionary with the number of plans and frozen objects and the
+      unique memory of the master before and after
+    """
+    global _PREFORK_PID, _PREFORK_USS
+    registry = getattr(app, 'registry', app)
+    before = unique_memory()
+    plans = warm_up(registry)
+    disable_gc()
+    frozen = freeze()
+    report = {
+        'plans': plans,
+        'frozen': frozen,
+        'uss_before': before,
+        'uss_after': unique_memory(),
+    }
+    _PREFORK_PID = os.getpid()
+    _PREFORK_USS = report['uss_after']
+    logger.info('Pre-fork warm up: %(plans)s plans, %(frozen)s frozen objects, '
+                'USS %(uss_before)s -> %(uss_after)s bytes', report)
+    return report
+
+#===============================================================================
+# worker_report
+#===============================================================================
+def worker_report():
+    """Logs the unique memory (USS) of a forked worker next to the one of
+    the master after the warm up, i.e. how much of the shared heap the
+    worker has copied so far.
+
+    Call it in the workers. E.g. in the post_request hook of gunicorn every
+    so many requests.
+
+    Returns:
+      A dictionary with the pid and the unique memory of the worker and
+      the unique memory of the master after the warm up (None if prefork
+      did not run)
+    """
+    report = {
+        'pid': os.getpid(),
+        'uss': unique_memory(),
+        'master_uss': _PREFORK_USS,
+    }
+    logger.info('Worker %(pid)s: USS %(uss)s bytes (master after the warm up: '
+                '%(master_uss)s bytes)', report)
+    return report
+
+#===============================================================================
+# enable_gc_without_fork
+#===============================================================================
+def enable_gc_without_fork(event):
+    """NewRequest subscriber that enables the garbage collector again when
+    the process that ran prefork serves requests itself (e.g. pserve,
+    gunicorn without preload_app or uWSGI with lazy-apps), since no fork
+    will enable it. The workers forked from it are not affected.
+    """
+    if os.getpid() == _PREFORK_PID and not gc.isenabled():
+        logger.warning('No fork followed the pre-fork warm up, enabling the '
+                       'garbage collector again')
+        gc.enable()
+
+#===============================================================================
+# prefork_on_startup
+#===============================================================================
+def prefork_on_startup(event):
+    """ApplicationCreated subscriber that runs prefork when the
+    'skue.prefork' setting is true.
+    """
+    registry = event.app.registry
+    settings = registry.settings or {}
+    if asbool(settings.get('skue.prefork', False)):
+        prefork(registry)
+
+#===============================================================================
+# unique_memory
+#===============================================================================
+def unique_memory(pid=None):
+    """Gets the unique set size (USS) of a process: the memory that would
+    be freed if the process exited, i.e. its private pages. The pages of a
+    forked worker still shared with the master are not counted.
+
+    Reads /proc/<pid>/smaps_rollup (Linux 4.14+) or /proc/<pid>/smaps.
+
+    Args:
+      pid: The process identifier. Defaults to the current process
+
+    Returns:
+      The size in bytes, or None if the platform doesn't provide it
+    """
+    base = '/proc/%s/' % (pid or os.getpid())
+    for name in ('smaps_rollup', 'smaps'):
+        try:
+            with open(base + name) as smaps:
+                total = 0
+                for line in smaps:
+                    if line.startswith(_PRIVATE_FIELDS):
+                        total += int(line.split()[1])
+                return total * 1024
+        except (IOError, OSError):
+            continue
+    return None
@@ -0,0 +1,277 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Copyright (c) 2012 The Skuë Project
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+# ***** Python built-in modules *****
+import time
+import logging
+import importlib
+import threading
+import multiprocessing
+try:
+    import Queue as queue
+except ImportError:
+    import queue
+
+# ***** Application modules *****
+from .errors import ResponseError, ServiceUnavailableError, GatewayTimeoutError
+
+__copyright__ = u"Copyright 2012, The Skuë Project"
+__license__ = "MIT"
+
+
+# The process pool shared by the resources of this process
+_POOL = None
+_POOL_LOCK = threading.Lock()
+
+logger = logging.getLogger(__name__)
+
+
+#===============================================================================
+# RemoteResponseError
+#===============================================================================
+class RemoteResponseError(ResponseError):
+    """A ResponseError raised in a pool process and sent back to the web
+    process (the original error classes may not be picklable).
+    """
+
+    def __init__(self, code, message, headers=None):
+        ResponseError.__init__(self, code)
+        self._message = message
+        self.headers = headers
+
+    @property
+    def message(self):
+        return self._message
+
+    def __reduce__(self):
+        return (RemoteResponseError, (self.code, self._message, self.headers))
+
+
+#===============================================================================
+# ProcessPool
+#===============================================================================
+class ProcessPool(object):
+    """A pool of worker processes that run one task at a time each.
+
+    Unlike multiprocessing.Pool, the worker of a task that takes longer
+    than its timeout is terminated and replaced, so the tasks that never
+    end cannot leave the pool without free workers.
+    """
+
+    def __init__(self, size=None):
+        """Creates a new ProcessPool and starts its workers
+
+        Args:
+          size: The number of worker processes, defaults to the number of
+                CPUs
+        """
+        self.size = size or multiprocessing.cpu_count()
+        self._idle = queue.Queue()
+        self._workers = set()
+        self._lock = threading.Lock()
+        self._closed = False
+        for _ in range(self.size):
+            self._idle.put(self.__spawn())
+
+    def apply(self, function, args=(), timeout=None):
+        """Executes function(*args) in a worker and waits for its result.
+
+        Args:
+          function: A picklable (module level) function
+          args: The picklable arguments of the function
+          timeout: The maximum seconds to wait for a free worker and the
+                   result, or None to wait forever
+
+        Raises:
+          GatewayTimeoutError: The result is not ready in time. The worker
+                               is replaced.
+          ServiceUnavailableError: The pool is closed or the worker died
+        """
+        deadline = time.time() + timeout if timeout is not None else None
+        if self._closed:
+            raise ServiceUnavailableError()
+        try:
+            worker = self._idle.get(timeout=self.__remaining(deadline))
+        except queue.Empty:
+            raise GatewayTimeoutError()
+        process, connection = worker
+        healthy = False
+        try:
+            try:
+                connection.send((function, args))
+                if not connection.poll(self.__remaining(deadline)):
+                    raise GatewayTimeoutError()
+                succeeded, value = connection.recv()
+            except (EOFError, IOError, OSError):
+                # The worker died (or was terminated by shutdown)
+                raise ServiceUnavailableError()
+            healthy = True
+        finally:
+            if healthy:
+                self._idle.put(worker)
+            else:
+                self.__replace(worker)
+        if not succeeded:
+            raise value
+        return value
+
+    def shutdown(self):
+        """Terminates the workers"""
+        with self._lock:
+            self._closed = True
+            workers, self._workers = self._workers, set()
+        for process, connection in workers:
+            process.terminate()
+            process.join()
+            connection.close()
+
+    def __spawn(self):
+        """Starts a new worker process"""
+        connection, child_connection = multiprocessing.Pipe()
+        process = multiprocessing.Process(target=_work, args=(child_connection,),
+                                          name='skue-process-worker')
+        process.daemon = True
+        process.start()
+        child_connection.close()
+        worker = (process, connection)
+        with self._lock:
+            self._workers.add(worker)
+        return worker
+
+    def __replace(self, worker):
+        """Terminates the given worker and starts a new one in its place"""
+        with self._lock:
+            self._workers.discard(worker)
+            closed = self._closed
+        process, connection = worker
+        process.terminate()
+        process.join()
+        connection.close()
+        if closed:
+            return
+        try:
+            self._idle.put(self.__spawn())
+        except OSError:
+            logger.exception('The replacement of a worker process cannot be started')
+
+    @staticmethod
+    def __remaining(deadline):
+        """The seconds until the deadline (None without deadline)"""
+        if deadline is None:
+            return None
+        return max(deadline - time.time(), 0)
+
+#===============================================================================
+# _work
+#===============================================================================
+def _work(connection):
+    """The loop of a worker process of a ProcessPool"""
+    while True:
+        try:
+            function, args = connection.recv()
+        except (EOFError, KeyboardInterrupt):
+            return
+        try:
+            result = (True, function(*args))
+        except Exception as error:
+            result = (False, error)
+        try:
+            connection.send(result)
+        except Exception as error:
+            # E.g. a result or an error that cannot be pickled
+            connection.send((False, RuntimeError(
+                'The result of %s cannot be sent back: %s' % (function.__name__, error))))
+
+#===============================================================================
+# get_process_pool
+#===============================================================================
+def get_process_pool(size=None):
+    """Gets the process pool shared by the resources, creating it on the
+    first call.
+
+    Args:
+      size: The number of processes of the pool. Only used on creation,
+            defaults to the number of CPUs.
+    """
+    global _POOL
+    if _POOL is None:
+        with _POOL_LOCK:
+            if _POOL is None:
+                _POOL = ProcessPool(size)
+    return _POOL
+
+#===============================================================================
+# shutdown_process_pool
+#===============================================================================
+def shutdown_process_pool():
+    """Terminates the shared process pool (if created)"""
+    global _POOL
+    with _POOL_LOCK:
+        pool, _POOL = _POOL, None
+    if pool is not None:
+        pool.shutdown()
+
+#===============================================================================
+# run_action
+#===============================================================================
+def run_action(module_name, class_name, payload):
+    """Executes the process action of a resource class. Runs in the pool.
+
+    Args:
+      module_name: The module of the resource class
+      class_name: The name of the resource class
+      payload: The validated parameters of the request
+    """
+    resource_class = getattr(importlib.import_module(module_name), class_name)
+    try:
+        return resource_class.execute_in_process(payload)
+    except ResponseError as error:
+        raise RemoteResponseError(error.code, error.message, error.headers)
+
+#===============================================================================
+# call_in_process
+#===============================================================================
+def call_in_process(resource_class, payload, timeout, pool_size=None):
+    """Executes the process action of the given resource class in the
+    shared process pool and waits for its result.
+
+    Args:
+      resource_class: A resource class with an execute_in_process class
+                      method. It must be importable by its module and name.
+      payload: The validated parameters of the request (picklable)
+      timeout: The maximum seconds to wait for the result
+      pool_size: The number of processes if the pool is not created yet
+
+    Raises:
+      ServiceUnavailableError: The process pool is not available
+      GatewayTimeoutError: The action did not finish in time. Its worker
+                           process is terminated and replaced.
+    """
+    try:
+        pool = get_process_pool(pool_size)
+    except OSError:
+        # The worker processes could not be started
+        raise ServiceUnavailableError()
+    return pool.apply(run_action,
+                      (resource_class.__module__, resource_class.__name__, payload),
+                      timeout)
@@ -28,7 +28,9 @@ Created on Apr 5, 2012
 # OTHER DEALINGS IN THE SOFTWARE.
 
 # ***** Application modules *****
+from ..compat import to_bytes
 from ..json.utils import ResourceJSONRepresentation
+from .validators import compile_coercer
 
 __author__ = "Greivin Lopez"
 __copyright__ = u"Copyright 2012, The Skuë Project"
@@ -73,6 +75,9 @@ class RepresentationType(object):
     # @ivar PNG: Portable Network Graphics media type. Defined in RFC 2083
     PNG =  "image/png"
 
+    # @ivar MSGPACK: MessagePack binary media type (needs the msgpack package)
+    MSGPACK = "application/msgpack"
+
 
 #===============================================================================
 # ApiDescription
@@ -123,6 +128,7 @@ class ResourceDescription(object):
     _url = ''
     _methods = []
     _description = ''
+    _relations = []
 
     @property
     def name(self):
@@ -156,7 +162,19 @@ class ResourceDescription(object):
     def description(self, value):
         self._description = value
 
-    def __init__(self, name, url = '', methods = [], description = ''):
+    @property
+    def relations(self):
+        """The list of RelationDescription objects that clients can embed
+        in the responses with the expand parameter
+        """
+        return self._relations
+
+    @relations.setter
+    def relations(self, value):
+        self._relations = value
+
+    def __init__(self, name, url = '', methods = [], description = '',
+                 relations = []):
         """Creates a new description for the options to interact with a
         resource.
 
@@ -166,11 +184,125 @@ class ResourceDescription(object):
           methods: The list of HttpMethodDescription objects to describe
                    the available methods for the resource
           description: A textual description of the resource
+          relations: The list of RelationDescription objects to describe the
+                     related resources that can be embedded (optional)
         """
         self._name = name
         self.url = url
         self.methods = methods
         self.description = description
+        self.relations = relations
+
+#===============================================================================
+# RelationDescription
+#===============================================================================
+class RelationDescription(object):
+    """Represents a self descriptive object to document a related resource
+    that clients can embed in a response with the expand parameter.
+
+    Nested relations are named with dots: 'author.company' is the company
+    relation of the embedded authors, read from the embedded objects.
+    """
+
+    def __init__(self, name, key, many=False, description=''):
+        """Creates a new description for a relation
+
+        Args:
+          name: The name of the relation, also the field where the related
+                resource is embedded. E.g. 'author'
+          key: The field of the represented object that holds the identifier
+               of the related resource. E.g. 'author_id'
+          many: True if the key field holds a list of identifiers
+          description: A textual description of the relation
+        """
+        self.name = name
+        self.key = key
+        self.many = many
+        self.description = description
+
+    @property
+    def depth(self):
+        """The nesting level of the relation, 1 for the top level"""
+        return self.name.count('.') + 1
+
+    @property
+    def field(self):
+        """The field where the related resource is embedded"""
+        return self.name.rpartition('.')[2]
+
+#===============================================================================
+# CachePolicy
+#===============================================================================
+class CachePolicy(object):
+    """The HTTP caching policy of the successful responses of a method.
+
+    Use it as the cache argument of an HttpMethodDescription:
+    HttpMethodDescription('GET', cache=CachePolicy(max_age=60))
+
+    The responses are private unless public is set, since a shared cache
+    would serve them to clients without the permission of the view:
+    CachePolicy(max_age=60, s_maxage=600, public=True)
+    """
+
+    def __init__(self, max_age=None, s_maxage=None, public=False,
+                 no_store=False, stale_while_revalidate=None,
+                 stale_if_error=None, vary=()):
+        """Creates a new CachePolicy
+
+        Args:
+          max_age: The seconds the response is fresh for every cache
+          s_maxage: The seconds the response is fresh for shared caches
+                    (CDN and proxies), overrides max_age for them
+          public: True if shared caches may store the response (only for
+                  responses anyone may read), False if only the client may
+                  store it (private)
+          no_store: True to forbid storing the response at all
+          stale_while_revalidate: The seconds a stale response can be served
+                                  while it is revalidated in background
+          stale_if_error: The seconds a stale response can be served when
+                          the server fails
+          vary: Extra request headers the response varies on. Accept is
+                added when the method offers several representations.
+        """
+        self.max_age = max_age
+        self.s_maxage = s_maxage
+        self.public = public
+        self.no_store = no_store
+        self.stale_while_revalidate = stale_while_revalidate
+        self.stale_if_error = stale_if_error
+        self.vary = tuple(vary)
+
+    @property
+    def cache_control(self):
+        """The value of the Cache-Control header"""
+        if self.no_store:
+            return 'no-store'
+        directives = ['public' if self.public else 'private']
+        for name, value in (('max-age', self.max_age),
+                            ('s-maxage', self.s_maxage),
+                            ('stale-while-revalidate', self.stale_while_revalidate),
+                            ('stale-if-error', self.stale_if_error)):
+            if value is not None:
+                directives.append('%s=%d' % (name, value))
+        return ', '.join(directives)
+
+    def headers(self, method):
+        """Builds the caching headers for the given HttpMethodDescription.
+
+        Returns:
+          A list of (name, value) tuples
+        """
+        headers = [('Cache-Control', self.cache_control)]
+        vary = []
+        if len(method.representations) > 1:
+            vary.append('Accept')
+        # The language comes from the lang parameter (part of the URL), so
+        # it needs no Vary
+        vary.extend([name for name in self.vary if name not in vary])
+        if vary:
+            headers.append(('Vary', ', '.join(vary)))
+        return headers
+
 
 #===============================================================================
 # HttpMethodDescription
@@ -183,6 +315,9 @@ class HttpMethodDescription(object):
     _languages = []
     _description = ''
     _example_uri = ''
+    _timeout = None
+    _cache = None
+    _cache_headers = None
 
     @property
     def method(self):
@@ -208,6 +343,7 @@ class HttpMethodDescription(object):
     @representations.setter
     def representations(self, value):
         self._representations = value
+        self._cache_headers = None
 
     @property
     def languages(self):
@@ -217,6 +353,7 @@ class HttpMethodDescription(object):
     @languages.setter
     def languages(self, value):
         self._languages = value
+        self._cache_headers = None
 
     @property
     def description(self):
@@ -236,13 +373,46 @@ class HttpMethodDescription(object):
     def example_uri(self, value):
         self._example_uri = value
 
+    @property
+    def timeout(self):
+        """The maximum seconds to handle a request of the method (or None)"""
+        return self._timeout
+
+    @timeout.setter
+    def timeout(self, value):
+        self._timeout = value
+
+    @property
+    def cache(self):
+        """The CachePolicy of the successful GET responses (or None)"""
+        return self._cache
+
+    @cache.setter
+    def cache(self, value):
+        self._cache = value
+        self._cache_headers = None
+
+    @property
+    def cache_headers(self):
+        """The list of (name, value) caching headers of the successful
+        responses, built on first use. Empty without a cache policy.
+        """
+        if self._cache_headers is None:
+            if self._cache is None:
+                self._cache_headers = []
+            else:
+                self._cache_headers = self._cache.headers(self)
+        return self._cache_headers
+
     def __init__(self,
                  method,
                  parameters = [],
                  representations=[RepresentationType.JSON],
                  languages = [],
                  description = '',
-                 example_uri = ''):
+                 example_uri = '',
+                 timeout = None,
+                 cache = None):
         """
         Creates a new description for an HTTP method with the given arguments
 
@@ -256,6 +426,9 @@ class HttpMethodDescription(object):
                      for the HTTP method.
           description: A textual description of the method.
           example_uri: The URI of a valid GET example (for GET methods only)
+          timeout: The time budget in seconds to handle a request, after
+                   which the client gets a 504 response (optional)
+          cache: The CachePolicy of the successful responses (optional)
         """
         self._method = method
         self.parameters = parameters
@@ -263,6 +436,8 @@ class HttpMethodDescription(object):
         self.languages = languages
         self.description = description
         self.example_uri = example_uri
+        self.timeout = timeout
+        self.cache = cache
 
 
 #===============================================================================
@@ -276,6 +451,10 @@ class HttpParameterDescription(object):
     _parameter_type = 'string'
     _is_required = False
     _description = ''
+    _choices = None
+    _minimum = None
+    _maximum = None
+    _coercer = None
 
     @property
     def name(self):
@@ -290,6 +469,7 @@ class HttpParameterDescription(object):
     @parameter_type.setter
     def parameter_type(self, value):
         self._parameter_type = value
+        self._coercer = None
 
     @property
     def is_required(self):
@@ -309,21 +489,74 @@ class HttpParameterDescription(object):
     def description(self, value):
         self._description = value
 
-    def __init__(self, name, parameter_type = 'string', is_required = False, description = ''):
+    @property
+    def choices(self):
+        """The collection of accepted values for the parameter (if any)"""
+        return self._choices
+
+    @choices.setter
+    def choices(self, value):
+        self._choices = value
+        self._coercer = None
+
+    @property
+    def minimum(self):
+        """The minimum accepted value for the parameter (if any)"""
+        return self._minimum
+
+    @minimum.setter
+    def minimum(self, value):
+        self._minimum = value
+        self._coercer = None
+
+    @property
+    def maximum(self):
+        """The maximum accepted value for the parameter (if any)"""
+        return self._maximum
+
+    @maximum.setter
+    def maximum(self, value):
+        self._maximum = value
+        self._coercer = None
+
+    @property
+    def coercer(self):
+        """The compiled function to convert a raw value to the parameter type.
+
+        It is built on first use and kept with the description, which is
+        cached along with the resource description.
+        """
+        if self._coercer is None:
+            self._coercer = compile_coercer(self.parameter_type,
+                                            choices=self.choices,
+                                            minimum=self.minimum,
+                                            maximum=self.maximum)
+        return self._coercer
+
+    def __init__(self, name, parameter_type = 'string', is_required = False, description = '',
+                 choices = None, minimum = None, maximum = None):
         """
         Creates a new description for an HTTP method parameter with the
         given arguments.
 
         Args:
           name: The name of the parameter
-          parameter_type: The expected 'type' for the parameter
+          parameter_type: The expected 'type' for the parameter. One of
+                          'string', 'int', 'float', 'bool', 'date',
+                          'datetime', 'enum', 'file' or 'list:<type>'
           is_required: True if the parameter is required, False otherwise
           description: A brief description of the parameter meaning and use
+          choices: The only values accepted for the parameter (optional)
+          minimum: The minimum value accepted for the parameter (optional)
+          maximum: The maximum value accepted for the parameter (optional)
         """
         self._name = name
         self.parameter_type = parameter_type
         self.is_required = is_required
         self.description = description
+        self.choices = choices
+        self.minimum = minimum
+        self.maximum = maximum
 
 #===============================================================================
 # ParameterOptionsJSONRepresentation
@@ -336,6 +569,12 @@ class ParameterOptionsJSONRepresentation(ResourceJSONRepresentation):
         self.type = parameter.parameter_type
         self.required = parameter.is_required
         self.description = parameter.description
+        if parameter.choices is not None:
+            self.choices = list(parameter.choices)
+        if parameter.minimum is not None:
+            self.minimum = parameter.minimum
+        if parameter.maximum is not None:
+            self.maximum = parameter.maximum
 
 #===============================================================================
 # MethodOptionsJSONRepresentation
@@ -346,6 +585,8 @@ class MethodOptionsJSONRepresentation(ResourceJSONRepresentation):
         ResourceJSONRepresentation.__init__(self, 'HttpMethod')
         self.method = method.method
         self.description = method.description
+        if method.cache is not None:
+            self.cache = method.cache.cache_control
         if method.method == 'GET' and method.example_uri is not None and len(method.example_uri) > 0:
             self.example = ''.join(['http://jsonviewer.stack.hu/#', method.example_uri])
         self.parameters = [ParameterOptionsJSONRepresentation(parameter) for parameter in method.parameters]
@@ -361,6 +602,8 @@ class ResourceOptionsJSONRepresentation(ResourceJSONRepresentation):
         self.url = rest_resource_description.url
         self.description = rest_resource_description.description
         self.methods = [MethodOptionsJSONRepresentation(method) for method in rest_resource_description.methods]
+        if rest_resource_description.relations:
+            self.expand = [relation.name for relation in rest_resource_description.relations]
 
 #===============================================================================
 # RestApiDocJSONRepresentation
@@ -373,3 +616,48 @@ class RestApiDocJSONRepresentation(ResourceJSONRepresentation):
         self.description = api_description.description
         self.resources = [ResourceOptionsJSONRepresentation(resource) for resource in api_description.resources]
 
+#===============================================================================
+# ResourcePlan
+#===============================================================================
+class ResourcePlan(object):
+    """The precompiled request handling data of a resource description.
+
+    Built once when the resource is registered (see the add_skue_resource
+    directive) so the requests don't have to walk the description again:
+    the parameters by method, the Allow header and the OPTIONS body.
+    """
+
+    def __init__(self, resource_description):
+        """Creates a new plan compiling the given ResourceDescription"""
+        self.description = resource_description
+        methods = resource_description.methods or []
+        # The HttpMethodDescription objects by method name
+        self.methods = {}
+        # The (parameters by name, required names, optional names) by method
+        self.parameters = {}
+        for method in methods:
+            self.methods[method.method] = method
+            parameters = {}
+            required = []
+            optional = []
+            for parameter in method.parameters:
+                # Compile the coercer now instead of on the first request
+                parameter.coercer
+                parameters[parameter.name] = parameter
+                if parameter.is_required:
+                    required.append(parameter.name)
+                else:
+                    optional.append(parameter.name)
+            # Shared by the concurrent requests, so the names are immutable
+            self.parameters[method.method] = (parameters, tuple(required),
+                                              tuple(optional))
+            # Build the caching headers now instead of on the first request
+            method.cache_headers
+        # The RelationDescription objects by name
+        self.relations = dict([(relation.name, relation)
+                               for relation in resource_description.relations or []])
+        # The value of the Allow header
+        self.allowed_methods = ', '.join([method.method for method in methods])
+        # The encoded body of the OPTIONS responses
+        self.options_body = to_bytes(
+            ResourceOptionsJSONRepresentation(resource_description).as_json())
@@ -28,22 +28,42 @@ Created on Apr 6, 2012
 # OTHER DEALINGS IN THE SOFTWARE.
 
 # ***** Python built-in modules *****
-import traceback
+import sys
+import math
+import time
+import logging
+import random
 import importlib
-from types import StringTypes
 
 # ***** Pyramid modules *****
 from pyramid.response import Response
+from pyramid.exceptions import ConfigurationError
 from pyramid.httpexceptions import HTTPMethodNotAllowed
+from pyramid.settings import asbool
 
 # ***** Application modules *****
 from .api import ApiDescription
+from .api import ResourceDescription, HttpMethodDescription
 from .api import RepresentationType as ContentType
 from .api import ResourceOptionsJSONRepresentation
 from .api import RestApiDocJSONRepresentation
+from ..cache import CopyOnWriteDict
+from ..compat import string_types
 from ..errors import ResponseError, ParameterMissedError, NotAcceptableError
-from ..http import CommonResponse
-from ..utils import parse_body
+from ..errors import InvalidParameterFormatError, BulkLimitError
+from ..errors import UnknownReferenceError, IdempotencyKeyReusedError
+from ..errors import GatewayTimeoutError, PayloadTooLargeError
+from ..http import CommonResponse, StreamingBody
+from ..idempotency import StoredResponse, request_fingerprint
+from ..jobs import JobJSONRepresentation
+from ..json.utils import ResourceJSONRepresentation, CollectionJSONRepresentation
+from ..json.utils import OBJECTS_LAYOUT, language_chain, parse_fields
+from ..processes import call_in_process
+from ..encoders import get_decoder, get_encoder
+from ..loaders import BatchLoader
+from ..uploads import UploadedFile, multipart_boundary, parse_multipart, spool_body
+from ..utils import parse_body, parse_bulk_body
+from .validators import compile_coercer
 
 __author__ = "Greivin Lopez"
 __copyright__ = u"Copyright 2012, The Skuë Project"
@@ -55,7 +75,54 @@ __email__ = "greivin.lopez@gmail.com"
 __status__ = "Development"
 
 
-SKUE_CACHE = {}
+# The shared caches are CopyOnWriteDict objects: the request threads read
+# them without locking and they are written once per key.
+
+# The ResourceDescription of the resources without a plan by class
+SKUE_CACHE = CopyOnWriteDict()
+
+# The ResourcePlan of every registered resource class (see add_skue_resource)
+RESOURCE_PLANS = CopyOnWriteDict()
+
+# The parameters of a method without description
+NO_PARAMETERS = ({}, (), ())
+
+# The methods without side effects, stopped at the deadline even after the
+# handler has run
+SAFE_METHODS = frozenset(['GET', 'HEAD', 'OPTIONS'])
+
+# The operations that honor the Idempotency-Key header
+IDEMPOTENT_OPERATIONS = frozenset(['create_resource', 'execute', 'execute_remote'])
+
+# The batch hook to call in bulk mode for each single item operation
+BULK_OPERATIONS = {
+    'create_resource': 'create_resources',
+    'update_resource': 'update_resources',
+    'delete_resource': 'delete_resources',
+}
+
+logger = logging.getLogger(__name__)
+
+
+#===============================================================================
+# describe_resource_class
+#===============================================================================
+def describe_resource_class(resource_class):
+    """Gets the ResourceDescription of a resource class when the application
+    is configured.
+
+    describe_resource is called on an instance without request, so it must
+    not read the request (nor anything derived from it).
+
+    Raises:
+      ConfigurationError: describe_resource failed without a request
+    """
+    try:
+        return resource_class(None).describe_resource()
+    except Exception as error:
+        raise ConfigurationError(
+            '%s.describe_resource() failed without a request (it must not '
+            'read the request): %s' % (resource_class.__name__, error))
 
 
 class BaseHandler(object):
@@ -65,6 +132,7 @@ class BaseHandler(object):
     then register views and set permissions.
 
     """
+    __slots__ = ('request', 'response')
 
     def __init__(self, request):
         self.request = request
@@ -98,24 +166,99 @@ class BaseHandler(object):
 # RestResource
 #===============================================================================
 class RestResource(BaseHandler):
-    """The request handler for RESTful controllers."""
-
-    # A dictionary with the parameters of the request regardless of method
-    payload = None
-    # The list of the required parameters of the request
-    required = []
-    # The list of the optional parameters of the request
-    optional = []
-    # String representation of the HTTP method of the current request
-    http_method = ''
-    # The value of the 'HTTP_USER_AGENT' header
-    http_user_agent = ''
-    # The RestResourceDescription object that describes this controller options
-    resource_description = None
-    # The host name of the server
-    host_name = None
-    # The language the client prefer for the response
-    language = 'en'
+    """The request handler for RESTful controllers.
+
+    A new instance handles each request, so the request state lives in the
+    instance (see __init__) and the class attributes are configuration
+    shared by every request, which must not be changed while serving.
+    """
+    __slots__ = ('payload', 'required', 'optional', 'parameters',
+                 'method_description', 'plan', 'deadline', 'http_method',
+                 'http_user_agent', 'resource_description', 'host_name',
+                 'content_type', 'language', 'fields', 'expand',
+                 'bulk_payload', '_storage_session', '_loaders', '_uploads',
+                 'timings', 'validation')
+
+    # The maximum nesting level of the expanded relations
+    max_expand_depth = 2
+    # The maximum number of related resources embedded in a response
+    max_expanded_items = 100
+    # Indicates if the resource accepts a JSON array of items on POST/PUT/DELETE
+    allow_bulk = False
+    # The maximum number of items accepted in a single bulk request
+    max_bulk_items = 1000
+    # An optional IdempotencyManager to honor the Idempotency-Key header
+    idempotency = None
+    # The JobQueue to execute queued work (see enqueue)
+    job_queue = None
+    # The path of the job status resource, '{id}' is the job identifier
+    job_status_path = '/jobs/{id}'
+    # An optional AccessLog to write a structured record of every request
+    access_log = None
+    # The StorageAdapter of the resource, defaults to the one registered
+    # with the add_skue_storage directive
+    storage = None
+    # An optional CorsPolicy, applied by the CORS tween (see cors.py)
+    cors = None
+    # The maximum size in bytes of a request body with file parameters
+    max_upload_size = 32 * 1024 * 1024
+    # The bytes of each uploaded file kept in memory before spooling to disk
+    upload_memory_threshold = 1024 * 1024
+    # The maximum total size in bytes of the non file parameters of a body
+    max_form_size = 1024 * 1024
+
+    def __init__(self, request):
+        BaseHandler.__init__(self, request)
+        # A dictionary with the parameters of the request regardless of method
+        self.payload = None
+        # The names of the required parameters of the request
+        self.required = ()
+        # The names of the optional parameters of the request
+        self.optional = ()
+        # The HttpParameterDescription objects of the request method by name
+        self.parameters = None
+        # The HttpMethodDescription of the request method (if described)
+        self.method_description = None
+        # The precompiled ResourcePlan of the resource (if registered)
+        self.plan = None
+        # The time (as in time.time) the request must be answered by (or None)
+        self.deadline = None
+        # String representation of the HTTP method of the current request
+        self.http_method = ''
+        # The value of the 'HTTP_USER_AGENT' header
+        self.http_user_agent = ''
+        # The RestResourceDescription object that describes this controller options
+        self.resource_description = None
+        # The host name of the server
+        self.host_name = None
+        # The media type of the response representation requested by the client
+        self.content_type = ContentType.JSON
+        # The language the client prefer for the response
+        self.language = 'en'
+        # The field names selected with the fields parameter (None for all)
+        self.fields = None
+        # The relation names requested with the expand parameter, parents first
+        self.expand = None
+        # The list of parameter dictionaries of a bulk request (None otherwise)
+        self.bulk_payload = None
+        # The StorageSession of the current request (see storage_session)
+        self._storage_session = None
+        # The BatchLoader objects of the current request by name (see loader)
+        self._loaders = None
+        # The UploadedFile objects of the current request, closed at its end
+        self._uploads = None
+        # The seconds spent in each stage of the request by stage name
+        self.timings = None
+        # The outcome of the request validation: 'passed', 'failed' or None
+        self.validation = None
+
+    @property
+    def language_fallbacks(self):
+        """The chain of localized field suffixes for the request language.
+        E.g. ('pt_br', 'pt') for 'pt-BR'. The default language is implied
+        at the end of the chain.
+        """
+        return language_chain(self.language)
 
     def handle_request(self, method, *args, **kwargs):
         """Method that calls the send_response method with the response of
@@ -127,15 +270,182 @@ class RestResource(BaseHandler):
         Args:
           method: the method that executes the REST operation
         """
+        started = time.time()
+        response = None
+        try:
+            response = self.__process(method, *args, **kwargs)
+            return response
+        finally:
+            body = getattr(response, 'app_iter', None)
+            if isinstance(body, StreamingBody):
+                # The body may still read the storage while it is sent
+                body.when_closed(
+                    lambda: self.__end_request(method, started, response, body.size))
+            else:
+                self.__end_request(method, started, response)
+
+    def __end_request(self, method, started, response, response_size=None):
+        """Releases the resources of the request and logs it, once its
+        response is complete
+        """
+        if self._storage_session is not None:
+            self.__release_storage(response)
+        if self._uploads:
+            for upload in self._uploads:
+                upload.close()
+        if self.access_log is not None:
+            self.__log_access(method, started, response, response_size)
+
+    def __process(self, method, *args, **kwargs):
+        """Runs the request pipeline, honoring its Idempotency-Key if any"""
+        self.timings = timings = {}
+        mark = time.time()
         try:
             self.__entrance()
-            return self.send_response(method(*args, **kwargs))
-        except ResponseError, error:
+        except ResponseError as error:
+            self.validation = 'failed'
+            timings['validation'] = time.time() - mark
+            return self.send_response(error.get_http_response())
+        except Exception as error:
+            return self.handle_unexpected_error(error)
+        self.validation = 'passed'
+        timings['validation'] = time.time() - mark
+        if self.idempotency is not None and method.__name__ in IDEMPOTENT_OPERATIONS:
+            key = self.request.headers.get('Idempotency-Key')
+            if key:
+                return self.__handle_idempotent(key, method, *args, **kwargs)
+        return self.__execute(method, *args, **kwargs)
+
+    def __execute(self, method, *args, **kwargs):
+        """Runs the given REST operation of a validated request"""
+        timings = self.timings
+        mark = time.time()
+        try:
+            operation = BULK_OPERATIONS.get(method.__name__)
+            if self.bulk_payload is not None and operation is not None:
+                handler_response = self.__handle_bulk(getattr(self, operation), *args, **kwargs)
+            else:
+                handler_response = method(*args, **kwargs)
+                if self.fields is not None:
+                    self.__select_fields(handler_response)
+                if self.expand:
+                    self.__expand_response(handler_response)
+            now = time.time()
+            timings['handler'], mark = now - mark, now
+            # The client is no longer waiting for a late response. The
+            # side effects of the unsafe methods are already committed then,
+            # so their response is sent anyway.
+            if self.http_method in SAFE_METHODS:
+                self.checkpoint()
+            response = self.send_response(handler_response)
+            timings['response'] = time.time() - mark
+            return response
+        except ResponseError as error:
             return self.send_response(error.get_http_response())
         except Exception as error:
             # self.logger.exception('An unexpected error has occur')
             return self.handle_unexpected_error(error)
 
+    def __handle_idempotent(self, key, method, *args, **kwargs):
+        """Handles a request with an Idempotency-Key header.
+
+        The response of the first request with the key is stored and
+        replayed for the repetitions, concurrent duplicates wait for it.
+        Server errors are not stored so the client can retry them.
+
+        The requests are told apart by a fingerprint of their parsed
+        parameters, so the raw body is never read again. Keys are scoped by
+        the caller (see idempotency_scope), so two callers sending the same
+        key never get each other's response.
+
+        Returns:
+          The response of the request, the stored response replayed, a 422
+          (IdempotencyKeyReusedError) if the key was used for a different
+          request or a 409 (IdempotencyKeyInProgressError) if the request
+          with the key is still in progress.
+        """
+        scope = self.idempotency_scope()
+        store_key = u' '.join([self.request.method, self.request.path,
+                               u'' if scope is None else u'%s' % (scope,), key])
+        fingerprint = request_fingerprint(self.payload, self.bulk_payload,
+                                          self.language, self.fields,
+                                          self.expand)
+        try:
+            stored_response = self.idempotency.begin(store_key)
+        except ResponseError as error:
+            return self.send_response(error.get_http_response())
+        if stored_response is not None:
+            if stored_response.fingerprint != fingerprint:
+                return self.send_response(
+                    IdempotencyKeyReusedError(key).get_http_response())
+            self.response.status_int = stored_response.status_code
+            self.response.headerlist = list(stored_response.headerlist)
+            self.response.headers['Idempotent-Replayed'] = 'true'
+            self.response.body = stored_response.body
+            return self.response
+
+        stored_response = None
+        try:
+            response = self.__execute(method, *args, **kwargs)
+            if response.status_int < 500:
+                stored_response = StoredResponse(response.status_int,
+                                                 list(response.headerlist),
+                                                 response.body,
+                                                 fingerprint)
+            return response
+        finally:
+            self.idempotency.finish(store_key, stored_response)
+
+    @property
+    def storage_session(self):
+        """The StorageSession of the request, checked out on first use from
+        the read or the write pool depending on the HTTP method. Its
+        connection is released when the request ends.
+        """
+        if self._storage_session is None:
+            storage = self.storage
+            if storage is None:
+                registry = getattr(self.request, 'registry', None)
+                storage = getattr(registry, 'skue_storage', None)
+            if storage is None:
+                raise RuntimeError('The resource has no StorageAdapter')
+            timeout = self.remaining_time
+            self._storage_session = storage.session(self.request.method, timeout)
+        return self._storage_session
+
+    def __release_storage(self, response):
+        """Releases the storage session, committing the transaction only if
+        the request succeeded
+        """
+        session, self._storage_session = self._storage_session, None
+        session.release(commit=response is not None and response.status_int < 400)
+
+    def __log_access(self, method, started, response, response_size=None):
+        """Queues the access log record of the request"""
+        request = self.request
+        resource = getattr(self.resource_description, 'name', None) \
+            or type(self).__name__
+        status = 500
+        if response is not None:
+            status = response.status_int
+            if response_size is None:
+                response_size = response.content_length
+        response_size = response_size or 0
+        record = {
+            'time': started,
+            'resource': resource,
+            'operation': method.__name__,
+            'method': request.method,
+            'path': request.path,
+            'status': status,
+            'validation': self.validation,
+            'request_size': request.content_length or 0,
+            'response_size': response_size,
+            'duration': time.time() - started,
+            'timings': self.timings,
+        }
+        self.access_log.emit(record)
+
     def __entrance(self):
         """First method executed by every API request
 
@@ -143,37 +453,37 @@ class RestResource(BaseHandler):
         internal variables describing the request and loading
         the input parameters and doing automatic validation.
         """
-        try:
-            # Set the HTTP Method
-            self.http_method = self.request.method
-            # Set the host name
-            self.host_name = self.request.host_url
-            # Set the user agent
-            user_agent = self.request.user_agent
-
-            if user_agent is not None and isinstance(user_agent, StringTypes):
-                self.http_user_agent = user_agent
-
-            # Set the intended response representation
-            accepted_format = self.request.headers.get('Accept');
-            if accepted_format is not None and not '*/*' in accepted_format:
-                self.content_type = accepted_format
-            else:
-                self.content_type = ContentType.JSON
-
-            # Get the self description of the Resource
-            self.resource_description = self.__get_self_description()
-            # Load the parameters sent in the HTTP request
-            self.__load_parameters()
-            # Deduce the expected parameters from description
-            self.__deduce_expected_parameters()
-            # Validate the request
-            self.__validate_request()
-            # Validate the parameters
-            self.__validate_parameters()
-        except Exception as error:
-            #self.logger.exception('An unexpected error has occur')
-            return self.handle_unexpected_error(error)
+        # Set the HTTP Method
+        self.http_method = self.request.method
+        # Set the host name
+        self.host_name = self.request.host_url
+        # Set the user agent
+        user_agent = self.request.user_agent
+
+        if user_agent is not None and isinstance(user_agent, string_types):
+            self.http_user_agent = user_agent
+
+        # Set the intended response representation
+        accepted_format = self.request.headers.get('Accept');
+        if accepted_format is not None and not '*/*' in accepted_format:
+            self.content_type = accepted_format
+        else:
+            self.content_type = ContentType.JSON
+
+        # Get the self description of the Resource
+        self.resource_description = self.__get_self_description()
+        # Deduce the expected parameters from description
+        self.__deduce_expected_parameters()
+        # Load the parameters sent in the HTTP request
+        self.__load_parameters()
+        # Set the time the request must be answered by
+        self.__set_deadline()
+        # Validate the request
+        self.__validate_request()
+        # Validate the parameters
+        self.__validate_parameters()
+        # Convert the parameters to their declared types
+        self.__coerce_parameters()
 
     def __get_self_description(self):
         """Gets the description of the resource provided by inheritors.
@@ -183,16 +493,17 @@ class RestResource(BaseHandler):
         """
         if self.resource_description is not None:
             return self.resource_description
+        self.plan = RESOURCE_PLANS.get(type(self))
+        if self.plan is not None:
+            return self.plan.description
         else:
-            method_key = ''.join([self.request.path, '-', self.http_method])
-            resource_description = SKUE_CACHE.get(method_key)
-            if resource_description is not None:
-                self.resource_description = resource_description
-                return self.resource_description
-            else:
-                self.resource_description = self.describe_resource()
-                SKUE_CACHE[method_key] = self.resource_description
-                return self.resource_description
+            # The description only depends on the class, not on the path
+            resource_description = SKUE_CACHE.get(type(self))
+            if resource_description is None:
+                resource_description = SKUE_CACHE.setdefault(
+                    type(self), self.describe_resource())
+            self.resource_description = resource_description
+            return self.resource_description
 
     def __get_payload(self):
         """Populates payload dictionary from method arguments.
@@ -204,6 +515,22 @@ class RestResource(BaseHandler):
           A dict structure with the HTTP request arguments and its values
         """
         payload = {}
+        decoder = get_decoder(self.request.content_type)
+        if decoder is not None and self.http_method in ('POST', 'PUT', 'DELETE'):
+            return self.__decode_payload(decoder)
+        if self.http_method in ('POST', 'PUT') and self.__accepts_uploads():
+            return self.__read_uploads()
+        if self.allow_bulk and self.http_method in ('POST', 'PUT', 'DELETE') \
+                and self.request.content_type == ContentType.JSON:
+            try:
+                self.bulk_payload = parse_bulk_body(self.request.body)
+            except ValueError:
+                raise InvalidParameterFormatError(parameter='items')
+            if self.bulk_payload is not None:
+                if len(self.bulk_payload) > self.max_bulk_items:
+                    raise BulkLimitError(self.max_bulk_items)
+                # Only the query string applies to the request as a whole
+                return dict(self.request.GET.items())
         if self.http_method in ('POST', 'PUT'):
             payload = parse_body(self.request.body)
         else:
@@ -211,6 +538,79 @@ class RestResource(BaseHandler):
                 payload[key] = value
         return payload
 
+    def __decode_payload(self, decoder):
+        """Decodes the body of the request with the decoder registered for
+        its media type (see pyramid_skue.encoders).
+
+        Raises:
+          InvalidParameterFormatError: The body is malformed
+          BulkLimitError: The bulk request has too many items
+        """
+        try:
+            decoded = decoder(self.request.body) if self.request.body else {}
+        except ValueError:
+            raise InvalidParameterFormatError(parameter='body')
+        if isinstance(decoded, dict):
+            return decoded
+        if not self.allow_bulk or not isinstance(decoded, list) \
+                or not all(isinstance(item, dict) for item in decoded):
+            raise InvalidParameterFormatError(parameter='body')
+        if len(decoded) > self.max_bulk_items:
+            raise BulkLimitError(self.max_bulk_items)
+        self.bulk_payload = decoded
+        # Only the query string applies to the request as a whole
+        return dict(self.request.GET.items())
+
+    def __accepts_uploads(self):
+        """Indicates if the request method declares file parameters"""
+        for parameter in self.parameters.values():
+            if parameter.parameter_type == 'file':
+                return True
+        return False
+
+    def __read_uploads(self):
+        """Reads the body of a request to a method with file parameters.
+
+        The body is read from request.body_file a chunk at a time. A
+        multipart/form-data body is parsed incrementally, any other media
+        type (except forms) is the content of the only file parameter.
+        Files are spooled to disk above upload_memory_threshold.
+
+        Raises:
+          PayloadTooLargeError: The body is larger than max_upload_size or
+                                its fields larger than max_form_size
+          InvalidParameterFormatError: The body is malformed
+        """
+        request = self.request
+        length = request.content_length
+        if length is not None and length > self.max_upload_size:
+            raise PayloadTooLargeError(self.max_upload_size)
+        if request.content_type == 'multipart/form-data':
+            boundary = multipart_boundary(request.headers.get('Content-Type'))
+            if boundary is None:
+                raise InvalidParameterFormatError(parameter='body')
+            payload = parse_multipart(request.body_file, boundary,
+                                      self.max_upload_size, self.max_form_size,
+                                      self.upload_memory_threshold)
+        elif request.content_type in ('', 'application/x-www-form-urlencoded'):
+            if length is not None and length > self.max_form_size:
+                raise PayloadTooLargeError(self.max_form_size)
+            return parse_body(request.body)
+        else:
+            names = [name for name, parameter in self.parameters.items()
+                     if parameter.parameter_type == 'file']
+            if len(names) != 1:
+                raise InvalidParameterFormatError(parameter='body')
+            # The query string carries the other parameters
+            payload = dict(request.GET.items())
+            payload[names[0]] = spool_body(request.body_file, names[0],
+                                           request.content_type,
+                                           self.max_upload_size,
+                                           self.upload_memory_threshold)
+        self._uploads = [value for value in payload.values()
+                         if isinstance(value, UploadedFile)]
+        return payload
+
     def __load_parameters(self):
         """Load the parameters of the request.
 
@@ -221,10 +621,6 @@ class RestResource(BaseHandler):
           ParameterMissedError: One of the required parameters is not present
           NotExpectedParameterError: One of the received parameters was not registered
         """
-        # Clean the parameter sets.. (unregister previous parameters)
-        self.required = []
-        self.optional = []
-
         # Get payload function populates the payload dictionary
         self.payload = self.__get_payload()
 
@@ -235,18 +631,75 @@ class RestResource(BaseHandler):
         request method and which parameters are expected as required
         for the controller to handle validation automatically.
         """
+        # Clean the parameter sets.. (unregister previous parameters)
+        self.required = []
+        self.optional = []
+        self.parameters = {}
+
+        if self.plan is not None:
+            self.method_description = self.plan.methods.get(self.http_method)
+            self.parameters, self.required, self.optional = \
+                self.plan.parameters.get(self.http_method, NO_PARAMETERS)
+            return
         self_description = self.resource_description
         if self_description is not None:
             methods = self_description.methods
             if methods is not None:
                 for method in methods:
                     if method.method == self.http_method:
+                        self.method_description = method
                         for parameter in method.parameters:
+                            self.parameters[parameter.name] = parameter
                             if parameter.is_required:
                                 self.required.append(parameter.name)
                             else:
                                 self.optional.append(parameter.name)
 
+    def __set_deadline(self):
+        """Sets the deadline of the request from the time budget of the
+        method and the 'X-Request-Deadline' header (seconds since the epoch)
+        sent by the gateway, whichever comes first.
+
+        Raises:
+          GatewayTimeoutError: The deadline has already passed
+        """
+        deadline = None
+        timeout = getattr(self.method_description, 'timeout', None)
+        if timeout is not None:
+            deadline = time.time() + timeout
+        header = self.request.headers.get('X-Request-Deadline')
+        if header:
+            try:
+                requested = float(header)
+            except ValueError:
+                requested = None
+            if requested is None or math.isnan(requested) or math.isinf(requested):
+                raise InvalidParameterFormatError(parameter='X-Request-Deadline')
+            deadline = requested if deadline is None else min(deadline, requested)
+        self.deadline = deadline
+        self.checkpoint()
+
+    @property
+    def remaining_time(self):
+        """The seconds left before the deadline, or None if there is no
+        deadline. Pass it down as the timeout of storage or service calls.
+        """
+        if self.deadline is None:
+            return None
+        return max(self.deadline - time.time(), 0.0)
+
+    def checkpoint(self):
+        """Stops the request if its deadline has passed.
+
+        Long handlers should call it between steps so they don't keep
+        working on a response the client has already given up on.
+
+        Raises:
+          GatewayTimeoutError: The deadline has passed
+        """
+        if self.deadline is not None and time.time() >= self.deadline:
+            raise GatewayTimeoutError()
+
     def __validate_parameters(self):
         """Validate web request parameters.
 
@@ -256,16 +709,180 @@ class RestResource(BaseHandler):
 
         Raises:
           ParameterMissedError: One of the required parameters is not present
+          InvalidParameterFormatError: The lang, fields or expand value is
+                                       not a string
         """
         # Sets the language of the request if provided
         if 'lang' in self.payload:
-            self.language = self.payload['lang']
-            del self.payload['lang']
+            self.language = self.__pop_text('lang')
+
+        # Sets the sparse fieldset of the response, unless the method
+        # declares its own fields parameter
+        if 'fields' in self.payload and 'fields' not in self.parameters:
+            self.fields = parse_fields(self.__pop_text('fields'))
+
+        # Sets the relations to embed in the response, unless the method
+        # declares its own expand parameter
+        if 'expand' in self.payload and 'expand' not in self.parameters:
+            self.expand = self.__parse_expand(self.__pop_text('expand'))
+
+        # Bulk items are validated one by one when handling the request
+        if self.bulk_payload is None:
+            self.__check_parameters(self.payload)
 
+    def __pop_text(self, name):
+        """Removes the given parameter from the payload and returns its value.
+
+        Raises:
+          InvalidParameterFormatError: The value is not a string (e.g. a
+                                       number in a MessagePack body)
+        """
+        value = self.payload.pop(name)
+        if not isinstance(value, string_types):
+            raise InvalidParameterFormatError(parameter=name)
+        return value
+
+    def __parse_expand(self, value):
+        """Parses the value of the expand parameter.
+
+        Returns:
+          A tuple with the requested relation names (and the parents of the
+          nested ones) sorted by depth, or None if empty
+
+        Raises:
+          InvalidParameterFormatError: An unknown relation was requested or
+                                       it is nested too deep
+        """
+        names = parse_fields(value)
+        if names is None:
+            return None
+        relations = self.__get_relations()
+        requested = set()
+        for name in names:
+            relation = relations.get(name)
+            if relation is None or relation.depth > self.max_expand_depth:
+                raise InvalidParameterFormatError(parameter='expand')
+            while name:
+                requested.add(name)
+                name = name.rpartition('.')[0]
+        return tuple(sorted(requested, key=lambda name: (name.count('.'), name)))
+
+    def __get_relations(self):
+        """Gets the RelationDescription objects of the resource by name"""
+        if self.plan is not None:
+            return self.plan.relations
+        relations = getattr(self.resource_description, 'relations', None) or []
+        return dict([(relation.name, relation) for relation in relations])
+
+    def expand_relations(self, items):
+        """Embeds the relations requested with the expand parameter in the
+        given items (dictionaries or representations).
+
+        The identifiers of each relation are collected from all the items
+        and resolved with a single load_relations call, then nested
+        relations are resolved from the embedded objects. At most
+        max_expanded_items related resources are embedded.
+
+        Args:
+          items: The list of objects to expand
+
+        Returns:
+          The given items
+        """
+        if not self.expand:
+            return items
+        relations = self.__get_relations()
+        levels = {'': items}
+        remaining = self.max_expanded_items
+        for name in self.expand:
+            relation = relations[name]
+            parents = levels.get(name.rpartition('.')[0])
+            if not parents:
+                continue
+            keys = []
+            seen = set()
+            for parent in parents:
+                for key in _relation_keys(parent, relation):
+                    if key not in seen:
+                        seen.add(key)
+                        keys.append(key)
+            keys = keys[:max(remaining, 0)]
+            loaded = {}
+            if keys:
+                # Namespaced apart from the loaders registered by the handler
+                loader = self.loader('expand:' + name,
+                                     lambda keys, name=name: self.load_relations(name, keys))
+                for key, value in loader.get_many(keys).items():
+                    if value is not None:
+                        loaded[key] = value
+            remaining -= len(loaded)
+            embedded = []
+            for parent in parents:
+                if relation.many:
+                    related = [loaded[key] for key in _relation_keys(parent, relation)
+                               if key in loaded]
+                    embedded.extend(related)
+                else:
+                    parent_keys = _relation_keys(parent, relation)
+                    related = loaded.get(parent_keys[0]) if parent_keys else None
+                    if related is not None:
+                        embedded.append(related)
+                _embed(parent, relation.field, related)
+            levels[name] = embedded
+        return items
+
+    def loader(self, name, batch_function=None, max_batch_size=None):
+        """Gets the BatchLoader of the request with the given name.
+
+        Representations register the keys they need with loader.load(key)
+        and the values are fetched in one batch when the response is
+        encoded (or on the first loader.get), then memoized until the end
+        of the request.
+
+        Args:
+          name: The name of the loader. E.g. 'author'
+          batch_function: The function that fetches a list of keys, used
+                          when the loader is created. Defaults to calling
+                          load_relations with the name
+          max_batch_size: The maximum number of keys per batch
+        """
+        if self._loaders is None:
+            self._loaders = {}
+        loader = self._loaders.get(name)
+        if loader is None:
+            if batch_function is None:
+                batch_function = lambda keys: self.load_relations(name, keys)
+            loader = BatchLoader(batch_function, max_batch_size)
+            self._loaders[name] = loader
+        return loader
+
+    def load_relations(self, name, keys):
+        """Loads the related resources of a relation in a single batch.
+
+        Inheritors that declare relations must override this method.
+
+        Args:
+          name: The name of the relation. E.g. 'author' or 'author.company'
+          keys: The list of unique identifiers to load
+
+        Returns:
+          A dictionary with the embeddable object (a dictionary or a
+          representation) of each found identifier
+        """
+        raise NotImplementedError
+
+    def __check_parameters(self, payload):
+        """Validates the given parameters against the registered ones.
+
+        Removes the not expected parameters from the given dictionary.
+
+        Raises:
+          ParameterMissedError: One of the required parameters is not present
+        """
         # Create the needed sets to work with
         required_set = set(self.required)
         optional_set = set(self.optional)
-        received_set = set(self.payload.keys())
+        received_set = set(payload.keys())
 
         # Validate required parameters
         fail_required = required_set - received_set
@@ -278,22 +895,132 @@ class RestResource(BaseHandler):
         invalid_params = received_set - valid_set
 
         for param in invalid_params:
-            del self.payload[param]
+            del payload[param]
+
+    def __coerce_parameters(self, payload=None):
+        """Converts the received parameters to the types declared in
+        their HttpParameterDescription.
+
+        The conversion functions are compiled once per parameter description
+        so the cost per request is a single call per received parameter.
 
+        Args:
+          payload: The parameters to convert. Defaults to self.payload
+
+        Raises:
+          InvalidParameterFormatError: A parameter value cannot be converted
+                                       or is out of the declared bounds.
+        """
+        if payload is None:
+            payload = self.payload
+        for name, value in payload.items():
+            parameter = self.parameters.get(name)
+            if parameter is not None:
+                try:
+                    payload[name] = parameter.coercer(value)
+                except (ValueError, TypeError):
+                    raise InvalidParameterFormatError(parameter=name)
 
     def __validate_request(self):
         """Validates the HTTP request to ensure the ability of
         of this web handler to fulfill the expectations of the
         client with it's response.
         """
-        self_description = self.resource_description
-        if self_description is not None:
-            methods = self_description.methods
-            if methods is not None:
-                for method in methods:
-                    if method.method == self.http_method:
-                        if not self.content_type in method.representations:
-                            raise NotAcceptableError(method.representations)
+        method = self.method_description
+        if method is not None:
+            if not self.content_type in method.representations:
+                raise NotAcceptableError(method.representations)
+
+    def __select_fields(self, handler_response):
+        """Applies the sparse fieldset of the request to the body of a
+        successful response, unless the handler gave the representation a
+        fieldset already.
+        """
+        body = getattr(handler_response, 'body', None)
+        if 200 <= handler_response.status_code < 300 \
+                and isinstance(body, ResourceJSONRepresentation) \
+                and body._fields is None:
+            body._fields = self.fields
+
+    def __expand_response(self, handler_response):
+        """Embeds the requested relations in the body of a successful
+        response: in its objects list if it has one, else in the body itself.
+        """
+        body = getattr(handler_response, 'body', None)
+        if not 200 <= handler_response.status_code < 300 \
+                or not isinstance(body, ResourceJSONRepresentation):
+            return
+        objects = getattr(body, 'objects', None)
+        if isinstance(objects, list):
+            self.expand_relations(objects)
+        else:
+            self.expand_relations([body])
+        fields = getattr(body, '_fields', None)
+        if fields is not None:
+            # The expanded relations are part of the sparse fieldset
+            body._fields = fields.union(
+                [name for name in self.expand if '.' not in name])
+
+    def __handle_bulk(self, operation, *args, **kwargs):
+        """Validates the items of a bulk request and hands the valid ones to
+        the given batch operation.
+
+        Args:
+          operation: The batch method to call. E.g. self.create_resources
+
+        Returns:
+          A 207 response with the outcome of every item
+
+        Raises:
+          ValueError: The batch operation did not return one result per item
+        """
+        results = [None] * len(self.bulk_payload)
+        batch = []
+        positions = []
+        for index, item in enumerate(self.bulk_payload):
+            try:
+                self.__check_parameters(item)
+                self.__coerce_parameters(item)
+            except ResponseError as error:
+                results[index] = error
+            else:
+                batch.append(item)
+                positions.append(index)
+        if batch:
+            batch_results = list(operation(batch, *args, **kwargs))
+            if len(batch_results) != len(batch):
+                raise ValueError('%s returned %d results for %d items' % (
+                    operation.__name__, len(batch_results), len(batch)))
+            for index, result in zip(positions, batch_results):
+                results[index] = result
+        return CommonResponse.multi_status(results)
+
+    def process_batch(self, method, batch, *args, **kwargs):
+        """Calls the given single item method once per item of a batch.
+
+        This is the fallback of the batch operations. self.payload holds
+        the parameters of each item while the method runs, and is restored
+        afterwards.
+
+        Args:
+          method: The single item method. E.g. self.create_resource
+          batch: The list of validated parameter dictionaries
+
+        Returns:
+          A list with a HandlerHttpResponse or ResponseError per item
+        """
+        payload = self.payload
+        results = []
+        try:
+            for item in batch:
+                self.payload = item
+                try:
+                    results.append(method(*args, **kwargs))
+                except ResponseError as error:
+                    results.append(error)
+        finally:
+            self.payload = payload
+        return results
 
     def options_for_resource(self, *args, **kwargs):
         """Retrieves the information related the communication options
@@ -302,11 +1029,16 @@ class RestResource(BaseHandler):
         Returns:
           A self description of the resource in JSON representation
         """
+        if self.plan is not None:
+            return CommonResponse.options(self.plan.allowed_methods, None,
+                                          encoded_body=self.plan.options_body)
         response_body = ResourceOptionsJSONRepresentation(self.resource_description)
         return CommonResponse.options(self.get_allowed_methods(), response_body)
 
     def get_allowed_methods(self):
         """Returns a string with the list of HTTP allowed methods"""
+        if self.plan is not None:
+            return self.plan.allowed_methods
         allowed_methods = ""
         if self.resource_description.methods is not None:
             methods_list = [method.method for method in self.resource_description.methods]
@@ -320,25 +1052,117 @@ class RestResource(BaseHandler):
           handler_response: An instance of HandlerHttpResponse that contains
           the data for the response.
         """
+        if self.content_type != handler_response.content_type \
+                and handler_response.encoded_body is None \
+                and isinstance(handler_response.body, ResourceJSONRepresentation) \
+                and get_encoder(self.content_type) is not None:
+            # Encode the representation in the negotiated media type
+            handler_response.content_type = self.content_type
         self.response.status_int = handler_response.status_code
-        self.response.headerlist = handler_response.headers.iteritems()
-        self.response.body = handler_response.write_body()
+        self.response.headerlist = handler_response.headerlist
+        self.__add_cache_headers(handler_response)
+        if handler_response.streamable:
+            # Sent while it is encoded, see handle_request
+            self.response.app_iter = StreamingBody(handler_response.iter_body())
+        else:
+            self.response.body = handler_response.write_body()
         return self.response
 
+    def __add_cache_headers(self, handler_response):
+        """Adds the caching headers declared by the CachePolicy of the
+        method to successful GET and HEAD responses, unless the handler
+        already set a Cache-Control header.
+        """
+        method = self.method_description
+        if method is None or method.cache is None:
+            return
+        if self.http_method not in ('GET', 'HEAD'):
+            return
+        if not 200 <= handler_response.status_code < 300:
+            return
+        if 'Cache-Control' in handler_response.headers:
+            return
+        self.response.headerlist.extend(method.cache_headers)
+
     def handle_unexpected_error(self, error):
         """Handles the given unexpected error.
 
         Unexpected error is something that should return a 500 status code
         and also write to log the context and error details.
 
+        In production mode (the 'skue.production' setting) the client gets a
+        pre-encoded 500 response and only a sample of the errors is logged,
+        as set by the 'skue.error_log_sample_rate' setting (0.0 to 1.0).
+        Otherwise the error is raised again with its traceback.
+
         Args:
           error: The unexpected error to handle.
 
         Returns:
           An HTTP 500 error response if not in development environment.
         """
-        # return self.error(500)
-        raise error.__class__(traceback.format_exc(error))
+        if not asbool(self.get_setting('skue.production', False)):
+            if sys.exc_info()[1] is error:
+                # Raised again with its original traceback
+                raise
+            raise error
+        sample_rate = float(self.get_setting('skue.error_log_sample_rate', 1.0))
+        if sample_rate >= 1.0 or random.random() < sample_rate:
+            logger.error('An unexpected error has occurred', exc_info=True)
+        return self.send_response(CommonResponse.internal_server_error())
+
+    def enqueue(self, function, *args, **kwargs):
+        """Queues the given function in the job queue and creates a 202
+        response whose Location is the status resource of the new job.
+
+        Raises:
+          ServiceUnavailableError: The job queue is full
+        """
+        job_id = self.job_queue.submit(function, *args, **kwargs)
+        status_uri = ''.join([self.request.host_url,
+                              self.job_status_path.format(id=job_id)])
+        return CommonResponse.resource_creation_queued(status_uri=status_uri)
+
+    def idempotency_scope(self):
+        """Gets the identity of the caller that scopes its Idempotency-Key
+        values. Defaults to the authenticated user id of the request, so
+        all the anonymous requests share a scope; override it to scope the
+        keys by something else (e.g. an API client).
+        """
+        return getattr(self.request, 'authenticated_userid', None)
+
+    def require_reference(self, name, value, exists, cache=None):
+        """Ensures a parameter value references an existing resource.
+
+        Args:
+          name: The name of the parameter holding the reference
+          value: The identifier of the referenced resource
+          exists: A function that queries the storage for the identifier
+          cache: An optional ExistenceCache of the referenced resources
+
+        Raises:
+          UnknownReferenceError: The referenced resource does not exist
+        """
+        found = cache.lookup(value) if cache is not None else None
+        if found is None:
+            found = exists(value)
+            if cache is not None:
+                cache.remember(value, found)
+        if not found:
+            raise UnknownReferenceError(name, value)
+
+    def get_setting(self, name, default=None):
+        """Gets the value of a setting of the Pyramid application
+
+        Args:
+          name: The name of the setting. E.g. 'skue.production'
+          default: The value to return when the setting is not defined
+        """
+        registry = getattr(self.request, 'registry', None)
+        settings = getattr(registry, 'settings', None)
+        if not settings:
+            return default
+        return settings.get(name, default)
 
     #===========================================================================
     # The HTTP Method Handlers
@@ -390,6 +1214,62 @@ class RestResource(BaseHandler):
         """
         return CommonResponse.method_not_allowed(self.get_allowed_methods())
 
+    def create_resources(self, batch, *args, **kwargs):
+        """Creates the resources of a bulk request.
+
+        Override to insert the whole batch at once. By default it calls
+        create_resource once per item.
+
+        Args:
+          batch: The list of validated parameter dictionaries
+
+        Returns:
+          A list with a HandlerHttpResponse or ResponseError per item, in
+          the order of the batch
+        """
+        return self.process_batch(self.create_resource, batch, *args, **kwargs)
+
+    def update_resources(self, batch, *args, **kwargs):
+        """Updates the resources of a bulk request.
+
+        Override to update the whole batch at once. By default it calls
+        update_resource once per item.
+        """
+        return self.process_batch(self.update_resource, batch, *args, **kwargs)
+
+    def delete_resources(self, batch, *args, **kwargs):
+        """Removes the resources of a bulk request.
+
+        Override to remove the whole batch at once. By default it calls
+        delete_resource once per item.
+        """
+        return self.process_batch(self.delete_resource, batch, *args, **kwargs)
+
+
+#===============================================================================
+# Relation helpers
+#===============================================================================
+def _relation_keys(item, relation):
+    """Gets the list of related identifiers held by an item"""
+    if isinstance(item, dict):
+        value = item.get(relation.key)
+    else:
+        value = getattr(item, relation.key, None)
+    if value is None:
+        return []
+    return list(value) if relation.many else [value]
+
+def _embed(item, field, related):
+    """Sets an embedded related resource in an item"""
+    if isinstance(item, dict):
+        item[field] = related
+    else:
+        setattr(item, field, related)
+        fields = getattr(item, '_fields', None)
+        if fields is not None and field not in fields:
+            # The expanded relations are part of the sparse fieldset
+            item._fields = fields.union([field])
+
 
 #===============================================================================
 # DocumentResource
@@ -399,7 +1279,7 @@ class DocumentResource(RestResource):
     to represent a singular concept.
     Individual items that could be part of a Collection resource.
     """
-    pass
+    __slots__ = ()
 
 #===============================================================================
 # StoreDocumentResource
@@ -417,26 +1297,66 @@ class StoreDocumentResource(RestResource):
     an existing resource with a provided identification value in order
     to the object to create itself or return it's representation.
     """
-    # Will store the URI for a newly created item
-    _new_resource_uri = ""
+    __slots__ = ('_new_resource_uri',)
+
+    # An optional ExistenceCache shared by the instances of the resource
+    existence_cache = None
+    # The name of the route placeholder with the identifier of the resource
+    identifier_name = 'id'
+
+    def __init__(self, request):
+        RestResource.__init__(self, request)
+        # Will store the URI for a newly created item
+        self._new_resource_uri = ""
 
     @property
     def new_resource_uri(self):
         """Return the newly created resource URI"""
         return self._new_resource_uri
 
+    def get_identifier(self, args, kwargs):
+        """Gets the identifier of the resource from the handler arguments or
+        else from the identifier_name placeholder of the matched route.
+        """
+        if len(args) > 0 or len(kwargs) > 0:
+            return args[0] if len(args) else next(iter(kwargs.values()))
+        return (self.request.matchdict or {}).get(self.identifier_name)
+
     def put(self, *args, **kwargs):
         """Handler implementation of an HTTP PUT method."""
-        if len(args) > 0 or len(kwargs) > 0:
-            identifier = args[0] if len(args) else kwargs.values()[0]
-            if self.exists(identifier):
+        identifier = self.get_identifier(args, kwargs)
+        if identifier is not None:
+            if self.resource_exists(identifier):
                 # update an existing resource
-                super(StoreDocumentResource, self).handle_request(self.update_resource, *args, **kwargs)
+                return super(StoreDocumentResource, self).handle_request(self.update_resource, *args, **kwargs)
             else:
                 # create a new resource
                 self._new_resource_uri = self.request.path
-                super(StoreDocumentResource, self).handle_request(self.create_resource, *args, **kwargs)
+                response = super(StoreDocumentResource, self).handle_request(self.create_resource, *args, **kwargs)
+                if self.existence_cache is not None and response.status_int < 300:
+                    self.existence_cache.added(identifier)
+                return response
 
+    def delete(self, *args, **kwargs):
+        """Handler implementation of an HTTP DELETE method."""
+        response = super(StoreDocumentResource, self).delete(*args, **kwargs)
+        if self.existence_cache is not None and response.status_int < 300:
+            identifier = self.get_identifier(args, kwargs)
+            if identifier is not None:
+                self.existence_cache.removed(identifier)
+        return response
+
+    def resource_exists(self, identifier):
+        """Gets if the given identifier is associated to an existing
+        resource, asking the existence cache before calling exists.
+        """
+        if self.existence_cache is None:
+            return self.exists(identifier)
+        found = self.existence_cache.lookup(identifier)
+        if found is None:
+            found = self.exists(identifier)
+            self.existence_cache.remember(identifier, found)
+        return found
 
     def exists(self, identifier):
         """Gets a value to indicate if the given identifier it's already
@@ -459,9 +1379,19 @@ class CollectionResource(RestResource):
     """Represents a Collection resource. A Collection resource is a list of
     items or other resources handled by the Server.
     """
-    # Will store the offset and limit for pagination in GET requests
-    _offset = 0
-    _count = 100
+    __slots__ = ('_offset', '_count')
+
+    # A JSON array of items can be sent to POST, PUT and DELETE
+    allow_bulk = True
+    # The compiled coercers for the pagination parameters
+    _offset_coercer = staticmethod(compile_coercer('int', minimum=0))
+    _count_coercer = staticmethod(compile_coercer('int', minimum=0))
+
+    def __init__(self, request):
+        RestResource.__init__(self, request)
+        # Will store the offset and limit for pagination in GET requests
+        self._offset = 0
+        self._count = 100
 
     @property
     def offset(self):
@@ -475,9 +1405,44 @@ class CollectionResource(RestResource):
 
     def get(self, *args, **kwargs):
         """Handler implementation of an HTTP GET method."""
-        self._offset = int(self.request.params.get("offset", default_value="0"))
-        self._count  = int(self.request.params.get("count", default_value="100"))
-        super(CollectionResource, self).handle_request(self.read_resource, *args, **kwargs)
+        return super(CollectionResource, self).handle_request(self.read_collection, *args, **kwargs)
+
+    def read_collection(self, *args, **kwargs):
+        """Loads the pagination parameters and reads the collection.
+
+        Raises:
+          InvalidParameterFormatError: The offset or count are not valid
+                                       non negative integers.
+        """
+        self._offset = self.__pagination_value('offset', self._offset_coercer, 0)
+        self._count = self.__pagination_value('count', self._count_coercer, 100)
+        return self.read_resource(*args, **kwargs)
+
+    def collection(self, columns, rows, total=None, layout=OBJECTS_LAYOUT,
+                   object_type='Collection'):
+        """Creates the representation of a page of rows read from a cursor,
+        with the offset and count of the request and its sparse fieldset.
+
+        Args:
+          columns: The names of the columns
+          rows: The sequence of row tuples
+          total: The total number of items of the collection (optional)
+          layout: OBJECTS_LAYOUT or COLUMNS_LAYOUT
+          object_type: The type of the represented objects
+        """
+        return CollectionJSONRepresentation(columns, rows, object_type, layout,
+                                            offset=self.offset, count=self.count,
+                                            total=total, fields=self.fields)
+
+    def __pagination_value(self, name, coercer, default):
+        """Gets the typed value of a pagination parameter of the request"""
+        value = self.request.params.get(name)
+        if value is None:
+            return default
+        try:
+            return coercer(value)
+        except (ValueError, TypeError):
+            raise InvalidParameterFormatError(parameter=name)
 
 
 #===============================================================================
@@ -487,9 +1452,14 @@ class StoreResource(RestResource):
     """Represents an Store resource. An Store resource is a collection of
     resources handled by the client.
     """
+    __slots__ = ()
+
+    # A JSON array of items can be sent to PUT and DELETE
+    allow_bulk = True
+
     def post(self, *args, **kwargs):
         """Handler implementation of an HTTP POST method."""
-        super(StoreResource, self).handle_request(self.post_not_allowed, *args, **kwargs)
+        return super(StoreResource, self).handle_request(self.post_not_allowed, *args, **kwargs)
 
     def post_not_allowed(self, *args, **kwargs):
         """Returns a response to indicate that the POST method should not
@@ -504,21 +1474,103 @@ class ControllerResource(RestResource):
     """Represents a Controller resource. A Controller resource is a model
     to the concept of a procedure. Some action that is going to be executed
     over other resources but doesn't quite map to the CRUD model.
+
+    CPU bound actions can set run_in_process to True and implement the
+    execute_in_process class method instead of execute. The request is
+    validated in the web process and only the payload is sent to the
+    shared process pool, whose size is the 'skue.process_pool_size' setting.
     """
+    __slots__ = ()
+
+    # Indicates if the action runs in the shared process pool
+    run_in_process = False
+    # The maximum seconds to wait for an action running in the process pool
+    process_timeout = 30
+
     def post(self, *args, **kwargs):
         """Handler implementation of an HTTP POST method."""
-        super(ControllerResource, self).handle_request(self.execute, *args, **kwargs)
+        method = self.execute_remote if self.run_in_process else self.execute
+        return super(ControllerResource, self).handle_request(method, *args, **kwargs)
 
     def execute(self, *args, **kwargs):
         """Performs the execution of the controller's action"""
         return CommonResponse.method_not_allowed(self.get_allowed_methods())
 
+    def execute_remote(self, *args, **kwargs):
+        """Performs the execution of the controller's action in the shared
+        process pool.
+
+        Raises:
+          ServiceUnavailableError: The process pool is not available
+          GatewayTimeoutError: The action took more than process_timeout
+        """
+        pool_size = self.get_setting('skue.process_pool_size')
+        if pool_size is not None:
+            pool_size = int(pool_size)
+        timeout = self.process_timeout
+        if self.deadline is not None:
+            timeout = min(timeout, self.remaining_time)
+        result = call_in_process(type(self), self.payload, timeout, pool_size)
+        return self.process_result(result)
+
+    @classmethod
+    def execute_in_process(cls, payload):
+        """Performs the action in a pool process when run_in_process is set.
+
+        Args:
+          payload: The validated parameters of the request
+
+        Returns:
+          A picklable result for process_result, such as a module level
+          ResourceJSONRepresentation subclass instance
+        """
+        raise NotImplementedError
+
+    def process_result(self, result):
+        """Creates the response for the result of execute_in_process"""
+        if isinstance(result, ResourceJSONRepresentation):
+            return CommonResponse.success(result)
+        body = ResourceJSONRepresentation('Result')
+        body.status = "OK"
+        body.result = result
+        return CommonResponse.success(body)
+
+
+#===============================================================================
+# JobStatusResource
+#===============================================================================
+class JobStatusResource(DocumentResource):
+    """A read only resource with the status of the jobs of the job queue.
+
+    Register it at the job_status_path of the resources that queue jobs.
+    The job identifier is taken from the 'id' of the route match.
+    """
+    __slots__ = ()
+
+    def describe_resource(self):
+        """Self description of the job status resource"""
+        get_method = HttpMethodDescription(
+            'GET', description='Get the status of a queued job')
+        return ResourceDescription('JobStatusResource',
+                                   url=self.job_status_path,
+                                   methods=[get_method],
+                                   description='Status of the queued jobs')
+
+    def read_resource(self, *args, **kwargs):
+        """Retrieve the status of the job."""
+        job_id = args[0] if len(args) else (self.request.matchdict or {}).get('id')
+        job = self.job_queue.store.get(job_id) if job_id else None
+        if job is None:
+            return CommonResponse.resource_not_found()
+        return CommonResponse.success(JobJSONRepresentation(job, self.fields))
+
 
 #===============================================================================
 # ApiDocumentationResource
 #===============================================================================
 class ApiDocumentationResource(BaseHandler):
     """A new kind of resource that allows you to self-document your entire API"""
+    __slots__ = ()
 
     #===========================================================================
     # The HTTP Method Handlers
@@ -530,7 +1582,7 @@ class ApiDocumentationResource(BaseHandler):
     def options(self, *args, **kwargs):
         """Handler implementation of an HTTP OPTIONS method.
         """
-        self.create_api_documentation(*args, **kwargs)
+        return self.create_api_documentation(*args, **kwargs)
 
     def post(self, *args, **kwargs):
         """Handler implementation of an HTTP POST method."""
@@ -552,12 +1604,19 @@ class ApiDocumentationResource(BaseHandler):
           the data for the response.
         """
         self.response.status_int = handler_response.status_code
-        self.response.headerlist = handler_response.headers.iteritems()
+        self.response.headerlist = handler_response.headerlist
         self.response.body = handler_response.write_body()
         return self.response
 
     def create_api_documentation(self, *args, **kwargs):
         """Creates the API documentation and return it to consumers"""
+        registry = getattr(self.request, 'registry', None)
+        encoded_body = getattr(registry, 'skue_api_documentation', None)
+        if encoded_body is not None:
+            # Precompiled by the add_skue_api_documentation directive
+            return self.send_response(
+                CommonResponse.options('OPTIONS', None, encoded_body=encoded_body))
+
         import main
         resources = []
         for web_handler in main.API_HANDLERS:
@@ -0,0 +1,192 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Copyright (c) 2012 The Skuë Project
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+# ***** Python built-in modules *****
+import math
+from datetime import datetime
+
+__copyright__ = u"Copyright 2012, The Skuë Project"
+__license__ = "MIT"
+
+
+# The accepted textual values for boolean parameters
+TRUE_VALUES = frozenset(['1', 'true', 'yes', 'on'])
+FALSE_VALUES = frozenset(['0', 'false', 'no', 'off'])
+
+# The formats used to parse date and datetime parameters
+DATE_FORMAT = '%Y-%m-%d'
+DATETIME_FORMAT = '%Y-%m-%dT%H:%M:%S'
+
+# The separator used for list parameters. E.g. 'tags=a,b,c'
+LIST_SEPARATOR = ','
+
+
+#===============================================================================
+# Basic coercers
+#===============================================================================
+def to_string(value):
+    """Returns the given value untouched. Strings are the wire format."""
+    return value
+
+def to_int(value):
+    """Converts the given value to an integer.
+
+    Raises:
+      ValueError: The value is not an integral number.
+    """
+    if isinstance(value, bool):
+        raise ValueError(value)
+    if isinstance(value, float):
+        if not value.is_integer():
+            raise ValueError(value)
+    return int(value)
+
+def to_float(value):
+    """Converts the given value to a float.
+
+    Raises:
+      ValueError: The value is not a finite number ('nan' and 'inf' would
+                  pass any bounds check and cannot be encoded as JSON).
+    """
+    if isinstance(value, bool):
+        raise ValueError(value)
+    value = float(value)
+    if math.isnan(value) or math.isinf(value):
+        raise ValueError(value)
+    return value
+
+def to_bool(value):
+    """Converts the given value to a boolean.
+
+    Accepts the values in TRUE_VALUES and FALSE_VALUES regardless of case.
+
+    Raises:
+      ValueError: The value is not a recognized boolean literal.
+    """
+    if isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    if text in TRUE_VALUES:
+        return True
+    if text in FALSE_VALUES:
+        return False
+    raise ValueError(value)
+
+def to_date(value):
+    """Converts the given 'YYYY-MM-DD' value to a datetime.date object.
+
+    Raises:
+      ValueError: The value does not conform with DATE_FORMAT.
+    """
+    return datetime.strptime(value, DATE_FORMAT).date()
+
+def to_datetime(value):
+    """Converts the given 'YYYY-MM-DDTHH:MM:SS' value to a datetime object.
+
+    Raises:
+      ValueError: The value does not conform with DATETIME_FORMAT.
+    """
+    return datetime.strptime(value, DATETIME_FORMAT)
+
+def to_file(value):
+    """Accepts an uploaded file (see pyramid_skue.uploads.UploadedFile).
+
+    Raises:
+      TypeError: The value is text instead of a file.
+    """
+    if not hasattr(value, 'read'):
+        raise TypeError(value)
+    return value
+
+
+# Maps the parameter_type names of HttpParameterDescription to coercers.
+# Types not listed here are documentation only and are left as strings.
+COERCERS = {
+    'string': to_string,
+    'str': to_string,
+    'int': to_int,
+    'integer': to_int,
+    'float': to_float,
+    'number': to_float,
+    'bool': to_bool,
+    'boolean': to_bool,
+    'date': to_date,
+    'datetime': to_datetime,
+    'enum': to_string,
+    'file': to_file,
+}
+
+
+#===============================================================================
+# compile_coercer
+#===============================================================================
+def compile_coercer(parameter_type, choices=None, minimum=None, maximum=None):
+    """Builds a single callable that converts and validates a parameter value.
+
+    The returned callable performs only the checks the parameter actually
+    declares, so it should be built once per parameter description and
+    reused for every request.
+
+    Args:
+      parameter_type: The type name of the parameter. A 'list:<type>' value
+                      (or just 'list') describes a comma separated list whose
+                      items are converted with the coercer of <type>.
+      choices: An optional collection with the only accepted values.
+      minimum: An optional lower bound (inclusive) for the value.
+      maximum: An optional upper bound (inclusive) for the value.
+
+    Returns:
+      A function that receives the raw value and returns the typed value.
+      The function raises ValueError or TypeError for invalid values.
+    """
+    type_name = (parameter_type or 'string').lower()
+    if type_name == 'list' or type_name.startswith('list:'):
+        item_type = type_name[5:] or 'string'
+        item_coercer = compile_coercer(item_type, choices, minimum, maximum)
+
+        def coerce_list(value):
+            if isinstance(value, (list, tuple)):
+                items = value
+            elif len(value) == 0:
+                items = []
+            else:
+                items = value.split(LIST_SEPARATOR)
+            return [item_coercer(item) for item in items]
+        return coerce_list
+
+    coercer = COERCERS.get(type_name, to_string)
+    if choices is None and minimum is None and maximum is None:
+        return coercer
+
+    allowed = frozenset(choices) if choices is not None else None
+
+    def coerce_checked(value):
+        value = coercer(value)
+        if allowed is not None and value not in allowed:
+            raise ValueError(value)
+        if minimum is not None and value < minimum:
+            raise ValueError(value)
+        if maximum is not None and value > maximum:
+            raise ValueError(value)
+        return value
+    return coerce_checked
@@ -0,0 +1,330 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Copyright (c) 2012 The Skuë Project
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+# ***** Python built-in modules *****
+import time
+import sqlite3
+import logging
+import threading
+
+# ***** Application modules *****
+from .errors import ServiceUnavailableError
+
+__copyright__ = u"Copyright 2012, The Skuë Project"
+__license__ = "MIT"
+
+
+logger = logging.getLogger(__name__)
+
+
+#===============================================================================
+# ConnectionPool
+#===============================================================================
+class ConnectionPool(object):
+    """A thread-safe pool of DB-API connections.
+
+    Connections are created on demand up to the pool size and reused last
+    in first out. When every connection is in use the callers wait for one
+    to be released, up to a timeout.
+    """
+
+    def __init__(self, factory, size=10, timeout=5.0):
+        """Creates a new ConnectionPool
+
+        Args:
+          factory: A function without arguments that opens a new connection
+          size: The maximum number of open connections
+          timeout: The default maximum seconds to wait for a connection
+        """
+        self.factory = factory
+        self.size = size
+        self.timeout = timeout
+        self._idle = []
+        self._condition = threading.Condition(threading.Lock())
+        self._closed = False
+        # Counters
+        self.created = 0
+        self.in_use = 0
+        self.max_in_use = 0
+        self.waiting = 0
+        self.acquired = 0
+        self.timeouts = 0
+
+    @property
+    def metrics(self):
+        """A dictionary with the usage counters of the pool. The saturation
+        is the fraction of the connections in use.
+        """
+        return {
+            'size': self.size,
+            'created': self.created,
+            'in_use': self.in_use,
+            'idle': len(self._idle),
+            'max_in_use': self.max_in_use,
+            'waiting': self.waiting,
+            'acquired': self.acquired,
+            'timeouts': self.timeouts,
+            'saturation': float(self.in_use) / self.size,
+        }
+
+    def acquire(self, timeout=None):
+        """Takes a connection from the pool.
+
+        Args:
+          timeout: The maximum seconds to wait. Defaults to the pool timeout
+
+        Raises:
+          ServiceUnavailableError: No connection was released in time
+        """
+        if timeout is None:
+            timeout = self.timeout
+        deadline = time.time() + timeout
+        create = False
+        with self._condition:
+            while True:
+                if self._closed:
+                    raise ServiceUnavailableError()
+                if self._idle:
+                    connection = self._idle.pop()
+                    break
+                if self.created < self.size:
+                    # Reserve the slot, the connection is opened unlocked
+                    self.created += 1
+                    create = True
+                    break
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    self.timeouts += 1
+                    raise ServiceUnavailableError(retry_after=1)
+                self.waiting += 1
+                try:
+                    self._condition.wait(remaining)
+                finally:
+                    self.waiting -= 1
+            self.__checked_out()
+        if create:
+            try:
+                connection = self.factory()
+            except Exception:
+                with self._condition:
+                    self.created -= 1
+                    self.in_use -= 1
+                    self._condition.notify()
+                raise
+        return connection
+
+    def release(self, connection):
+        """Returns a connection to the pool"""
+        with self._condition:
+            self.in_use -= 1
+            if self._closed:
+                self.created -= 1
+                connection.close()
+            else:
+                self._idle.append(connection)
+            self._condition.notify()
+
+    def discard(self, connection):
+        """Closes a broken connection instead of returning it to the pool"""
+        with self._condition:
+            self.in_use -= 1
+            self.created -= 1
+            self._condition.notify()
+        try:
+            connection.close()
+        except Exception:
+            logger.exception('Cannot close a discarded connection')
+
+    def close(self):
+        """Closes the idle connections, the ones in use are closed when
+        released
+        """
+        with self._condition:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self.created -= len(idle)
+            self._condition.notify_all()
+        for connection in idle:
+            connection.close()
+
+    def __checked_out(self):
+        """Updates the counters of a connection taken. Must be called
+        holding the lock.
+        """
+        self.in_use += 1
+        self.acquired += 1
+        if self.in_use > self.max_in_use:
+            self.max_in_use = self.in_use
+
+
+#===============================================================================
+# StorageSession
+#===============================================================================
+class StorageSession(object):
+    """The storage of a single request.
+
+    The connection is checked out from the pool on first use and released
+    when the request ends (see RestResource.handle_request), committing or
+    rolling back the transaction.
+    """
+
+    def __init__(self, pool, readonly, timeout=None):
+        """Creates a new StorageSession
+
+        Args:
+          pool: The ConnectionPool to take the connection from
+          readonly: True if the session was routed to the read pool
+          timeout: The maximum seconds to wait for a connection
+        """
+        self.pool = pool
+        self.readonly = readonly
+        self.timeout = timeout
+        self._connection = None
+
+    @property
+    def connection(self):
+        """The DB-API connection of the request"""
+        if self._connection is None:
+            self._connection = self.pool.acquire(self.timeout)
+        return self._connection
+
+    def execute(self, statement, parameters=()):
+        """Executes a statement and returns its cursor"""
+        cursor = self.connection.cursor()
+        cursor.execute(statement, parameters)
+        return cursor
+
+    def release(self, commit=True):
+        """Ends the transaction and returns the connection to the pool.
+
+        Args:
+          commit: True to commit the transaction, False to roll it back
+        """
+        connection, self._connection = self._connection, None
+        if connection is None:
+            return
+        try:
+            if commit and not self.readonly:
+                connection.commit()
+            else:
+                connection.rollback()
+        except Exception:
+            logger.exception('Cannot end the transaction of a connection')
+            self.pool.discard(connection)
+        else:
+            self.pool.release(connection)
+
+
+#===============================================================================
+# StorageAdapter
+#===============================================================================
+class StorageAdapter(object):
+    """Routes the storage sessions of the requests to connection pools.
+
+    Requests that only read (GET, HEAD and OPTIONS) use the read pool, the
+    others use the primary (write) pool. Without a read pool every request
+    uses the primary pool.
+    """
+
+    # The HTTP methods routed to the read pool
+    read_methods = frozenset(['GET', 'HEAD', 'OPTIONS'])
+
+    def __init__(self, write_pool, read_pool=None):
+        """Creates a new StorageAdapter
+
+        Args:
+          write_pool: The ConnectionPool of the primary database
+          read_pool: An optional ConnectionPool of the read replicas
+        """
+        self.write_pool = write_pool
+        self.read_pool = read_pool
+
+    @property
+    def metrics(self):
+        """A dictionary with the metrics of each pool"""
+        metrics = {'write': self.write_pool.metrics}
+        if self.read_pool is not None:
+            metrics['read'] = self.read_pool.metrics
+        return metrics
+
+    def session(self, http_method, timeout=None):
+        """Creates the StorageSession of a request.
+
+        Args:
+          http_method: The HTTP method of the request. E.g. 'GET'
+          timeout: The maximum seconds to wait for a connection
+        """
+        if self.read_pool is not None and http_method in self.read_methods:
+            return StorageSession(self.read_pool, True, timeout)
+        return StorageSession(self.write_pool, False, timeout)
+
+    def close(self):
+        """Closes the pools"""
+        self.write_pool.close()
+        if self.read_pool is not None:
+            self.read_pool.close()
+
+
+#===============================================================================
+# SqliteStorage
+#===============================================================================
+class SqliteStorage(StorageAdapter):
+    """The reference StorageAdapter on a sqlite database file.
+
+    The database uses the WAL journal so the readers don't block the single
+    writer, and the read connections are opened in query only mode. Meant
+    for tests and benchmarks.
+    """
+
+    def __init__(self, path, read_pool_size=4, timeout=5.0):
+        """Creates a new SqliteStorage
+
+        Args:
+          path: The path of the database file (not ':memory:', every
+                connection would get its own database)
+          read_pool_size: The number of read connections, 0 to read from
+                          the write connection
+          timeout: The maximum seconds to wait for a connection or a lock
+        """
+        self.path = path
+        self.timeout = timeout
+        write_pool = ConnectionPool(self.__connect_writer, 1, timeout)
+        read_pool = None
+        if read_pool_size:
+            read_pool = ConnectionPool(self.__connect_reader, read_pool_size,
+                                       timeout)
+        StorageAdapter.__init__(self, write_pool, read_pool)
+
+    def __connect(self):
+        return sqlite3.connect(self.path, timeout=self.timeout,
+                               check_same_thread=False)
+
+    def __connect_writer(self):
+        connection = self.__connect()
+        connection.execute('PRAGMA journal_mode=WAL')
+        return connection
+
+    def __connect_reader(self):
+        connection = self.__connect()
+        connection.execute('PRAGMA query_only=ON')
+        return connection
@@ -0,0 +1,290 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Copyright (c) 2012 The Skuë Project
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+# ***** Python built-in modules *****
+import hashlib
+from tempfile import SpooledTemporaryFile
+
+# ***** Application modules *****
+from .errors import PayloadTooLargeError, InvalidParameterFormatError
+
+__copyright__ = u"Copyright 2012, The Skuë Project"
+__license__ = "MIT"
+
+
+# The bytes read from the request body at a time
+CHUNK_SIZE = 64 * 1024
+# The maximum size of the headers of a multipart part
+MAX_PART_HEADERS = 16 * 1024
+
+
+#===============================================================================
+# UploadedFile
+#===============================================================================
+class UploadedFile(object):
+    """A file sent in the body of a request.
+
+    The content is kept in memory up to a threshold and in a temporary file
+    beyond it. The size and the SHA-256 digest are computed while the body
+    is read, so the content doesn't need to be read again to get them.
+    """
+
+    def __init__(self, name, filename=None, content_type=None,
+                 memory_threshold=1024 * 1024):
+        """Creates a new (empty) UploadedFile
+
+        Args:
+          name: The name of the parameter
+          filename: The file name given by the client (if any)
+          content_type: The media type given by the client (if any)
+          memory_threshold: The bytes kept in memory before spooling to disk
+        """
+        self.name = name
+        self.filename = filename
+        self.content_type = content_type
+        self.file = SpooledTemporaryFile(max_size=memory_threshold)
+        self.size = 0
+        self._hash = hashlib.sha256()
+
+    @property
+    def sha256(self):
+        """The hexadecimal SHA-256 digest of the content"""
+        return self._hash.hexdigest()
+
+    @property
+    def on_disk(self):
+        """True if the content was spooled to a temporary file"""
+        return getattr(self.file, '_rolled', False)
+
+    def write(self, data):
+        """Appends data to the content"""
+        self.file.write(data)
+        self.size += len(data)
+        self._hash.update(data)
+
+    def read(self, size=-1):
+        """Reads from the content (rewound once the upload is complete)"""
+        return self.file.read(size)
+
+    def seek(self, offset, whence=0):
+        return self.file.seek(offset, whence)
+
+    def close(self):
+        """Releases the memory or the temporary file of the content"""
+        self.file.close()
+
+
+#===============================================================================
+# _BodyReader
+#===============================================================================
+class _BodyReader(object):
+    """Reads a request body in chunks enforcing a maximum size"""
+
+    def __init__(self, stream, max_size):
+        self.stream = stream
+        self.max_size = max_size
+        self.size = 0
+
+    def read(self):
+        """Gets the next chunk, or an empty string at the end"""
+        chunk = self.stream.read(CHUNK_SIZE)
+        self.size += len(chunk)
+        if self.max_size is not None and self.size > self.max_size:
+            raise PayloadTooLargeError(self.max_size)
+        return chunk
+
+
+#===============================================================================
+# spool_body
+#===============================================================================
+def spool_body(stream, name, content_type=None, max_size=None,
+               memory_threshold=1024 * 1024):
+    """Reads a whole request body as a single uploaded file.
+
+    Args:
+      stream: The body stream. E.g. request.body_file
+      name: The name of the file parameter
+      content_type: The media type of the body
+      max_size: The maximum size of the body in bytes
+      memory_threshold: The bytes kept in memory before spooling to disk
+
+    Raises:
+      PayloadTooLargeError: The body is larger than max_size
+    """
+    upload = UploadedFile(name, content_type=content_type,
+                          memory_threshold=memory_threshold)
+    reader = _BodyReader(stream, max_size)
+    try:
+        chunk = reader.read()
+        while chunk:
+            upload.write(chunk)
+            chunk = reader.read()
+    except Exception:
+        upload.close()
+        raise
+    upload.seek(0)
+    return upload
+
+#===============================================================================
+# parse_multipart
+#===============================================================================
+def parse_multipart(stream, boundary, max_size=None, max_fields_size=1024 * 1024,
+                    memory_threshold=1024 * 1024):
+    """Parses a multipart/form-data body incrementally.
+
+    The file parts are written to UploadedFile objects while the body is
+    read, so only a chunk of the body is in memory at a time (plus the
+    files below the memory threshold).
+
+    Args:
+      stream: The body stream. E.g. request.body_file
+      boundary: The boundary parameter of the Content-Type header
+      max_size: The maximum size of the body in bytes
+      max_fields_size: The maximum total size of the non file fields
+      memory_threshold: The bytes of each file kept in memory before
+                        spooling it to disk
+
+    Returns:
+      A dictionary with the value (a text or an UploadedFile) of each field
+
+    Raises:
+      PayloadTooLargeError: The body or its fields are too large
+      InvalidParameterFormatError: The body is not a valid multipart body
+    """
+    reader = _BodyReader(stream, max_size)
+    delimiter = b'--' + boundary.encode('ascii')
+    separator = b'\r\n' + delimiter
+    payload = {}
+    files = []
+    fields_size = 0
+    buffer = b''
+    try:
+        # Skip the preamble up to the first delimiter
+        while delimiter not in buffer:
+            chunk = reader.read()
+            if not chunk:
+                raise InvalidParameterFormatError(parameter='body')
+            buffer = buffer[-len(delimiter):] + chunk
+        buffer = buffer[buffer.index(delimiter) + len(delimiter):]
+        while True:
+            # After a delimiter comes a new part or the end of the body
+            while len(buffer) < 2:
+                chunk = reader.read()
+                if not chunk:
+                    raise InvalidParameterFormatError(parameter='body')
+                buffer += chunk
+            if buffer[:2] == b'--':
+                break
+            # The headers of the part
+            while b'\r\n\r\n' not in buffer:
+                if len(buffer) > MAX_PART_HEADERS:
+                    raise InvalidParameterFormatError(parameter='body')
+                chunk = reader.read()
+                if not chunk:
+                    raise InvalidParameterFormatError(parameter='body')
+                buffer += chunk
+            headers, _, buffer = buffer[2:].partition(b'\r\n\r\n')
+            name, filename, content_type = _part_headers(headers)
+            if filename is not None:
+                target = UploadedFile(name, filename, content_type,
+                                      memory_threshold)
+                files.append(target)
+            else:
+                target = []
+            # The content of the part, up to the next delimiter
+            while True:
+                index = buffer.find(separator)
+                if index >= 0:
+                    data, buffer = buffer[:index], buffer[index + len(separator):]
+                else:
+                    # Keep what could be the start of a separator
+                    keep = len(separator) - 1
+                    data, buffer = buffer[:-keep], buffer[-keep:]
+                if data:
+                    if filename is not None:
+                        target.write(data)
+                    else:
+                        fields_size += len(data)
+                        if fields_size > max_fields_size:
+                            raise PayloadTooLargeError(max_fields_size)
+                        target.append(data)
+                if index >= 0:
+                    break
+                chunk = reader.read()
+                if not chunk:
+                    raise InvalidParameterFormatError(parameter='body')
+                buffer += chunk
+            if filename is not None:
+                target.seek(0)
+                payload[name] = target
+            else:
+                payload[name] = _decode(b''.join(target))
+    except Exception:
+        for upload in files:
+            upload.close()
+        raise
+    return payload
+
+def _decode(data):
+    """Decodes the given UTF-8 bytes of a multipart body
+
+    Raises:
+      InvalidParameterFormatError: The bytes are not valid UTF-8
+    """
+    try:
+        return data.decode('utf-8')
+    except UnicodeDecodeError:
+        raise InvalidParameterFormatError(parameter='body')
+
+def _part_headers(headers):
+    """Gets the (name, filename, content type) of a multipart part"""
+    name = filename = content_type = None
+    for line in _decode(headers).split('\r\n'):
+        header, _, value = line.partition(':')
+        header = header.strip().lower()
+        if header == 'content-disposition':
+            for item in value.split(';')[1:]:
+                key, _, item_value = item.strip().partition('=')
+                item_value = item_value.strip().strip('"')
+                if key == 'name':
+                    name = item_value
+                elif key == 'filename':
+                    filename = item_value
+        elif header == 'content-type':
+            content_type = value.strip()
+    if name is None:
+        raise InvalidParameterFormatError(parameter='body')
+    return name, filename, content_type
+
+#===============================================================================
+# multipart_boundary
+#===============================================================================
+def multipart_boundary(content_type_header):
+    """Gets the boundary of a 'multipart/form-data; boundary=...' header
+    value, or None
+    """
+    for item in (content_type_header or '').split(';')[1:]:
+        key, _, value = item.strip().partition('=')
+        if key.lower() == 'boundary' and value:
+            return value.strip('"')
+    return None
@@ -27,8 +27,14 @@ Created on Apr 3, 2012
 # FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
 # OTHER DEALINGS IN THE SOFTWARE.
 
+from __future__ import absolute_import
+
 # ***** Python built-in modules *****
-import urllib
+import json
+
+# ***** Application modules *****
+from .compat import to_native, to_text, unquote_plus
+from .errors import InvalidParameterFormatError
 
 __author__ = "Greivin Lopez"
 __copyright__ = u"Copyright 2012, The Skuë Project"
@@ -53,17 +59,50 @@ def parse_body(body):
       A dictionary with all the parameters extracted from the provided
       value. E.g. { 'name':'value', 'name2':'value2' }
 
-    Note: All argument values will be strings.
+    Note: All argument values will be native strings (byte strings on
+    Python 2, text on Python 3).
+
+    Raises:
+      InvalidParameterFormatError: The body is not valid UTF-8
     """
     output = {}
     if len(body) > 0:
+        try:
+            body = to_native(body)
+        except UnicodeDecodeError:
+            raise InvalidParameterFormatError(parameter='body')
         parameters = body.split('&')
         for parameter in parameters:
             parsed = parameter.split('=')
             if len(parsed) > 1:
-                output[parsed[0]] = urllib.unquote_plus(parsed[1])
+                output[parsed[0]] = unquote_plus(parsed[1])
     return output
 
+#===============================================================================
+# parse_bulk_body
+#===============================================================================
+def parse_bulk_body(body):
+    """Parses the given JSON body of a bulk request.
+
+    Args
+      body: The body of the request. E.g. '[{"name": "value"}, {...}]'
+
+    Returns:
+      A list with one dictionary of parameters per item, or None if the
+      body is not a JSON array.
+
+    Raises:
+      ValueError: The body is not valid JSON or an item is not an object.
+    """
+    body = to_text(body)
+    if not body.lstrip().startswith('['):
+        return None
+    items = json.loads(body)
+    for item in items:
+        if not isinstance(item, dict):
+            raise ValueError(item)
+    return items
+
 #===============================================================================
 # restify
 #===============================================================================
@@ -17,6 +17,8 @@ setup(name='pyramid_skue',
       classifiers=[
           "Programming Language :: Python",
           "Programming Language :: Python :: 2",
+          "Programming Language :: Python :: 2.7",
+          "Programming Language :: Python :: 3",
           "Framework :: Pyramid",
           "Topic :: Internet :: WWW/HTTP",
       ],
@@ -24,10 +26,13 @@ setup(name='pyramid_skue',
       author_email='kipanshi@gmail.com',
       url='https://github.com/kipanshi/pyramid_skue',
       keywords='web pyramid pylons rest api',
-      packages=find_packages(),
+      packages=find_packages(exclude=['tests']),
       include_package_data=True,
       zip_safe=False,
       install_requires=requires,
-      tests_require=requires,
+      extras_require={
+          'msgpack': ['msgpack>=0.6'],
+      },
+      tests_require=requires + ['pytest'],
       test_suite="pyramid_skue",
       )
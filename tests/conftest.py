@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Copyright (c) 2012 The Skuë Project
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+# ***** Third party modules *****
+import pytest
+
+# ***** Pyramid modules *****
+from pyramid.config import Configurator
+from pyramid.registry import Registry
+from pyramid.request import Request
+
+__copyright__ = u"Copyright 2012, The Skuë Project"
+__license__ = "MIT"
+
+
+#===============================================================================
+# Fixtures
+#===============================================================================
+@pytest.fixture
+def make_app():
+    """Gets a function that creates a WSGI application with the given
+    resource classes registered with add_skue_resource and the given
+    settings.
+    """
+    def make_app(*resources, **settings):
+        config = Configurator(settings=settings)
+        config.include('pyramid_skue')
+        for resource in resources:
+            config.add_skue_resource(resource)
+        return config.make_wsgi_app()
+    return make_app
+
+
+@pytest.fixture
+def call():
+    """Gets a function that handles a request with a new instance of the
+    given resource class (without routing) and returns the response.
+    """
+    def call(resource_class, path='/', settings=None, **kwargs):
+        request = Request.blank(path, **kwargs)
+        if settings is not None:
+            request.registry = Registry()
+            request.registry.settings = settings
+        return resource_class(request)()
+    return call
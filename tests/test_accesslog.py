@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Copyright (c) 2012 The Skuë Project
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+# ***** Python built-in modules *****
+import json
+
+# ***** Third party modules *****
+import pytest
+
+# ***** Application modules *****
+from pyramid_skue.accesslog import AccessLog
+from pyramid_skue.http import CommonResponse
+from pyramid_skue.rest.api import ResourceDescription, HttpMethodDescription
+from pyramid_skue.rest.api import HttpParameterDescription
+from pyramid_skue.rest.resources import CollectionResource
+
+__copyright__ = u"Copyright 2012, The Skuë Project"
+__license__ = "MIT"
+
+
+class Items(CollectionResource):
+
+    def describe_resource(self):
+        return ResourceDescription('Items', url='/items', methods=[
+            HttpMethodDescription('POST', parameters=[
+                HttpParameterDescription('number', 'int', is_required=True)])])
+
+    def create_resource(self):
+        return CommonResponse.resource_created(u'/items/%d' % self.payload['number'])
+
+
+def read_records(path):
+    with open(path) as log_file:
+        return [json.loads(line) for line in log_file]
+
+
+def test_requests_are_logged(call, tmp_path):
+    path = str(tmp_path / 'access.log')
+    Items.access_log = access_log = AccessLog(path)
+    try:
+        call(Items, '/items', method='POST', body=b'number=1',
+             content_type='application/x-www-form-urlencoded')
+        call(Items, '/items', method='POST', body=b'number=x',
+             content_type='application/x-www-form-urlencoded')
+    finally:
+        Items.access_log = None
+        access_log.close()
+    records = read_records(path)
+    assert [record['status'] for record in records] == [201, 400]
+    assert [record['validation'] for record in records] == ['passed', 'failed']
+    assert records[0]['resource'] == 'Items'
+    assert records[0]['operation'] == 'create_resource'
+    assert records[0]['response_size'] > 0
+    assert 'handler' in records[0]['timings']
+
+
+def test_records_are_dropped_when_the_queue_is_full(tmp_path):
+    access_log = AccessLog(str(tmp_path / 'access.log'), max_queued=2,
+                           batch_size=100, flush_interval=60)
+    results = [access_log.emit({'number': number}) for number in range(3)]
+    access_log.close()
+    assert results == [True, True, False]
+    assert access_log.stats['written'] == 2
+    assert access_log.stats['dropped'] == 1
+
+
+def test_unserializable_records_are_counted(tmp_path):
+    access_log = AccessLog(str(tmp_path / 'access.log'), flush_interval=60)
+    access_log.emit({'value': object()})
+    access_log.emit({'value': 1})
+    access_log.close()
+    assert access_log.stats['failed'] == 1
+    assert access_log.stats['written'] == 1
+
+
+def test_a_destination_is_required():
+    with pytest.raises(ValueError):
+        AccessLog()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Copyright (c) 2012 The Skuë Project
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+# ***** Python built-in modules *****
+import json
+import logging
+
+# ***** Third party modules *****
+import pytest
+
+# ***** Application modules *****
+from pyramid_skue.errors import UnknownReferenceError
+from pyramid_skue.http import CommonResponse
+from pyramid_skue.rest.api import ResourceDescription, HttpMethodDescription
+from pyramid_skue.rest.api import HttpParameterDescription
+from pyramid_skue.rest.resources import CollectionResource
+
+__copyright__ = u"Copyright 2012, The Skuë Project"
+__license__ = "MIT"
+
+
+class Items(CollectionResource):
+    max_bulk_items = 4
+
+    def describe_resource(self):
+        return ResourceDescription('Items', url='/items', methods=[
+            HttpMethodDescription('POST', parameters=[
+                HttpParameterDescription('number', 'int', is_required=True),
+                HttpParameterDescription('name')])])
+
+    def create_resource(self):
+        if self.payload['number'] == 9:
+            raise UnknownReferenceError('number', 9)
+        if self.payload['number'] == 8:
+            return CommonResponse.resource_not_found()
+        return CommonResponse.resource_created(u'/items/%d' % self.payload['number'])
+
+
+class ShortBatch(Items):
+    def create_resources(self, batch):
+        return [CommonResponse.resource_created(u'/items/1')]
+
+
+class PayloadCheck(Items):
+    def create_resources(self, batch):
+        payload = self.payload
+        results = self.process_batch(self.create_resource, batch)
+        assert self.payload is payload
+        return results
+
+
+def post(call, resource_class, items, **kwargs):
+    return call(resource_class, '/items', method='POST',
+                body=json.dumps(items).encode('utf-8'),
+                content_type='application/json', **kwargs)
+
+
+def test_every_item_gets_its_status(call):
+    response = post(call, Items, [{'number': 1, 'name': 'one', 'extra': 1},
+                                  {'number': 'x'}, {'name': 'none'}, {'number': 9}])
+    assert response.status_int == 207
+    objects = json.loads(response.body.decode('utf-8'))['objects']
+    assert [item['status'] for item in objects] == [201, 400, 400, 404]
+    assert objects[0]['uri'] == '/items/1'
+    assert objects[2]['message'] == 'The number parameter is missed.'
+
+
+def test_static_item_responses_keep_their_message(call):
+    response = post(call, Items, [{'number': 8}])
+    objects = json.loads(response.body.decode('utf-8'))['objects']
+    assert objects == [{'index': 0, 'status': 404,
+                        'message': 'The resource could not be found'}]
+
+
+def test_bulk_limit(call):
+    response = post(call, Items, [{'number': number} for number in range(5)])
+    assert response.status_int == 413
+
+
+def test_items_must_be_objects(call):
+    assert post(call, Items, [{'number': 1}, 3]).status_int == 400
+
+
+def test_single_item_requests_are_unchanged(call):
+    response = call(Items, '/items', method='POST', body=b'number=4',
+                    content_type='application/x-www-form-urlencoded')
+    assert response.status_int == 201
+
+
+def test_missing_batch_results_are_an_error(call, caplog):
+    with caplog.at_level(logging.ERROR):
+        response = post(call, ShortBatch, [{'number': 1}, {'number': 2}],
+                        settings={'skue.production': 'true'})
+    assert response.status_int == 500
+    assert 'create_resources returned 1 results for 2 items' in caplog.text
+
+
+def test_process_batch_restores_the_payload(call):
+    response = post(call, PayloadCheck, [{'number': 1}, {'number': 2}])
+    assert response.status_int == 207
+
+
+def test_missing_batch_results_raise_in_development_mode(call):
+    with pytest.raises(ValueError) as error:
+        post(call, ShortBatch, [{'number': 1}, {'number': 2}])
+    assert 'create_resources returned 1 results for 2 items' in str(error.value)
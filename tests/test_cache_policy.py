@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Copyright (c) 2012 The Skuë Project
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+# ***** Application modules *****
+from pyramid_skue.http import CommonResponse
+from pyramid_skue.rest.api import ResourceDescription, HttpMethodDescription
+from pyramid_skue.rest.api import CachePolicy, RepresentationType
+from pyramid_skue.rest.resources import DocumentResource
+
+__copyright__ = u"Copyright 2012, The Skuë Project"
+__license__ = "MIT"
+
+
+class Page(DocumentResource):
+
+    def describe_resource(self):
+        return ResourceDescription('Page', url='/page', methods=[
+            HttpMethodDescription('GET', languages=['en', 'es'],
+                                  cache=CachePolicy(max_age=60))])
+
+    def read_resource(self):
+        return CommonResponse.simple_success('page')
+
+
+def test_responses_are_private_by_default(call):
+    response = call(Page, '/page')
+    assert response.headers['Cache-Control'] == 'private, max-age=60'
+
+
+def test_language_parameter_needs_no_vary(call):
+    response = call(Page, '/page?lang=es')
+    assert 'Vary' not in response.headers
+
+
+def test_public_policy():
+    policy = CachePolicy(max_age=60, s_maxage=600, public=True)
+    assert policy.cache_control == 'public, max-age=60, s-maxage=600'
+
+
+def test_vary_on_accept_and_extra_headers():
+    method = HttpMethodDescription(
+        'GET', representations=[RepresentationType.JSON, RepresentationType.XML],
+        languages=['en', 'es'])
+    policy = CachePolicy(max_age=60, vary=('Accept', 'Authorization'))
+    assert dict(policy.headers(method))['Vary'] == 'Accept, Authorization'
@@ -0,0 +1,141 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Copyright (c) 2012 The Skuë Project
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+# ***** Python built-in modules *****
+import json
+import sqlite3
+
+# ***** Third party modules *****
+import pytest
+
+# ***** Application modules *****
+from pyramid_skue.encoders import get_encoder, get_decoder
+from pyramid_skue.http import CommonResponse, StreamingBody
+from pyramid_skue.json.utils import CollectionJSONRepresentation, COLUMNS_LAYOUT
+from pyramid_skue.rest.api import ResourceDescription, HttpMethodDescription
+from pyramid_skue.rest.api import RelationDescription
+from pyramid_skue.rest.api import RepresentationType as ContentType
+from pyramid_skue.rest.resources import CollectionResource
+from pyramid_skue.storage import SqliteStorage
+
+__copyright__ = u"Copyright 2012, The Skuë Project"
+__license__ = "MIT"
+
+
+COLUMNS = ['id', 'title', 'author_id']
+ROWS = [(1, 'One', 7), (2, 'Two', 8), (3, 'Three', 7)]
+
+
+class Posts(CollectionResource):
+
+    def describe_resource(self):
+        return ResourceDescription('Posts', url='/posts', methods=[
+            HttpMethodDescription('GET')], relations=[
+            RelationDescription('author', 'author_id')])
+
+    def read_resource(self):
+        if self.storage is not None:
+            rows = self.storage_session.execute(
+                'SELECT id, title, author_id FROM posts ORDER BY id')
+        else:
+            rows = iter(ROWS)
+        layout = self.request.params.get('layout', 'objects')
+        body = self.collection(COLUMNS, rows, total=3, layout=layout)
+        body.next = '/posts?offset=3'
+        return CommonResponse.success(body)
+
+    def load_relations(self, name, keys):
+        return dict([(key, {'id': key}) for key in keys])
+
+
+def get(call, path):
+    response = call(Posts, path)
+    assert response.status_int == 200
+    return json.loads(response.body.decode('utf-8'))
+
+
+def test_objects_layout_with_extra_attributes(call):
+    body = get(call, '/posts')
+    assert body['objects'][0] == {'id': 1, 'title': 'One', 'author_id': 7}
+    assert len(body['objects']) == 3
+    assert (body['offset'], body['count'], body['total']) == (0, 100, 3)
+    assert body['next'] == '/posts?offset=3'
+
+
+def test_expand_and_fields_together(call):
+    body = get(call, '/posts?fields=id&expand=author')
+    assert body['objects'] == [{'id': 1, 'author': {'id': 7}},
+                               {'id': 2, 'author': {'id': 8}},
+                               {'id': 3, 'author': {'id': 7}}]
+    assert body['total'] == 3
+
+
+def test_columns_layout_with_fields(call):
+    body = get(call, '/posts?layout=columns&fields=title,id')
+    assert body['columns'] == ['id', 'title']
+    assert body['rows'] == [[1, 'One'], [2, 'Two'], [3, 'Three']]
+    assert body['next'] == '/posts?offset=3'
+
+
+def test_chunks_are_joined(monkeypatch):
+    monkeypatch.setattr('pyramid_skue.json.utils.ROWS_PER_CHUNK', 2)
+    for layout in ('objects', COLUMNS_LAYOUT):
+        collection = CollectionJSONRepresentation(COLUMNS, iter(ROWS), layout=layout)
+        chunks = list(collection.iter_json())
+        assert len(chunks) == 3
+        body = json.loads(''.join(chunks))
+        assert len(body.get('objects', body.get('rows'))) == 3
+    empty = CollectionJSONRepresentation(COLUMNS, [], count=10)
+    assert json.loads(empty.as_json()) == {'objects': [], 'count': 10}
+
+
+def test_other_encoders_apply_the_fields():
+    pytest.importorskip('msgpack')
+    collection = CollectionJSONRepresentation(COLUMNS, iter(ROWS), offset=0,
+                                              fields=frozenset(['id']))
+    packed = get_encoder(ContentType.MSGPACK)(collection)
+    body = get_decoder(ContentType.MSGPACK)(packed)
+    assert body == {'objects': [{'id': 1}, {'id': 2}, {'id': 3}], 'offset': 0}
+
+
+def test_cursor_is_streamed_before_the_connection_is_released(call, tmp_path):
+    path = str(tmp_path / 'posts.db')
+    connection = sqlite3.connect(path)
+    connection.execute('CREATE TABLE posts (id INTEGER, title TEXT, author_id INTEGER)')
+    connection.executemany('INSERT INTO posts VALUES (?, ?, ?)', ROWS)
+    connection.commit()
+    connection.close()
+    Posts.storage = storage = SqliteStorage(path, read_pool_size=1)
+    try:
+        response = call(Posts, '/posts')
+        assert isinstance(response.app_iter, StreamingBody)
+        assert response.content_length is None
+        # The cursor is read while the body is sent
+        assert storage.read_pool.metrics['in_use'] == 1
+        body = b''.join(response.app_iter)
+        response.app_iter.close()
+        assert storage.read_pool.metrics['in_use'] == 0
+        assert len(json.loads(body.decode('utf-8'))['objects']) == 3
+    finally:
+        Posts.storage = None
+        storage.close()
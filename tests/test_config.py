@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Copyright (c) 2012 The Skuë Project
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+# ***** Third party modules *****
+import pytest
+
+# ***** Pyramid modules *****
+from pyramid.exceptions import ConfigurationError
+from pyramid.request import Request
+
+# ***** Application modules *****
+from pyramid_skue.http import CommonResponse
+from pyramid_skue.rest.api import ResourceDescription, HttpMethodDescription
+from pyramid_skue.rest.resources import DocumentResource
+
+__copyright__ = u"Copyright 2012, The Skuë Project"
+__license__ = "MIT"
+
+
+class Message(DocumentResource):
+
+    def describe_resource(self):
+        return ResourceDescription('Message', url='/message', methods=[
+            HttpMethodDescription('GET')])
+
+    def read_resource(self):
+        return CommonResponse.simple_success('hello')
+
+
+class RequestBound(Message):
+
+    def describe_resource(self):
+        return ResourceDescription('Bound', url=self.request.path)
+
+
+def test_routes_come_from_the_description(make_app):
+    app = make_app(Message)
+    assert Request.blank('/message').get_response(app).status_int == 200
+    response = Request.blank('/message', method='OPTIONS').get_response(app)
+    assert 'GET' in response.headers['Allow']
+
+
+def test_descriptions_reading_the_request_are_reported(make_app):
+    with pytest.raises(ConfigurationError) as error:
+        make_app(RequestBound)
+    assert 'RequestBound.describe_resource()' in str(error.value)
+
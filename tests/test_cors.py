@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Copyright (c) 2012 The Skuë Project
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+# ***** Third party modules *****
+import pytest
+
+# ***** Pyramid modules *****
+from pyramid.request import Request
+from pyramid.response import Response
+
+# ***** Application modules *****
+from pyramid_skue.cors import CorsPolicy
+from pyramid_skue.http import CommonResponse
+from pyramid_skue.rest.api import ResourceDescription, HttpMethodDescription
+from pyramid_skue.rest.resources import DocumentResource
+
+__copyright__ = u"Copyright 2012, The Skuë Project"
+__license__ = "MIT"
+
+
+ORIGIN = 'https://app.example.com'
+
+
+class Message(DocumentResource):
+    cors = CorsPolicy(origins=[ORIGIN], credentials=True, max_age=60)
+
+    def describe_resource(self):
+        return ResourceDescription('Message', url='/message', methods=[
+            HttpMethodDescription('GET'), HttpMethodDescription('PUT')])
+
+    def read_resource(self):
+        self.response.headers['Vary'] = 'Accept, origin'
+        return CommonResponse.simple_success('hello')
+
+
+def test_credentials_need_explicit_origins():
+    with pytest.raises(ValueError):
+        CorsPolicy(credentials=True)
+    with pytest.raises(ValueError):
+        CorsPolicy(origins=['*', ORIGIN], credentials=True)
+
+
+def test_preflight(make_app):
+    app = make_app(Message)
+    request = Request.blank('/message', method='OPTIONS', headers={
+        'Origin': ORIGIN, 'Access-Control-Request-Method': 'PUT'})
+    response = request.get_response(app)
+    assert response.status_int == 204
+    assert response.headers['Access-Control-Allow-Origin'] == ORIGIN
+    assert response.headers['Access-Control-Allow-Credentials'] == 'true'
+    request.headers['Origin'] = 'https://evil.example.com'
+    assert request.get_response(app).status_int == 403
+
+
+def test_actual_requests_echo_allowed_origins(make_app):
+    app = make_app(Message)
+    response = Request.blank('/message', headers={'Origin': ORIGIN}).get_response(app)
+    assert response.headers['Access-Control-Allow-Origin'] == ORIGIN
+    other = Request.blank('/message', headers={'Origin': 'https://evil.example.com'})
+    assert 'Access-Control-Allow-Origin' not in other.get_response(app).headers
+
+
+def test_origin_is_added_to_vary_once():
+    plan = Message.cors.compile(['GET'])
+    response = Response()
+    plan.decorate(ORIGIN, response)
+    plan.decorate(ORIGIN, response)
+    assert response.headers['Vary'] == 'Origin'
+    response = Response(headerlist=[('Vary', 'Accept, origin')])
+    plan.decorate(ORIGIN, response)
+    assert response.headers['Vary'] == 'Accept, origin'
+    response = Response(headerlist=[('Vary', 'Accept')])
+    plan.decorate(ORIGIN, response)
+    assert response.headers['Vary'] == 'Accept, Origin'
+
+
+def test_any_origin_without_credentials():
+    plan = CorsPolicy().compile(['GET'])
+    response = Response()
+    plan.decorate(ORIGIN, response)
+    assert response.headers['Access-Control-Allow-Origin'] == '*'
+    assert 'Vary' not in response.headers
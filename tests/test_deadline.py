@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Copyright (c) 2012 The Skuë Project
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+# ***** Python built-in modules *****
+import time
+
+# ***** Application modules *****
+from pyramid_skue.http import CommonResponse
+from pyramid_skue.rest.api import ResourceDescription, HttpMethodDescription
+from pyramid_skue.rest.resources import CollectionResource
+
+__copyright__ = u"Copyright 2012, The Skuë Project"
+__license__ = "MIT"
+
+
+CREATED = []
+
+
+class Slow(CollectionResource):
+
+    def describe_resource(self):
+        return ResourceDescription('Slow', url='/slow', methods=[
+            HttpMethodDescription('GET', timeout=0.05),
+            HttpMethodDescription('POST', timeout=0.05)])
+
+    def read_resource(self):
+        time.sleep(0.1)
+        return CommonResponse.simple_success('late')
+
+    def create_resource(self):
+        time.sleep(0.1)
+        CREATED.append(1)
+        return CommonResponse.resource_created(u'/slow/1')
+
+
+def test_late_safe_requests_are_504(call):
+    assert call(Slow, '/slow').status_int == 504
+
+
+def test_late_unsafe_requests_report_their_result(call):
+    del CREATED[:]
+    response = call(Slow, '/slow', method='POST')
+    assert CREATED == [1]
+    assert response.status_int == 201
+
+
+def test_non_finite_deadlines_are_rejected(call):
+    for value in ('nan', 'inf', '-inf', 'soon'):
+        response = call(Slow, '/slow', headers={'X-Request-Deadline': value})
+        assert response.status_int == 400
+
+
+def test_past_deadline_stops_before_the_handler(call):
+    del CREATED[:]
+    response = call(Slow, '/slow', method='POST',
+                    headers={'X-Request-Deadline': str(time.time() - 1)})
+    assert response.status_int == 504
+    assert CREATED == []
@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Copyright (c) 2012 The Skuë Project
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+# ***** Third party modules *****
+import pytest
+
+# ***** Application modules *****
+from pyramid_skue.encoders import get_encoder, get_decoder
+from pyramid_skue.http import CommonResponse
+from pyramid_skue.json.utils import ResourceJSONRepresentation
+from pyramid_skue.rest.api import ResourceDescription, HttpMethodDescription
+from pyramid_skue.rest.api import HttpParameterDescription
+from pyramid_skue.rest.api import RepresentationType as ContentType
+from pyramid_skue.rest.resources import CollectionResource
+
+__copyright__ = u"Copyright 2012, The Skuë Project"
+__license__ = "MIT"
+
+msgpack = pytest.importorskip('msgpack')
+
+BOTH = [ContentType.JSON, ContentType.MSGPACK]
+
+
+class Items(CollectionResource):
+
+    def describe_resource(self):
+        return ResourceDescription('Items', url='/items', methods=[
+            HttpMethodDescription('GET', representations=BOTH),
+            HttpMethodDescription('POST', representations=BOTH, parameters=[
+                HttpParameterDescription('number', 'int', is_required=True),
+                HttpParameterDescription('name')])])
+
+    def read_resource(self):
+        body = ResourceJSONRepresentation('Items', self.fields)
+        body.objects = [{'id': 1, 'name': u'Caf\xe9'}]
+        body.count = self.count
+        return CommonResponse.success(body)
+
+    def create_resource(self):
+        return CommonResponse.resource_created(u'/items/%d' % self.payload['number'])
+
+
+def test_responses_are_encoded_as_requested(call):
+    response = call(Items, '/items', headers={'Accept': ContentType.MSGPACK})
+    assert response.status_int == 200
+    assert response.content_type == ContentType.MSGPACK
+    body = msgpack.unpackb(response.body, raw=False)
+    assert body == {'objects': [{'id': 1, 'name': u'Caf\xe9'}], 'count': 100}
+
+
+def test_request_bodies_are_decoded(call):
+    response = call(Items, '/items', method='POST',
+                    body=msgpack.packb({'number': '4', 'name': 'four'}),
+                    content_type=ContentType.MSGPACK,
+                    headers={'Accept': ContentType.MSGPACK})
+    assert response.status_int == 201
+
+
+def test_malformed_bodies_are_rejected(call):
+    response = call(Items, '/items', method='POST', body=b'\xc1',
+                    content_type=ContentType.MSGPACK)
+    assert response.status_int == 400
+
+
+@pytest.mark.parametrize('name', ['fields', 'lang', 'expand'])
+def test_non_text_reserved_parameters_are_rejected(call, name):
+    response = call(Items, '/items', method='POST',
+                    body=msgpack.packb({'number': '4', name: 5}),
+                    content_type=ContentType.MSGPACK)
+    assert response.status_int == 400
+
+
+def test_encoders_agree_with_json():
+    body = ResourceJSONRepresentation('Item', frozenset(['id']))
+    body.id = 1
+    body.name = 'hidden'
+    assert get_encoder(ContentType.JSON)(body) == b'{"id": 1}'
+    packed = get_encoder(ContentType.MSGPACK)(body)
+    assert get_decoder(ContentType.MSGPACK)(packed) == {'id': 1}
@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Copyright (c) 2012 The Skuë Project
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+# ***** Third party modules *****
+import pytest
+
+# ***** Pyramid modules *****
+from pyramid.request import Request
+
+# ***** Application modules *****
+from pyramid_skue.cache import LRUCache, BloomFilter, ExistenceCache
+from pyramid_skue.errors import UnknownReferenceError
+from pyramid_skue.http import CommonResponse
+from pyramid_skue.rest.api import ResourceDescription, HttpMethodDescription
+from pyramid_skue.rest.resources import StoreDocumentResource
+
+__copyright__ = u"Copyright 2012, The Skuë Project"
+__license__ = "MIT"
+
+
+def make_resource(existing):
+    """Creates a StoreDocumentResource class over the given set, which
+    records the identifiers queried with exists
+    """
+    class Document(StoreDocumentResource):
+        existence_cache = ExistenceCache(100, bloom=BloomFilter(1000))
+        queries = []
+
+        def describe_resource(self):
+            return ResourceDescription('Document', url='/documents/{id}', methods=[
+                HttpMethodDescription('PUT'), HttpMethodDescription('DELETE')])
+
+        def exists(self, identifier):
+            self.queries.append(identifier)
+            return identifier in existing
+
+        def create_resource(self, identifier):
+            existing.add(identifier)
+            return CommonResponse.resource_created(u'/documents/' + identifier)
+
+        def update_resource(self, identifier):
+            return CommonResponse.simple_success('Updated')
+
+        def delete_resource(self, identifier):
+            existing.discard(identifier)
+            return CommonResponse.simple_success('Deleted')
+
+    Document.existence_cache.bloom.update(existing)
+    return Document
+
+
+def test_lru_cache_discards_the_least_recently_used():
+    cache = LRUCache(2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1
+    cache.set('c', 3)
+    assert cache.get('b') is None
+    assert (cache.get('a'), cache.get('c'), len(cache)) == (1, 3, 2)
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(1000, error_rate=0.01)
+    bloom.update(range(1000))
+    assert all(number in bloom for number in range(1000))
+    false_positives = sum(1 for number in range(1000, 11000) if number in bloom)
+    assert false_positives < 300
+
+
+def test_put_skips_the_known_identifiers():
+    Document = make_resource(set(['a']))
+    for method, identifier, status in [('PUT', 'a', 200), ('PUT', 'a', 200),
+                                       ('PUT', 'b', 201), ('PUT', 'b', 200),
+                                       ('DELETE', 'b', 200), ('PUT', 'b', 201)]:
+        resource = Document(Request.blank('/documents/' + identifier, method=method))
+        response = getattr(resource, method.lower())(identifier)
+        assert response.status_int == status
+    # 'a' is queried once and 'b' is ruled out by the bloom filter, then
+    # known after its create. Once deleted it is queried again, since
+    # missing identifiers are not cached.
+    assert Document.queries == ['a', 'b']
+    stats = Document.existence_cache.stats
+    assert (stats['misses'], stats['bloom_hits']) == (2, 1)
+
+
+def test_missing_identifiers_are_not_cached():
+    existing = set(['a'])
+    Document = make_resource(existing)
+    cache = Document.existence_cache
+    assert Document(None).resource_exists('a')
+    cache.removed('a')
+    # Another worker creates 'a' again
+    assert Document(None).resource_exists('a')
+    assert Document.queries == ['a', 'a']
+    assert cache.lookup('a') is True
+
+
+def test_require_reference_uses_the_cache():
+    cache = ExistenceCache()
+    queries = []
+
+    def exists(value):
+        queries.append(value)
+        return value == 1
+
+    resource = make_resource(set())(None)
+    resource.require_reference('author', 1, exists, cache)
+    resource.require_reference('author', 1, exists, cache)
+    with pytest.raises(UnknownReferenceError):
+        resource.require_reference('author', 2, exists, cache)
+    with pytest.raises(UnknownReferenceError):
+        resource.require_reference('author', 2, exists, cache)
+    assert queries == [1, 2, 2]
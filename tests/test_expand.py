@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Copyright (c) 2012 The Skuë Project
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+# ***** Python built-in modules *****
+import json
+
+# ***** Application modules *****
+from pyramid_skue.http import CommonResponse
+from pyramid_skue.json.utils import ResourceJSONRepresentation
+from pyramid_skue.rest.api import ResourceDescription, HttpMethodDescription
+from pyramid_skue.rest.api import RelationDescription
+from pyramid_skue.rest.resources import CollectionResource
+
+__copyright__ = u"Copyright 2012, The Skuë Project"
+__license__ = "MIT"
+
+
+LOADED = []
+
+
+class Posts(CollectionResource):
+
+    def describe_resource(self):
+        return ResourceDescription('Posts', url='/posts', methods=[
+            HttpMethodDescription('GET')], relations=[
+            RelationDescription('author', 'author_id'),
+            RelationDescription('author.company', 'company_id')])
+
+    def read_resource(self):
+        body = ResourceJSONRepresentation('Posts', self.fields)
+        body.objects = [{'id': 1, 'title': 'One', 'author_id': 7},
+                        {'id': 2, 'title': 'Two', 'author_id': 7}]
+        body.offset = self.offset
+        return CommonResponse.success(body)
+
+    def load_relations(self, name, keys):
+        LOADED.append((name, keys))
+        if name == 'author':
+            return dict([(key, {'id': key, 'company_id': 3}) for key in keys])
+        return dict([(key, {'id': key, 'name': 'ACME'}) for key in keys])
+
+
+class PostsWithAuthorLoader(Posts):
+
+    def read_resource(self):
+        names = self.loader('author', lambda keys: dict((key, 'Ann') for key in keys))
+        response = Posts.read_resource(self)
+        for item in response.body.objects:
+            item['author_name'] = names.load(item['author_id'])
+        return response
+
+
+def get(call, path, resource_class=Posts):
+    response = call(resource_class, path)
+    assert response.status_int == 200
+    return json.loads(response.body.decode('utf-8'))
+
+
+def test_relations_are_embedded_in_the_objects(call):
+    del LOADED[:]
+    body = get(call, '/posts?expand=author')
+    assert [item['author']['id'] for item in body['objects']] == [7, 7]
+    assert LOADED == [('author', [7])]
+
+
+def test_fields_select_the_fields_of_the_objects(call):
+    body = get(call, '/posts?fields=id,title')
+    assert body['objects'] == [{'id': 1, 'title': 'One'}, {'id': 2, 'title': 'Two'}]
+    assert body['offset'] == 0
+
+
+def test_expand_and_fields_together(call):
+    body = get(call, '/posts?fields=id&expand=author.company')
+    assert body['objects'][0] == {
+        'id': 1, 'author': {'id': 7, 'company_id': 3,
+                            'company': {'id': 3, 'name': 'ACME'}}}
+    assert len(body['objects']) == 2
+
+
+def test_unknown_relations_are_rejected(call):
+    assert call(Posts, '/posts?expand=editor').status_int == 400
+
+
+def test_expand_loaders_are_apart_from_the_handler_loaders(call):
+    del LOADED[:]
+    body = get(call, '/posts?expand=author', PostsWithAuthorLoader)
+    assert body['objects'][0]['author'] == {'id': 7, 'company_id': 3}
+    assert body['objects'][0]['author_name'] == 'Ann'
+    assert LOADED == [('author', [7])]
@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Copyright (c) 2012 The Skuë Project
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+# ***** Python built-in modules *****
+import json
+
+# ***** Application modules *****
+from pyramid_skue.http import CommonResponse
+from pyramid_skue.json.utils import ResourceJSONRepresentation, parse_fields
+from pyramid_skue.rest.api import ResourceDescription, HttpMethodDescription
+from pyramid_skue.rest.resources import DocumentResource
+
+__copyright__ = u"Copyright 2012, The Skuë Project"
+__license__ = "MIT"
+
+
+COMPUTED = []
+
+
+class Product(DocumentResource):
+
+    def describe_resource(self):
+        return ResourceDescription('Product', url='/product', methods=[
+            HttpMethodDescription('GET')])
+
+    def read_resource(self):
+        assert 'fields' not in self.payload
+        product = ResourceJSONRepresentation('Product', self.fields)
+        product.id = 1
+        product.name = 'Chair'
+        if product.wants('price'):
+            COMPUTED.append('price')
+            product.price = 10
+        return CommonResponse.success(product)
+
+
+class PlainProduct(Product):
+
+    def read_resource(self):
+        if self.request.params.get('missing'):
+            return CommonResponse.resource_not_found()
+        product = ResourceJSONRepresentation('Product')
+        product.id = 1
+        product.name = 'Chair'
+        return CommonResponse.success(product)
+
+
+def get(call, path, resource_class=Product):
+    return json.loads(call(resource_class, path).body.decode('utf-8'))
+
+
+def test_every_field_by_default(call):
+    del COMPUTED[:]
+    assert get(call, '/product') == {'id': 1, 'name': 'Chair', 'price': 10}
+    assert COMPUTED == ['price']
+
+
+def test_only_the_selected_fields_are_built_and_encoded(call):
+    del COMPUTED[:]
+    assert get(call, '/product?fields=id,name') == {'id': 1, 'name': 'Chair'}
+    assert COMPUTED == []
+
+
+def test_unknown_fields_are_ignored(call):
+    assert get(call, '/product?fields=id,color') == {'id': 1}
+
+
+def test_the_fieldset_is_applied_to_any_representation(call):
+    assert get(call, '/product?fields=name', PlainProduct) == {'name': 'Chair'}
+
+
+def test_error_responses_keep_their_fields(call):
+    body = get(call, '/product?fields=name&missing=1', PlainProduct)
+    assert body['message'] == 'The resource could not be found'
+
+
+def test_parse_fields():
+    assert parse_fields(' id, name ,,') == frozenset(['id', 'name'])
+    assert parse_fields(' , ') is None
+
+
+def test_selected_keeps_the_given_order():
+    representation = ResourceJSONRepresentation('Product', frozenset(['b', 'a']))
+    assert representation.selected(['a', 'c', 'b']) == ['a', 'b']
+    assert ResourceJSONRepresentation('Product').selected(('c',)) == ['c']
@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Copyright (c) 2012 The Skuë Project
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+# ***** Python built-in modules *****
+import json
+
+# ***** Third party modules *****
+import pytest
+
+# ***** Application modules *****
+from pyramid_skue.http import HandlerHttpResponse, CommonResponse
+from pyramid_skue.json.utils import ResourceJSONRepresentation
+
+__copyright__ = u"Copyright 2012, The Skuë Project"
+__license__ = "MIT"
+
+
+def test_responses_are_slotted():
+    response = HandlerHttpResponse(200, 'application/json')
+    with pytest.raises(AttributeError):
+        response.extra = True
+
+
+def test_headers_are_per_instance():
+    first = HandlerHttpResponse(200, 'application/json')
+    first.headers['X-First'] = '1'
+    second = HandlerHttpResponse(200, 'text/plain')
+    assert second.headers == {'Content-Type': 'text/plain'}
+    assert first.headers == {'Content-Type': 'application/json', 'X-First': '1'}
+
+
+def test_content_type_sets_the_header():
+    response = HandlerHttpResponse(200, 'application/json', headers={'Allow': 'GET'})
+    response.content_type = 'text/plain'
+    assert sorted(response.headerlist) == [('Allow', 'GET'),
+                                           ('Content-Type', 'text/plain')]
+
+
+def test_encoded_bodies_are_sent_as_is():
+    encoded_body = b'{"status": "OK"}'
+    response = HandlerHttpResponse(200, 'application/json', body=None,
+                                   encoded_body=encoded_body)
+    assert response.write_body() is encoded_body
+
+
+def test_bodies_are_written_as_bytes():
+    body = ResourceJSONRepresentation('Test')
+    body.message = u'\xe9'
+    written = CommonResponse.success(body).write_body()
+    assert isinstance(written, bytes)
+    assert json.loads(written.decode('utf-8')) == {'message': u'\xe9'}
+    text = HandlerHttpResponse(200, 'text/plain', body=u'caf\xe9').write_body()
+    assert text == u'caf\xe9'.encode('utf-8')
+
+
+def test_created_location_is_a_native_string():
+    response = CommonResponse.resource_created(u'/items/1')
+    assert response.status_code == 201
+    assert response.headers['Location'] == '/items/1'
+    assert isinstance(response.headers['Location'], str)
@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Copyright (c) 2012 The Skuë Project
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+# ***** Third party modules *****
+import pytest
+
+# ***** Application modules *****
+from pyramid_skue.errors import IdempotencyKeyInProgressError
+from pyramid_skue.http import CommonResponse
+from pyramid_skue.idempotency import IdempotencyManager, request_fingerprint
+from pyramid_skue.rest.api import ResourceDescription, HttpMethodDescription
+from pyramid_skue.rest.api import HttpParameterDescription
+from pyramid_skue.rest.resources import CollectionResource
+from pyramid_skue.uploads import UploadedFile
+
+__copyright__ = u"Copyright 2012, The Skuë Project"
+__license__ = "MIT"
+
+
+CREATED = []
+
+
+class Items(CollectionResource):
+    idempotency = IdempotencyManager(wait_timeout=0.01)
+
+    def describe_resource(self):
+        return ResourceDescription('Items', url='/items', methods=[
+            HttpMethodDescription('POST', parameters=[
+                HttpParameterDescription('number', 'int', is_required=True)])])
+
+    def create_resource(self):
+        CREATED.append(self.payload['number'])
+        return CommonResponse.resource_created(u'/items/%d' % self.payload['number'])
+
+
+class UserItems(Items):
+    def idempotency_scope(self):
+        return self.request.headers.get('X-User')
+
+
+def post(call, number, key, resource_class=Items, **headers):
+    headers['Idempotency-Key'] = key
+    return call(resource_class, '/items', method='POST',
+                body=('number=%d' % number).encode('utf-8'),
+                content_type='application/x-www-form-urlencoded',
+                headers=headers)
+
+
+def test_repetitions_are_replayed(call):
+    del CREATED[:]
+    first = post(call, 1, 'replay')
+    second = post(call, 1, 'replay')
+    assert (first.status_int, second.status_int) == (201, 201)
+    assert second.headers['Idempotent-Replayed'] == 'true'
+    assert second.body == first.body
+    assert CREATED == [1]
+
+
+def test_reused_key_is_rejected(call):
+    assert post(call, 1, 'reused').status_int == 201
+    assert post(call, 2, 'reused').status_int == 422
+
+
+def test_keys_are_scoped_by_caller(call):
+    del CREATED[:]
+    first = post(call, 3, 'shared', UserItems, **{'X-User': 'alice'})
+    second = post(call, 3, 'shared', UserItems, **{'X-User': 'bob'})
+    assert (first.status_int, second.status_int) == (201, 201)
+    assert 'Idempotent-Replayed' not in second.headers
+    assert CREATED == [3, 3]
+    replay = post(call, 3, 'shared', UserItems, **{'X-User': 'bob'})
+    assert replay.headers['Idempotent-Replayed'] == 'true'
+
+
+def test_wait_timeout_answers_409_without_finishing_the_owner(call):
+    store_key = 'POST /items  in-flight'
+    assert Items.idempotency.begin(store_key) is None
+    try:
+        response = post(call, 1, 'in-flight')
+        assert response.status_int == 409
+        assert response.headers['Retry-After'] == '1'
+        # The owner still holds the key
+        assert store_key in Items.idempotency._in_flight
+    finally:
+        Items.idempotency.finish(store_key)
+    assert post(call, 1, 'in-flight').status_int == 201
+
+
+def test_begin_raises_on_wait_timeout():
+    manager = IdempotencyManager(wait_timeout=0.01)
+    assert manager.begin('key') is None
+    with pytest.raises(IdempotencyKeyInProgressError):
+        manager.begin('key')
+
+
+def test_fingerprint_ignores_the_parameter_order():
+    assert request_fingerprint({'a': 1, 'b': set([2, 1])}) == \
+        request_fingerprint({'b': set([1, 2]), 'a': 1})
+    assert request_fingerprint({'a': 1}) != request_fingerprint({'a': 2})
+
+
+def test_uploads_are_fingerprinted_by_digest():
+    first, second = UploadedFile('file'), UploadedFile('file')
+    first.write(b'content')
+    second.write(b'content')
+    assert request_fingerprint({'file': first}) == request_fingerprint({'file': second})
+    second.write(b'!')
+    assert request_fingerprint({'file': first}) != request_fingerprint({'file': second})
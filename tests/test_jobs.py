@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Copyright (c) 2012 The Skuë Project
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+# ***** Python built-in modules *****
+import threading
+
+# ***** Third party modules *****
+import pytest
+
+# ***** Application modules *****
+from pyramid_skue.errors import ServiceUnavailableError
+from pyramid_skue.jobs import JobQueue, MemoryJobStore, SqliteJobStore
+from pyramid_skue.jobs import SUCCEEDED, FAILED
+
+__copyright__ = u"Copyright 2012, The Skuë Project"
+__license__ = "MIT"
+
+
+def wait_for(store, job_id, timeout=5):
+    """Waits until the job is finished and gets it"""
+    event = threading.Event()
+    for _ in range(int(timeout / 0.01)):
+        job = store.get(job_id)
+        if job['status'] in (SUCCEEDED, FAILED):
+            return job
+        event.wait(0.01)
+    raise AssertionError('The job %s did not finish' % job_id)
+
+
+def test_unserializable_result_fails_the_job(tmp_path):
+    store = SqliteJobStore(str(tmp_path / 'jobs.db'))
+    jobs = JobQueue(store, workers=1)
+    try:
+        failed = jobs.submit(lambda: object())
+        assert wait_for(store, failed)['status'] == FAILED
+        # The worker survived
+        done = jobs.submit(lambda: {'answer': 42})
+        job = wait_for(store, done)
+        assert job['status'] == SUCCEEDED
+        assert job['result'] == {'answer': 42}
+        assert jobs.metrics['failed'] == 1
+        assert jobs.metrics['completed'] == 1
+    finally:
+        jobs.shutdown()
+
+
+def test_rejected_jobs_are_not_stored():
+    store = MemoryJobStore()
+    jobs = JobQueue(store, workers=1, max_queued=1)
+    release = threading.Event()
+    try:
+        running = jobs.submit(release.wait)
+        # Wait until the worker takes the first job so the queue is empty
+        for _ in range(500):
+            if jobs.active:
+                break
+            threading.Event().wait(0.01)
+        jobs.submit(release.wait)
+        with pytest.raises(ServiceUnavailableError):
+            jobs.submit(release.wait)
+        assert jobs.metrics['rejected'] == 1
+        assert len(store._jobs) == 2
+        assert running in store._jobs
+    finally:
+        release.set()
+        jobs.shutdown()
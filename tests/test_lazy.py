@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Copyright (c) 2012 The Skuë Project
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+# ***** Python built-in modules *****
+import logging
+
+# ***** Pyramid modules *****
+from pyramid.config import Configurator
+from pyramid.request import Request
+
+# ***** Application modules *****
+from pyramid_skue.http import CommonResponse
+from pyramid_skue.lazy import IMPORT_PROFILE, prewarm
+from pyramid_skue.rest.api import ResourceDescription, HttpMethodDescription
+from pyramid_skue.rest.resources import DocumentResource
+
+__copyright__ = u"Copyright 2012, The Skuë Project"
+__license__ = "MIT"
+
+
+class Greeting(DocumentResource):
+
+    def describe_resource(self):
+        return ResourceDescription('Greeting', url='/greeting', methods=[
+            HttpMethodDescription('GET')])
+
+    def read_resource(self):
+        return CommonResponse.simple_success('hello')
+
+
+def lazy_app(dotted_name, **settings):
+    config = Configurator(settings=settings)
+    config.include('pyramid_skue')
+    config.add_skue_lazy_resource(dotted_name, '/greeting')
+    app = config.make_wsgi_app()
+    return app, app.registry.skue_lazy_resources[0]
+
+
+def test_resource_is_imported_on_the_first_request():
+    app, view = lazy_app('tests.test_lazy.Greeting')
+    assert not view.loaded
+    response = Request.blank('/greeting').get_response(app)
+    assert response.status_int == 200
+    assert view.resource_class is Greeting
+    assert 'tests.test_lazy.Greeting' in IMPORT_PROFILE
+
+
+def test_prewarm_imports_the_resources():
+    app, view = lazy_app('tests.test_lazy:Greeting')
+    prewarm([view])
+    assert view.loaded
+
+
+def test_prewarm_logs_the_import_errors(caplog):
+    app, view = lazy_app('tests.test_lazy.Missing')
+    with caplog.at_level(logging.ERROR):
+        prewarm([view])
+    assert not view.loaded
+    assert 'tests.test_lazy.Missing' in caplog.text
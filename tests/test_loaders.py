@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Copyright (c) 2012 The Skuë Project
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+# ***** Python built-in modules *****
+import json
+
+# ***** Application modules *****
+from pyramid_skue.http import CommonResponse
+from pyramid_skue.json.utils import ResourceJSONRepresentation
+from pyramid_skue.loaders import BatchLoader
+from pyramid_skue.rest.api import ResourceDescription, HttpMethodDescription
+from pyramid_skue.rest.resources import CollectionResource
+
+__copyright__ = u"Copyright 2012, The Skuë Project"
+__license__ = "MIT"
+
+
+BATCHES = []
+
+
+def fetch(keys):
+    BATCHES.append(list(keys))
+    return dict([(key, 'author %d' % key) for key in keys if key != 0])
+
+
+class Posts(CollectionResource):
+
+    def describe_resource(self):
+        return ResourceDescription('Posts', url='/posts', methods=[
+            HttpMethodDescription('GET')])
+
+    def read_resource(self):
+        authors = self.loader('author', fetch)
+        body = ResourceJSONRepresentation('Posts')
+        body.objects = []
+        for number, author_id in enumerate([1, 2, 1, 0]):
+            post = ResourceJSONRepresentation('Post')
+            post.id = number
+            post.author = authors.load(author_id)
+            body.objects.append(post)
+        return CommonResponse.success(body)
+
+
+def test_deferred_values_are_fetched_in_one_batch(call):
+    del BATCHES[:]
+    response = call(Posts, '/posts')
+    body = json.loads(response.body.decode('utf-8'))
+    assert [post['author'] for post in body['objects']] == \
+        ['author 1', 'author 2', 'author 1', None]
+    assert BATCHES == [[1, 2, 0]]
+
+
+def test_values_are_memoized():
+    del BATCHES[:]
+    loader = BatchLoader(fetch)
+    assert loader.get_many([1, 2]) == {1: 'author 1', 2: 'author 2'}
+    assert loader.get(1) == 'author 1'
+    assert loader.get(None) is None
+    assert BATCHES == [[1, 2]]
+    loader.clear()
+    loader.get(1)
+    assert loader.batches == 2
+
+
+def test_batches_are_limited():
+    del BATCHES[:]
+    loader = BatchLoader(fetch, max_batch_size=2)
+    loader.prime([1, 2, 3, 2])
+    loader.dispatch()
+    assert BATCHES == [[1, 2], [3]]
@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Copyright (c) 2012 The Skuë Project
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+# ***** Application modules *****
+from pyramid_skue.json.utils import ResourceJSONRepresentation
+from pyramid_skue.json.utils import language_chain, localize_objects
+from pyramid_skue.json.utils import localized_field_names
+
+__copyright__ = u"Copyright 2012, The Skuë Project"
+__license__ = "MIT"
+
+
+class Article(object):
+    def __init__(self, number):
+        self.title = 'title %d' % number
+        self.title_pt = 'titulo %d' % number
+        self.body = 'body'
+        self.body_pt_br = 'corpo'
+
+
+class Note(object):
+    def __init__(self):
+        self.title = 'note'
+
+
+def test_language_chain_falls_back_one_subtag_at_a_time():
+    assert language_chain('pt-BR') == ('pt_br', 'pt')
+    assert language_chain('en-US') == ('en_us',)
+    assert language_chain('en') == ()
+    assert language_chain(None) == ()
+
+
+def test_localized_objects_follow_the_fallback_chain():
+    objects = localize_objects([Article(1), Article(2)], ['title', 'body'], 'pt-BR')
+    assert objects == [{'title': 'titulo 1', 'body': 'corpo'},
+                       {'title': 'titulo 2', 'body': 'corpo'}]
+    assert localize_objects([Article(1)], ['title'], 'de') == [{'title': 'title 1'}]
+    assert localize_objects([Article(1)], [], 'pt') == [{}]
+
+
+def test_field_names_are_resolved_per_model_class():
+    assert localized_field_names(Article(1), ['title', 'body'], 'pt') == \
+        ['title_pt', 'body']
+    assert localized_field_names(Note(), ['title'], 'pt') == ['title']
+    mixed = localize_objects([Article(1), Note()], ['title'], 'pt')
+    assert mixed == [{'title': 'titulo 1'}, {'title': 'note'}]
+
+
+def test_get_localized():
+    representation = ResourceJSONRepresentation('Article')
+    assert representation.get_localized(Article(3), 'title', 'pt') == 'titulo 3'
+    assert representation.get_localized(Article(3), 'title', 'en') == 'title 3'
+    assert representation.get_localized_objects([Article(4)], ['body'], 'pt-BR') == \
+        [{'body': 'corpo'}]
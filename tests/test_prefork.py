@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Copyright (c) 2012 The Skuë Project
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+# ***** Python built-in modules *****
+import gc
+import os
+import threading
+
+# ***** Third party modules *****
+import pytest
+
+# ***** Pyramid modules *****
+from pyramid.config import Configurator
+from pyramid.request import Request
+
+# ***** Application modules *****
+from pyramid_skue import encoders
+from pyramid_skue.prefork import warm_up, freeze, worker_report
+
+__copyright__ = u"Copyright 2012, The Skuë Project"
+__license__ = "MIT"
+
+
+needs_freeze = pytest.mark.skipif(not hasattr(gc, 'freeze'),
+                                  reason='gc.freeze needs Python 3.7+')
+
+
+@pytest.fixture
+def gc_state():
+    enabled = gc.isenabled()
+    yield
+    if hasattr(gc, 'unfreeze'):
+        gc.unfreeze()
+    if enabled:
+        gc.enable()
+
+
+def make_app(**settings):
+    config = Configurator(settings=settings)
+    config.include('pyramid_skue')
+    config.add_skue_lazy_resource('tests.test_lazy.Greeting', '/greeting')
+    return config.make_wsgi_app()
+
+
+@needs_freeze
+def test_including_does_not_disable_the_collector(gc_state):
+    gc.enable()
+    config = Configurator(settings={'skue.prefork': 'true'})
+    config.include('pyramid_skue')
+    assert gc.isenabled()
+
+
+@needs_freeze
+def test_collector_is_enabled_again_when_no_fork_follows(gc_state):
+    gc.enable()
+    app = make_app(**{'skue.prefork': 'true'})
+    assert not gc.isenabled()
+    assert Request.blank('/greeting').get_response(app).status_int == 200
+    assert gc.isenabled()
+
+
+@needs_freeze
+def test_freeze_does_not_collect(gc_state, monkeypatch):
+    monkeypatch.setattr(gc, 'collect', lambda *args: pytest.fail('collected'))
+    assert freeze() > 0
+
+
+@needs_freeze
+def test_workers_enable_the_collector(gc_state):
+    gc.disable()
+    freeze()
+    read, write = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.write(write, b'1' if gc.isenabled() else b'0')
+        os._exit(0)
+    os.waitpid(pid, 0)
+    assert os.read(read, 1) == b'1'
+    os.close(read)
+    os.close(write)
+
+
+@needs_freeze
+def test_worker_report_has_the_master_baseline(gc_state):
+    make_app(**{'skue.prefork': 'true'})
+    read, write = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        report = worker_report()
+        ok = report['pid'] == os.getpid() and report['master_uss'] is not None
+        os.write(write, b'1' if ok else b'0')
+        os._exit(0)
+    os.waitpid(pid, 0)
+    assert os.read(read, 1) == b'1'
+    os.close(read)
+    os.close(write)
+
+
+def test_no_prewarm_thread_with_prefork(gc_state):
+    app = make_app(**{'skue.lazy_prewarm': 'true', 'skue.prefork': 'true'})
+    assert 'skue-prewarm' not in [thread.name for thread in threading.enumerate()]
+    # Imported by the master instead
+    assert app.registry.skue_lazy_resources[0].loaded
+
+
+def test_warm_up_runs_every_encoder(monkeypatch):
+    calls = []
+    monkeypatch.setitem(encoders.ENCODERS, 'application/x-test',
+                        lambda body: calls.append('encode') or b'encoded')
+    monkeypatch.setitem(encoders.DECODERS, 'application/x-test',
+                        lambda body: calls.append(body))
+    warm_up(make_app().registry)
+    assert calls == ['encode', b'encoded']
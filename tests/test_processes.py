@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Copyright (c) 2012 The Skuë Project
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+# ***** Python built-in modules *****
+import os
+import time
+import threading
+
+# ***** Third party modules *****
+import pytest
+
+# ***** Application modules *****
+from pyramid_skue.errors import GatewayTimeoutError, NotAcceptableError
+from pyramid_skue.processes import ProcessPool, RemoteResponseError, call_in_process
+from pyramid_skue.processes import get_process_pool, shutdown_process_pool
+
+__copyright__ = u"Copyright 2012, The Skuë Project"
+__license__ = "MIT"
+
+
+class Action(object):
+    """A process action importable by the pool processes"""
+
+    @classmethod
+    def execute_in_process(cls, payload):
+        if payload.get('error'):
+            raise NotAcceptableError(['application/json'])
+        time.sleep(payload.get('sleep', 0))
+        return os.getpid()
+
+
+def make_lock():
+    return threading.Lock()
+
+
+@pytest.fixture
+def pool():
+    get_process_pool(1)
+    yield
+    shutdown_process_pool()
+
+
+def test_timed_out_worker_is_replaced(pool):
+    first = call_in_process(Action, {}, 5)
+    with pytest.raises(GatewayTimeoutError):
+        call_in_process(Action, {'sleep': 30}, 0.2)
+    # The single worker was not left busy with the stuck task
+    started = time.time()
+    second = call_in_process(Action, {}, 5)
+    assert second != first
+    assert time.time() - started < 5
+
+
+def test_response_errors_are_sent_back(pool):
+    with pytest.raises(RemoteResponseError) as error:
+        call_in_process(Action, {'error': True}, 5)
+    assert error.value.code == 406
+    assert call_in_process(Action, {}, 5)
+
+
+def test_unpicklable_results_are_errors():
+    pool = ProcessPool(1)
+    try:
+        with pytest.raises(RuntimeError):
+            pool.apply(make_lock, (), 5)
+        assert pool.apply(os.getpid, (), 5)
+    finally:
+        pool.shutdown()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Copyright (c) 2012 The Skuë Project
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+# ***** Python built-in modules *****
+import json
+import threading
+
+# ***** Third party modules *****
+import pytest
+
+# ***** Pyramid modules *****
+from pyramid.request import Request
+
+# ***** Application modules *****
+from pyramid_skue.cache import CopyOnWriteDict
+from pyramid_skue.http import CommonResponse
+from pyramid_skue.rest.api import ResourceDescription, HttpMethodDescription
+from pyramid_skue.rest.api import HttpParameterDescription
+from pyramid_skue.rest.resources import DocumentResource, SKUE_CACHE
+
+__copyright__ = u"Copyright 2012, The Skuë Project"
+__license__ = "MIT"
+
+
+def describe_echo():
+    return ResourceDescription('Echo', url='/echo', methods=[
+        HttpMethodDescription('GET', parameters=[
+            HttpParameterDescription('value', 'int', is_required=True)])])
+
+
+class Echo(DocumentResource):
+
+    def describe_resource(self):
+        return describe_echo()
+
+    def read_resource(self):
+        # Gives the other threads a chance to overwrite a shared state
+        threading.Event().wait(0.001)
+        return CommonResponse.simple_success(str(self.payload['value']))
+
+
+class WithState(Echo):
+
+    def read_resource(self):
+        self.seen = self.payload['value']
+        return CommonResponse.simple_success(str(self.seen))
+
+
+class SlottedWithState(DocumentResource):
+    __slots__ = ('seen',)
+
+    def describe_resource(self):
+        return describe_echo()
+
+    def read_resource(self):
+        self.seen = self.payload['value']
+        self.other = True
+        return CommonResponse.simple_success(str(self.seen))
+
+
+def echo(resource_class, value):
+    request = Request.blank('/echo/%d?value=%d' % (value, value))
+    response = resource_class(request)()
+    return json.loads(response.body.decode('utf-8'))['message']
+
+
+def test_concurrent_requests_keep_their_state():
+    errors = []
+
+    def work(start):
+        for value in range(start, start + 20):
+            if echo(Echo, value) != str(value):
+                errors.append(value)
+
+    threads = [threading.Thread(target=work, args=(number * 100,))
+               for number in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+
+
+def test_descriptions_are_cached_by_class():
+    echo(Echo, 1)
+    echo(Echo, 2)
+    assert Echo in SKUE_CACHE
+    assert not [key for key in SKUE_CACHE._snapshot if not isinstance(key, type)]
+
+
+def test_subclasses_without_slots_keep_a_dict():
+    assert echo(WithState, 3) == '3'
+
+
+def test_subclasses_with_slots_must_list_their_attributes():
+    with pytest.raises(AttributeError):
+        echo(SlottedWithState, 4)
+
+
+def test_copy_on_write_dict():
+    cache = CopyOnWriteDict(capacity=2)
+    cache['a'] = 1
+    snapshot = cache._snapshot
+    cache['b'] = 2
+    assert snapshot == {'a': 1}
+    assert cache.setdefault('a', 3) == 1
+    # Full: new keys are not stored
+    cache['c'] = 3
+    assert 'c' not in cache
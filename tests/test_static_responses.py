@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Copyright (c) 2012 The Skuë Project
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+# ***** Python built-in modules *****
+import json
+import logging
+
+# ***** Application modules *****
+from pyramid_skue.errors import UnknownReferenceError, ServiceUnavailableError
+from pyramid_skue.http import CommonResponse, static_body
+from pyramid_skue.rest.api import ResourceDescription, HttpMethodDescription
+from pyramid_skue.rest.api import HttpParameterDescription
+from pyramid_skue.rest.resources import DocumentResource
+
+__copyright__ = u"Copyright 2012, The Skuë Project"
+__license__ = "MIT"
+
+
+class Message(DocumentResource):
+    def describe_resource(self):
+        return ResourceDescription('Message', url='/message', methods=[
+            HttpMethodDescription('GET', parameters=[
+                HttpParameterDescription('number', 'int', is_required=True)])])
+
+    def read_resource(self):
+        if self.payload['number'] == 1:
+            raise UnknownReferenceError('number', u'"\xe9')
+        if self.payload['number'] == 2:
+            raise ValueError('unexpected')
+        return CommonResponse.resource_not_found()
+
+
+def load(response):
+    return json.loads(response.body.decode('utf-8'))
+
+
+def test_static_bodies_are_encoded_once():
+    first = CommonResponse.resource_not_found().write_body()
+    second = CommonResponse.resource_not_found().write_body()
+    assert first is second
+    assert json.loads(first.decode('utf-8')) == {
+        'status': 'Error', 'message': 'The resource could not be found'}
+    assert static_body('Test', 'Error', 'Message', 'text/plain') is None
+
+
+def test_static_response_headers_are_not_shared():
+    allowed = CommonResponse.method_not_allowed('GET')
+    other = CommonResponse.method_not_allowed('POST')
+    assert allowed.headers['Allow'] == 'GET'
+    assert other.headers['Allow'] == 'POST'
+    assert allowed.write_body() is other.write_body()
+
+
+def test_error_messages_are_encoded_into_the_template(call):
+    response = call(Message, '/message?number=1')
+    assert response.status_int == 404
+    assert load(response) == {
+        'status': 'Error',
+        'message': u'The number="\xe9 cannot be found into the storage.'}
+    assert load(call(Message, '/message')) == {
+        'status': 'Error', 'message': 'The number parameter is missed.'}
+
+
+def test_static_errors_keep_their_headers():
+    response = ServiceUnavailableError(retry_after=5).get_http_response()
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '5'
+    assert 'Retry-After' not in ServiceUnavailableError().get_http_response().headers
+    assert response.write_body() is ServiceUnavailableError().get_http_response().write_body()
+
+
+def test_production_mode_answers_unexpected_errors_with_a_500(call, caplog):
+    settings = {'skue.production': 'true'}
+    with caplog.at_level(logging.ERROR):
+        response = call(Message, '/message?number=2', settings=settings)
+    assert response.status_int == 500
+    assert load(response) == {'status': 'Error',
+                              'message': 'An unexpected error has occurred'}
+    assert 'An unexpected error has occurred' in caplog.text
+
+
+def test_production_mode_samples_the_error_log(call, caplog):
+    settings = {'skue.production': 'true', 'skue.error_log_sample_rate': '0'}
+    with caplog.at_level(logging.ERROR):
+        response = call(Message, '/message?number=2', settings=settings)
+    assert response.status_int == 500
+    assert caplog.records == []
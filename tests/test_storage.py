@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Copyright (c) 2012 The Skuë Project
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+# ***** Python built-in modules *****
+import sqlite3
+
+# ***** Third party modules *****
+import pytest
+
+# ***** Application modules *****
+from pyramid_skue.errors import ServiceUnavailableError, UnknownReferenceError
+from pyramid_skue.http import CommonResponse
+from pyramid_skue.rest.api import ResourceDescription, HttpMethodDescription
+from pyramid_skue.rest.api import HttpParameterDescription
+from pyramid_skue.rest.resources import CollectionResource
+from pyramid_skue.storage import ConnectionPool, SqliteStorage
+
+__copyright__ = u"Copyright 2012, The Skuë Project"
+__license__ = "MIT"
+
+
+class Items(CollectionResource):
+
+    def describe_resource(self):
+        return ResourceDescription('Items', url='/items', methods=[
+            HttpMethodDescription('GET'),
+            HttpMethodDescription('POST', parameters=[
+                HttpParameterDescription('number', 'int', is_required=True)])])
+
+    def read_resource(self):
+        rows = self.storage_session.execute('SELECT number FROM items').fetchall()
+        return CommonResponse.simple_success(','.join([str(row[0]) for row in rows]))
+
+    def create_resource(self):
+        number = self.payload['number']
+        self.storage_session.execute('INSERT INTO items VALUES (?)', (number,))
+        if number == 9:
+            raise UnknownReferenceError('number', number)
+        return CommonResponse.resource_created(u'/items/%d' % number)
+
+
+@pytest.fixture
+def storage(tmp_path):
+    path = str(tmp_path / 'items.db')
+    connection = sqlite3.connect(path)
+    connection.execute('CREATE TABLE items (number INTEGER)')
+    connection.commit()
+    connection.close()
+    Items.storage = storage = SqliteStorage(path, read_pool_size=2, timeout=1)
+    yield storage
+    Items.storage = None
+    storage.close()
+
+
+def post(call, number):
+    return call(Items, '/items', method='POST', body=('number=%d' % number).encode('utf-8'),
+                content_type='application/x-www-form-urlencoded')
+
+
+def test_failed_requests_are_rolled_back(call, storage):
+    assert post(call, 1).status_int == 201
+    assert post(call, 9).status_int == 404
+    response = call(Items, '/items')
+    assert b'"1"' in response.body and b'9' not in response.body
+    assert storage.metrics['write']['in_use'] == 0
+    assert storage.metrics['read']['acquired'] == 1
+
+
+def test_pool_waits_and_times_out():
+    pool = ConnectionPool(lambda: sqlite3.connect(':memory:'), size=1, timeout=0.05)
+    connection = pool.acquire()
+    with pytest.raises(ServiceUnavailableError):
+        pool.acquire()
+    assert pool.metrics['timeouts'] == 1
+    assert pool.metrics['saturation'] == 1.0
+    pool.release(connection)
+    assert pool.acquire() is connection
+
+
+def test_factory_errors_free_the_slot():
+    def broken():
+        raise sqlite3.OperationalError('down')
+    pool = ConnectionPool(broken, size=1)
+    for _ in range(2):
+        with pytest.raises(sqlite3.OperationalError):
+            pool.acquire()
+    assert pool.metrics['created'] == 0
+    assert pool.metrics['in_use'] == 0
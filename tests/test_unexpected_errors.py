@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Copyright (c) 2012 The Skuë Project
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+# ***** Python built-in modules *****
+import logging
+import traceback
+
+# ***** Third party modules *****
+import pytest
+
+# ***** Application modules *****
+from pyramid_skue.rest.api import ResourceDescription, HttpMethodDescription
+from pyramid_skue.rest.resources import DocumentResource
+
+__copyright__ = u"Copyright 2012, The Skuë Project"
+__license__ = "MIT"
+
+
+class Broken(DocumentResource):
+
+    def describe_resource(self):
+        return ResourceDescription('Broken', url='/broken', methods=[
+            HttpMethodDescription('GET')])
+
+    def read_resource(self):
+        raise ValueError('broken handler')
+
+
+def test_development_mode_raises_the_original_error(call):
+    with pytest.raises(ValueError) as error:
+        call(Broken, '/broken')
+    assert str(error.value) == 'broken handler'
+    frames = [frame.name for frame in traceback.extract_tb(error.tb)]
+    assert frames[-1] == 'read_resource'
+
+
+def test_production_mode_answers_500(call, caplog):
+    with caplog.at_level(logging.ERROR):
+        response = call(Broken, '/broken', settings={'skue.production': 'true'})
+    assert response.status_int == 500
+    assert 'broken handler' in caplog.text
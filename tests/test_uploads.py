@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Copyright (c) 2012 The Skuë Project
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+# ***** Python built-in modules *****
+import io
+import hashlib
+
+# ***** Third party modules *****
+import pytest
+
+# ***** Application modules *****
+from pyramid_skue.errors import InvalidParameterFormatError
+from pyramid_skue.http import CommonResponse
+from pyramid_skue.rest.api import ResourceDescription, HttpMethodDescription
+from pyramid_skue.rest.api import HttpParameterDescription
+from pyramid_skue.rest.resources import CollectionResource
+from pyramid_skue.uploads import parse_multipart, spool_body
+
+__copyright__ = u"Copyright 2012, The Skuë Project"
+__license__ = "MIT"
+
+
+RECEIVED = []
+
+
+class Files(CollectionResource):
+    max_upload_size = 1000
+    upload_memory_threshold = 10
+
+    def describe_resource(self):
+        return ResourceDescription('Files', url='/files', methods=[
+            HttpMethodDescription('POST', parameters=[
+                HttpParameterDescription('file', 'file', is_required=True),
+                HttpParameterDescription('title')])])
+
+    def create_resource(self):
+        upload = self.payload['file']
+        RECEIVED.append((upload, upload.read(), self.payload.get('title')))
+        return CommonResponse.resource_created(u'/files/%s' % upload.sha256)
+
+
+def multipart(boundary, *parts):
+    body = b''
+    for headers, content in parts:
+        body += b'--' + boundary + b'\r\n' + headers + b'\r\n\r\n' + content + b'\r\n'
+    return body + b'--' + boundary + b'--\r\n'
+
+
+BODY = multipart(
+    b'xyz',
+    (b'Content-Disposition: form-data; name="title"', b'Notes'),
+    (b'Content-Disposition: form-data; name="file"; filename="a.txt"\r\n'
+     b'Content-Type: text/plain', b'line one\r\n--xy line two' * 5))
+
+
+def test_multipart_files_are_spooled(call):
+    del RECEIVED[:]
+    response = call(Files, '/files', method='POST', body=BODY,
+                    content_type='multipart/form-data; boundary=xyz')
+    assert response.status_int == 201
+    upload, content, title = RECEIVED[0]
+    assert content == b'line one\r\n--xy line two' * 5
+    assert title == u'Notes'
+    assert upload.filename == 'a.txt'
+    assert upload.on_disk
+    assert response.location.endswith(hashlib.sha256(content).hexdigest())
+    # Released at the end of the request
+    assert upload.file.closed
+
+
+def test_raw_bodies_are_the_only_file(call):
+    del RECEIVED[:]
+    response = call(Files, '/files?title=Raw', method='POST', body=b'raw data',
+                    content_type='application/octet-stream')
+    assert response.status_int == 201
+    assert RECEIVED[0][1:] == (b'raw data', u'Raw')
+
+
+def test_large_bodies_are_rejected(call):
+    response = call(Files, '/files', method='POST', body=b'x' * 1001,
+                    content_type='application/octet-stream')
+    assert response.status_int == 413
+
+
+def test_parts_split_across_chunks(monkeypatch):
+    monkeypatch.setattr('pyramid_skue.uploads.CHUNK_SIZE', 3)
+    payload = parse_multipart(io.BytesIO(BODY), 'xyz')
+    assert payload['title'] == u'Notes'
+    assert payload['file'].read() == b'line one\r\n--xy line two' * 5
+
+
+def test_truncated_bodies_are_invalid():
+    with pytest.raises(InvalidParameterFormatError):
+        parse_multipart(io.BytesIO(BODY[:-20]), 'xyz')
+
+
+@pytest.mark.parametrize('headers, content', [
+    (b'Content-Disposition: form-data; name="title"', b'\xff'),
+    (b'Content-Disposition: form-data; name="\xff"', b'Notes'),
+])
+def test_undecodable_parts_are_invalid(call, headers, content):
+    response = call(Files, '/files', method='POST',
+                    body=multipart(b'xyz', (headers, content)),
+                    content_type='multipart/form-data; boundary=xyz')
+    assert response.status_int == 400
+
+
+def test_spool_body_digest():
+    upload = spool_body(io.BytesIO(b'content'), 'file')
+    assert upload.size == 7
+    assert upload.sha256 == hashlib.sha256(b'content').hexdigest()
+    assert upload.read() == b'content'
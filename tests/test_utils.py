@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Copyright (c) 2012 The Skuë Project
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+# ***** Third party modules *****
+import pytest
+
+# ***** Application modules *****
+from pyramid_skue.errors import InvalidParameterFormatError
+from pyramid_skue.http import CommonResponse
+from pyramid_skue.rest.api import ResourceDescription, HttpMethodDescription
+from pyramid_skue.rest.api import HttpParameterDescription
+from pyramid_skue.rest.resources import CollectionResource
+from pyramid_skue.utils import parse_body
+
+__copyright__ = u"Copyright 2012, The Skuë Project"
+__license__ = "MIT"
+
+
+class Names(CollectionResource):
+
+    def describe_resource(self):
+        return ResourceDescription('Names', url='/names', methods=[
+            HttpMethodDescription('POST', parameters=[
+                HttpParameterDescription('name', is_required=True)])])
+
+    def create_resource(self):
+        return CommonResponse.resource_created(u'/names/1')
+
+
+def test_parse_body():
+    assert parse_body(b'name=a+b%21&empty=&flag') == {'name': 'a b!', 'empty': ''}
+    assert parse_body(b'') == {}
+
+
+def test_parse_body_rejects_invalid_utf8():
+    with pytest.raises(InvalidParameterFormatError):
+        parse_body(b'name=\xff')
+
+
+def test_invalid_utf8_form_bodies_are_a_bad_request(call):
+    response = call(Names, '/names', method='POST', body=b'name=\xff',
+                    content_type='application/x-www-form-urlencoded')
+    assert response.status_int == 400
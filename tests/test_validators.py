@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Copyright (c) 2012 The Skuë Project
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+# ***** Python built-in modules *****
+import json
+from datetime import date, datetime
+
+# ***** Third party modules *****
+import pytest
+
+# ***** Application modules *****
+from pyramid_skue.http import CommonResponse
+from pyramid_skue.rest.api import ResourceDescription, HttpMethodDescription
+from pyramid_skue.rest.api import HttpParameterDescription
+from pyramid_skue.rest.resources import CollectionResource
+from pyramid_skue.rest.validators import compile_coercer
+
+__copyright__ = u"Copyright 2012, The Skuë Project"
+__license__ = "MIT"
+
+
+class Items(CollectionResource):
+    def describe_resource(self):
+        return ResourceDescription('Items', url='/items', methods=[
+            HttpMethodDescription('GET', parameters=[
+                HttpParameterDescription('number', 'int', maximum=10),
+                HttpParameterDescription('flag', 'bool'),
+                HttpParameterDescription('tags', 'list:int'),
+                HttpParameterDescription('kind', 'enum', choices=['a', 'b']),
+                HttpParameterDescription('day', 'date')])])
+
+    def read_resource(self):
+        return CommonResponse.simple_success(repr(sorted(self.payload.items())))
+
+
+@pytest.mark.parametrize('parameter_type, value, expected', [
+    ('int', '42', 42),
+    ('float', '1.5', 1.5),
+    ('bool', 'Yes', True),
+    ('bool', 'off', False),
+    ('date', '2012-04-06', date(2012, 4, 6)),
+    ('datetime', '2012-04-06T10:30:00', datetime(2012, 4, 6, 10, 30)),
+    ('list:int', '1,2,3', [1, 2, 3]),
+    ('list', '', []),
+    ('unknown', 'value', 'value'),
+])
+def test_coercer_converts_the_declared_type(parameter_type, value, expected):
+    assert compile_coercer(parameter_type)(value) == expected
+
+
+@pytest.mark.parametrize('parameter_type, value', [
+    ('int', 'abc'),
+    ('int', '1.5'),
+    ('float', 'abc'),
+    ('float', 'nan'),
+    ('float', '-inf'),
+    ('bool', 'maybe'),
+    ('date', '06/04/2012'),
+    ('list:int', '1,x'),
+])
+def test_coercer_rejects_invalid_values(parameter_type, value):
+    with pytest.raises(ValueError):
+        compile_coercer(parameter_type)(value)
+
+
+def test_coercer_checks_choices_and_bounds():
+    coercer = compile_coercer('int', choices=[1, 2, 30], minimum=2, maximum=20)
+    assert coercer('2') == 2
+    for value in ('1', '30', '5'):
+        with pytest.raises(ValueError):
+            coercer(value)
+
+
+def test_bounded_coercer_rejects_nan():
+    with pytest.raises(ValueError):
+        compile_coercer('float', minimum=0, maximum=10)('nan')
+
+
+def test_coercer_is_compiled_once_per_description():
+    parameter = HttpParameterDescription('number', 'int')
+    assert parameter.coercer is parameter.coercer
+    parameter.maximum = 3
+    with pytest.raises(ValueError):
+        parameter.coercer('4')
+
+
+def test_request_parameters_are_converted(call):
+    response = call(Items, '/items?number=3&flag=yes&tags=1,2&kind=a&day=2012-04-06')
+    assert response.status_int == 200
+    message = json.loads(response.body.decode('utf-8'))['message']
+    assert message == repr(sorted({'number': 3, 'flag': True, 'tags': [1, 2],
+                                   'kind': 'a', 'day': date(2012, 4, 6)}.items()))
+
+
+@pytest.mark.parametrize('query, parameter', [
+    ('number=30', 'number'),
+    ('number=x', 'number'),
+    ('tags=1,x', 'tags'),
+    ('kind=c', 'kind'),
+    ('offset=-1', 'offset'),
+    ('count=abc', 'count'),
+])
+def test_invalid_parameters_are_a_bad_request(call, query, parameter):
+    response = call(Items, '/items?' + query)
+    assert response.status_int == 400
+    body = json.loads(response.body.decode('utf-8'))
+    assert body['message'] == 'Invalid format for parameter %s.' % parameter